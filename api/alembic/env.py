@@ -9,6 +9,9 @@ from alembic import context
 
 from app.core.db import Base
 from app.models.user import User  # noqa: F401 (import models so Alembic detects tables)
+from app.models.repository import Repository, InstallationSync, RepositorySnapshot  # noqa: F401
+from app.models.job import Job  # noqa: F401
+from app.models.refresh_token import RefreshToken  # noqa: F401
 
 
 # this is the Alembic Config object, which provides
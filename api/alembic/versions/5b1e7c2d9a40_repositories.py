@@ -0,0 +1,69 @@
+"""repositories
+
+Revision ID: 5b1e7c2d9a40
+Revises: 0344d83e8915
+Create Date: 2026-10-18 10:12:41.208114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e7c2d9a40'
+down_revision: Union[str, Sequence[str], None] = '0344d83e8915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # users.github_installation_id exists on the model but was never part of a
+    # migration; add it only where it's missing.
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS github_installation_id BIGINT")
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.create_table('repositories',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('installation_id', sa.BigInteger(), nullable=False),
+    sa.Column('github_id', sa.BigInteger(), nullable=False),
+    sa.Column('name', sa.String(length=256), nullable=False),
+    sa.Column('full_name', sa.String(length=512), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('language', sa.String(length=64), nullable=True),
+    sa.Column('private', sa.Boolean(), nullable=False),
+    sa.Column('visibility', sa.String(length=16), nullable=True),
+    sa.Column('html_url', sa.String(length=512), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('synced_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('installation_id', 'github_id', name='uq_repositories_installation_github_id')
+    )
+    op.create_index(op.f('ix_repositories_installation_id'), 'repositories', ['installation_id'], unique=False)
+    op.create_index('ix_repositories_installation_name', 'repositories', ['installation_id', sa.text('lower(full_name)'), 'id'], unique=False)
+    op.create_index('ix_repositories_installation_updated', 'repositories', ['installation_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_repositories_installation_language', 'repositories', ['installation_id', sa.text('lower(language)')], unique=False)
+    op.create_index('ix_repositories_full_name_trgm', 'repositories', ['full_name'], unique=False, postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'})
+    op.create_index('ix_repositories_description_trgm', 'repositories', ['description'], unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+
+    op.create_table('installation_syncs',
+    sa.Column('installation_id', sa.BigInteger(), nullable=False),
+    sa.Column('synced_at', sa.DateTime(), nullable=False),
+    sa.Column('repo_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('installation_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('installation_syncs')
+    op.drop_index('ix_repositories_description_trgm', table_name='repositories', postgresql_using='gin')
+    op.drop_index('ix_repositories_full_name_trgm', table_name='repositories', postgresql_using='gin')
+    op.drop_index('ix_repositories_installation_language', table_name='repositories')
+    op.drop_index('ix_repositories_installation_updated', table_name='repositories')
+    op.drop_index('ix_repositories_installation_name', table_name='repositories')
+    op.drop_index(op.f('ix_repositories_installation_id'), table_name='repositories')
+    op.drop_table('repositories')
@@ -0,0 +1,35 @@
+"""repository snapshots
+
+Revision ID: 8d3f2a6c1e57
+Revises: 5b1e7c2d9a40
+Create Date: 2026-10-18 14:03:27.551902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f2a6c1e57'
+down_revision: Union[str, Sequence[str], None] = '5b1e7c2d9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('repository_snapshots',
+    sa.Column('installation_id', sa.BigInteger(), nullable=False),
+    sa.Column('full_name', sa.String(length=512), nullable=False),
+    sa.Column('commit_sha', sa.String(length=40), nullable=False),
+    sa.Column('file_count', sa.Integer(), nullable=False),
+    sa.Column('ingested_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('installation_id', 'full_name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('repository_snapshots')
@@ -0,0 +1,31 @@
+"""repository star and fork counts
+
+Revision ID: a3c8e1f4b692
+Revises: e7a9c3b51d24
+Create Date: 2026-10-18 21:14:09.332871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c8e1f4b692'
+down_revision: Union[str, Sequence[str], None] = 'e7a9c3b51d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows read 0 until the installation's next sync fills them in.
+    op.add_column('repositories', sa.Column('stargazers_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('repositories', sa.Column('forks_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('repositories', 'forks_count')
+    op.drop_column('repositories', 'stargazers_count')
@@ -1,36 +1,111 @@
-from fastapi import Depends, HTTPException, status, Cookie
-from sqlalchemy.ext.asyncio import AsyncSession
+import time
+
+from fastapi import Depends, HTTPException, Request, WebSocket, status, Cookie
 from sqlalchemy import select
 
-from app.core.db import get_db
-from app.core.security import decode_token
+from app.core.admission import admission_control
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.security import decode_token_claims
+from app.core.sessions import REFRESH_COOKIE, SESSION_COOKIE, renew_session
+from app.core.user_cache import CachedUser, user_cache
 from app.models.user import User
 
-SESSION_COOKIE = "session"
-
 async def get_current_user(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
     session: str | None = Cookie(default=None, alias=SESSION_COOKIE),
-) -> User:
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-        )
+    refresh: str | None = Cookie(default=None, alias=REFRESH_COOKIE),
+) -> CachedUser:
+    """
+    The signed-in user. An access token that is missing, expired or about to
+    expire is renewed in-band from the refresh cookie (see app/core/sessions.py).
+    """
+    claims = _claims(session)
+    if claims is not None and (not refresh or claims["exp"] - time.time() > settings.ACCESS_TOKEN_RENEW_SECONDS):
+        return await _load_user_id(int(claims["sub"]))
+
+    if refresh:
+        renewed = await renew_session(refresh)
+        if renewed is not None:
+            user_id, access, new_refresh = renewed
+            request.state.renewed_session = (access, new_refresh)
+            return await _load_user_id(user_id)
+    if claims is not None:
+        # Renewal failed but the access token is still good until it expires.
+        return await _load_user_id(int(claims["sub"]))
 
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid session" if session else "Not authenticated",
+    )
+
+async def get_optional_user(
+    request: Request,
+    session: str | None = Cookie(default=None, alias=SESSION_COOKIE),
+    refresh: str | None = Cookie(default=None, alias=REFRESH_COOKIE),
+) -> CachedUser | None:
+    """Like get_current_user, but anonymous/expired sessions give None instead of 401."""
+    if not session and not refresh:
+        return None
     try:
-        user_id = decode_token(session)
+        return await get_current_user(request, session, refresh)
+    except HTTPException as e:
+        if e.status_code == status.HTTP_401_UNAUTHORIZED:
+            return None
+        raise
+
+async def get_websocket_user(websocket: WebSocket) -> CachedUser:
+    """
+    get_current_user for WebSocket handshakes (same cookie, same cache); raises HTTPException.
+    No in-band renewal here: a client turned away with 4401 renews with POST /auth/refresh and reconnects.
+    """
+    claims = _claims(websocket.cookies.get(SESSION_COOKIE))
+    if claims is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid session")
+    return await _load_user_id(int(claims["sub"]))
+
+def _claims(session: str | None) -> dict | None:
+    if not session:
+        return None
+    try:
+        claims = decode_token_claims(session)
+        int(claims["sub"])
+        return claims
     except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid session",
-        )
-
-    stmt = select(User).where(User.id == int(user_id))
-    user = (await db.execute(stmt)).scalar_one_or_none()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-    return user
+        return None
+
+async def _load_user_id(user_id: int) -> CachedUser:
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    # Only a cache miss opens a DB session.
+    generation = user_cache.generation
+    async with SessionLocal() as db:
+        stmt = select(User).where(User.id == user_id)
+        user = (await db.execute(stmt)).scalar_one_or_none()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        cached = CachedUser.from_orm(user)
+
+    user_cache.put(cached, generation)
+    return cached
+
+def admission(route: str):
+    """
+    Rate limiting and load shedding for `route` (app/core/admission.py), keyed
+    by the session's user id, or the client IP without one. List it in the
+    decorator's dependencies so a rejected request does no other work.
+    """
+    async def check(request: Request, session: str | None = Cookie(default=None, alias=SESSION_COOKIE)):
+        claims = _claims(session)
+        if claims is not None:
+            key = f"user:{claims['sub']}"
+        else:
+            key = f"ip:{request.client.host if request.client else 'unknown'}"
+        admission_control.check(route, key)
+
+    return check
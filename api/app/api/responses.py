@@ -0,0 +1,67 @@
+"""
+JSON responses that are cheap to produce and to transfer: orjson for the
+encoding, a strong ETag (answered with 304 on a match), and brotli or
+gzip above RESPONSE_COMPRESS_MIN_BYTES when the client accepts it.
+
+The ETag is the hash of the uncompressed body with the coding appended
+(`"<hash>-br"`), since a strong validator promises identical bytes; a
+client that switches codings still revalidates on the hash alone.
+"""
+import gzip
+import hashlib
+
+import brotli
+import orjson
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+_CODINGS = ("br", "gzip")
+
+
+def json_bytes(obj) -> bytes:
+    """orjson: several times faster than json.dumps, and it handles datetimes natively."""
+    return orjson.dumps(obj)
+
+
+def _accepted_coding(accept_encoding: str) -> str | None:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip().lower()] = q
+    for coding in _CODINGS:
+        if accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+def _compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def cached_json_response(request: Request, body: bytes, headers: dict | None = None) -> Response:
+    """`body` (already-encoded JSON) as a 304 or a possibly compressed 200."""
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    coding = None
+    if len(body) >= settings.RESPONSE_COMPRESS_MIN_BYTES:
+        coding = _accepted_coding(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": f'"{digest}-{coding}"' if coding else f'"{digest}"',
+        "Vary": "Accept-Encoding, Cookie",
+        **(headers or {}),
+    }
+
+    if digest in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    if coding:
+        body = _compress(body, coding)
+        headers["Content-Encoding"] = coding
+    return Response(body, media_type="application/json", headers=headers)
@@ -1 +1 @@
-from . import health, auth, me  # noqa: F401
+from . import health, auth, me, session, metrics  # noqa: F401
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Cookie, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import literal, or_, select
 
 from app.core.config import settings
-from app.core.db import get_db
-from app.core.security import create_access_token
+from app.core.db import dialect_insert, engine, get_db
+from app.api.deps import admission, get_current_user
+from app.core.sessions import (
+    REFRESH_COOKIE, clear_session_cookies, end_all_sessions, end_session, renew_session, set_session_cookies,
+    start_session,
+)
+from app.core.user_cache import CachedUser, user_cache
 from app.models.user import User
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -16,38 +21,72 @@ class DevLoginIn(BaseModel):
     username: str
     avatar_url: str | None = None
 
-async def issue_token_for_github_identity(
+async def upsert_github_identity(
     db: AsyncSession,
     github_id: str,
     username: str,
     avatar_url: str | None,
-) -> str:
-    stmt = select(User).where(User.github_id == github_id)
-    user = (await db.execute(stmt)).scalar_one_or_none()
+) -> tuple[int, bool]:
+    """
+    Create or refresh the user for a GitHub identity in one statement:
+    INSERT ... ON CONFLICT (github_id) DO UPDATE ... WHERE <something changed>.
 
-    if not user:
-        user = User(github_id=github_id, username=username, avatar_url=avatar_url)
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
+    Returns (user_id, written). Unchanged profiles don't write at all, and two
+    simultaneous first logins can't both try to INSERT.
+    """
+    ins = dialect_insert(User.__table__).values(
+        github_id=github_id, username=username, avatar_url=avatar_url
+    )
+    ins = ins.on_conflict_do_update(
+        index_elements=[User.github_id],
+        set_={"username": ins.excluded.username, "avatar_url": ins.excluded.avatar_url},
+        where=or_(
+            User.username.is_distinct_from(ins.excluded.username),
+            User.avatar_url.is_distinct_from(ins.excluded.avatar_url),
+        ),
+    ).returning(User.id)
+
+    if engine.dialect.name == "postgresql":
+        # Fold the "nothing changed" case into the same round trip.
+        written = ins.cte("written")
+        stmt = (
+            select(written.c.id, literal(True).label("written"))
+            .union_all(select(User.id, literal(False)).where(User.github_id == github_id))
+            .limit(1)
+        )
+        row = (await db.execute(stmt)).first()
     else:
-        changed = False
-        if user.username != username:
-            user.username = username
-            changed = True
-        if user.avatar_url != avatar_url:
-            user.avatar_url = avatar_url
-            changed = True
-        if changed:
-            await db.commit()
+        row = (await db.execute(ins)).first()
+        if row is not None:
+            row = (row.id, True)
+
+    if row is None:
+        # Nothing written and the row wasn't visible to the statement's snapshot
+        # (it was committed by a concurrent login meanwhile); read it now.
+        user_id = (await db.execute(select(User.id).where(User.github_id == github_id))).scalar_one()
+        return user_id, False
 
-    # IMPORTANT: keep token shape consistent with decode_token()
-    return create_access_token({"sub": str(user.id)})
+    user_id, was_written = row
+    if was_written:
+        await db.commit()
+        user_cache.invalidate(user_id)
+    return user_id, was_written
+
+
+async def issue_token_for_github_identity(
+    db: AsyncSession,
+    github_id: str,
+    username: str,
+    avatar_url: str | None,
+) -> tuple[str, str]:
+    """Returns (access token, refresh token) for a fresh login; set them with set_session_cookies()."""
+    user_id, _ = await upsert_github_identity(db, github_id, username, avatar_url)
+    return await start_session(db, user_id)
 
 if settings.ENV == "dev":
-    @router.post("/dev-login")
+    @router.post("/dev-login", dependencies=[Depends(admission("dev_login"))])
     async def dev_login(payload: DevLoginIn, db: AsyncSession = Depends(get_db)):
-        jwt = await issue_token_for_github_identity(
+        access, refresh = await issue_token_for_github_identity(
             db=db,
             github_id=payload.github_id,
             username=payload.username,
@@ -55,19 +94,37 @@ if settings.ENV == "dev":
         )
 
         resp = JSONResponse({"ok": True})
-        resp.set_cookie(
-            key="session",
-            value=jwt,
-            httponly=True,
-            samesite="lax",
-            secure=False,  # True in prod (HTTPS)
-            max_age=60 * 60 * 24 * 7,
-            path="/",
-        )
+        set_session_cookies(resp, access, refresh)
         return resp
 
+@router.post("/refresh")
+async def refresh_session(refresh: str | None = Cookie(default=None, alias=REFRESH_COOKIE)):
+    """
+    Explicit renewal, for clients that can't rely on get_current_user doing it
+    in-band (e.g. before reconnecting a WebSocket that was closed with 4401).
+    """
+    renewed = await renew_session(refresh) if refresh else None
+    if renewed is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    _user_id, access, new_refresh = renewed
+    resp = JSONResponse({"ok": True})
+    set_session_cookies(resp, access, new_refresh)
+    return resp
+
 @router.post("/logout")
-def logout():
+async def logout(
+    refresh: str | None = Cookie(default=None, alias=REFRESH_COOKIE),
+    db: AsyncSession = Depends(get_db),
+):
+    await end_session(db, refresh)
+    resp = JSONResponse({"ok": True})
+    clear_session_cookies(resp)
+    return resp
+
+@router.post("/logout-all")
+async def logout_all(user: CachedUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Sign out every device: revokes all of the user's refresh tokens."""
+    await end_all_sessions(db, user.id)
     resp = JSONResponse({"ok": True})
-    resp.delete_cookie("session", path="/")
+    clear_session_cookies(resp)
     return resp
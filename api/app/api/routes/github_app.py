@@ -1,21 +1,35 @@
-import os
-import time
+import asyncio
+import base64
+import json
 import secrets
-import httpx
-import jwt  # pyjwt
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import RedirectResponse, JSONResponse
+from collections import OrderedDict
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, or_, select, tuple_
 
+from app.api.responses import cached_json_response, json_bytes
 from app.core.config import settings
 from app.core.db import get_db
+from app.core.user_cache import CachedUser, user_cache
 from app.models.user import User
+from app.models.repository import Repository
+from app.github.repos import fetch_all_repos, fetch_repos_page, iter_remaining_pages, parse_fields, project_repos
+from app.github.sync import ensure_synced, schedule_sync
+from app.github.tokens import get_installation_token
+from app.ingest.symbol_index import index_path, symbol_indexes
+from app.ingest.symbols import KINDS
+from app.ingest.sync import ingestor, last_ingested_sha
+from app.ingest.vectors import vector_indexes, vectors_path
+from app.jobs.queue import INTERACTIVE, enqueue, job_dict
 
 # IMPORTANT: reuse your existing auth dependency.
 # This should return the current User from your JWT.
 # If yours is named differently, swap it here.
-from app.api.deps import get_current_user
+from app.api.deps import admission, get_current_user
 
 router = APIRouter(prefix="/github/app", tags=["github-app"])
 
@@ -23,53 +37,8 @@ CONNECT_COOKIE = "gh_connect"
 CONNECT_MAX_AGE = 10 * 60  # 10 minutes
 
 
-def _read_private_key() -> str:
-    path = settings.GITHUB_APP_PRIVATE_KEY_PATH
-    if not path:
-        raise HTTPException(503, "Missing GITHUB_APP_PRIVATE_KEY_PATH")
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        raise HTTPException(503, f"Private key not found at {path}")
-
-
-def _make_app_jwt() -> str:
-    app_id = settings.GITHUB_APP_ID
-    if not app_id:
-        raise HTTPException(503, "Missing GITHUB_APP_ID")
-
-    private_key = _read_private_key()
-    now = int(time.time())
-    payload = {
-        "iat": now - 30,
-        "exp": now + 9 * 60,  # must be <= 10 minutes
-        "iss": app_id,
-    }
-    return jwt.encode(payload, private_key, algorithm="RS256")
-
-
-async def _mint_installation_token(installation_id: int) -> str:
-    app_jwt = _make_app_jwt()
-    url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
-
-    async with httpx.AsyncClient(timeout=20) as client:
-        r = await client.post(
-            url,
-            headers={
-                "Authorization": f"Bearer {app_jwt}",
-                "Accept": "application/vnd.github+json",
-            },
-        )
-
-    if r.status_code >= 400:
-        raise HTTPException(r.status_code, f"Failed to mint installation token: {r.text}")
-
-    return r.json()["token"]
-
-
-@router.post("/start")
-async def start_connect_github(current_user: User = Depends(get_current_user)):
+@router.post("/start", dependencies=[Depends(admission("github_connect"))])
+async def start_connect_github(current_user: CachedUser = Depends(get_current_user)):
     """
     Called by frontend with Authorization header.
     Sets a short-lived httpOnly cookie so callback can link installation_id to this user.
@@ -85,7 +54,7 @@ async def start_connect_github(current_user: User = Depends(get_current_user)):
 
     resp = JSONResponse(
         {
-            "install_url": f"https://github.com/apps/{slug}/installations/new"
+            "install_url": f"{settings.GITHUB_WEB_URL}/apps/{slug}/installations/new"
         }
     )
     resp.set_cookie(
@@ -99,7 +68,7 @@ async def start_connect_github(current_user: User = Depends(get_current_user)):
     return resp
 
 
-@router.get("/callback")
+@router.get("/callback", dependencies=[Depends(admission("github_connect"))])
 async def github_app_callback(
     request: Request,
     installation_id: int | None = None,
@@ -129,35 +98,335 @@ async def github_app_callback(
 
     user.github_installation_id = installation_id
     await db.commit()
+    user_cache.invalidate(user.id)
+    schedule_sync(installation_id)
 
     resp = RedirectResponse(settings.FRONTEND_URL + "/")
     resp.delete_cookie(CONNECT_COOKIE, path="/api/v1/github/app")
     return resp
 
 
-@router.get("/repos")
+@router.get("/repos", dependencies=[Depends(admission("github_repos"))])
 async def list_repos(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    stream: bool = False,
+    fields: str | None = Query(default=None, max_length=500),
+    current_user: CachedUser = Depends(get_current_user),
+):
+    """
+    All repositories visible to the user's installation, projected to
+    `fields` (comma-separated; default: id, name, full_name, description,
+    language, visibility, updated_at).
+
+    The plain response is ETag'd (304 when unchanged) and compressed when
+    large. With ?stream=true it is NDJSON instead, one line per GitHub page
+    ({"page", "total_count", "repositories"}), written as each page arrives.
+    """
+    if not current_user.github_installation_id:
+        raise HTTPException(400, "GitHub App not connected yet.")
+
+    projection = parse_fields(fields)
+    installation_id = current_user.github_installation_id
+    token = await get_installation_token(installation_id)
+
+    if not stream:
+        data = await fetch_all_repos(installation_id, token)
+        body = json_bytes({
+            "total_count": data["total_count"],
+            "repositories": project_repos(data["repositories"], projection),
+        })
+        # private: per-user; no-cache: always revalidate, so new repositories show up
+        return cached_json_response(request, body, {"Cache-Control": "private, no-cache"})
+
+    # Fetch page 1 up front so auth/permission errors still get a real status code.
+    first = await fetch_repos_page(installation_id, token, 1)
+    total_count = first.get("total_count", 0)
+
+    async def ndjson():
+        yield _ndjson_line({
+            "page": 1,
+            "total_count": total_count,
+            "repositories": project_repos(first.get("repositories", []), projection),
+        })
+        try:
+            async for page, data in iter_remaining_pages(installation_id, token, total_count):
+                yield _ndjson_line({
+                    "page": page,
+                    "total_count": total_count,
+                    "repositories": project_repos(data.get("repositories", []), projection),
+                })
+        except HTTPException as e:
+            # Headers are already sent; report the failure in-band.
+            yield _ndjson_line({"error": e.detail, "status": e.status_code})
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def _ndjson_line(obj: dict) -> bytes:
+    return json_bytes(obj) + b"\n"
+
+
+def _encode_cursor(sort_value, row_id: int) -> str:
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+@router.get("/repositories")
+async def search_repositories(
+    q: str | None = Query(default=None, max_length=200),
+    language: str | None = Query(default=None, max_length=64),
+    sort: Literal["name", "updated"] = "name",
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = None,
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
+    """
+    Server-side search over the stored copy of the installation's repositories.
+    Keyset-paginated: pass back `next_cursor` to get the following page.
+    """
     if not current_user.github_installation_id:
         raise HTTPException(400, "GitHub App not connected yet.")
 
-    token = await _mint_installation_token(current_user.github_installation_id)
+    installation_id = current_user.github_installation_id
+    await ensure_synced(db, installation_id)
+
+    stmt = select(
+        Repository.id,
+        Repository.github_id,
+        Repository.name,
+        Repository.full_name,
+        Repository.description,
+        Repository.language,
+        Repository.private,
+        Repository.visibility,
+        Repository.html_url,
+        Repository.stargazers_count,
+        Repository.forks_count,
+        Repository.updated_at,
+    ).where(Repository.installation_id == installation_id)
 
-    async with httpx.AsyncClient(timeout=20) as client:
-        r = await client.get(
-            "https://api.github.com/installation/repositories?per_page=100",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/vnd.github+json",
-            },
+    if q and q.strip():
+        pattern = "%" + q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        stmt = stmt.where(
+            or_(
+                Repository.full_name.ilike(pattern, escape="\\"),
+                Repository.description.ilike(pattern, escape="\\"),
+                Repository.language.ilike(pattern, escape="\\"),
+            )
         )
+    if language:
+        stmt = stmt.where(func.lower(Repository.language) == language.lower())
 
-    if r.status_code >= 400:
-        raise HTTPException(r.status_code, r.text)
+    if sort == "name":
+        sort_key = func.lower(Repository.full_name)
+        if cursor:
+            value, row_id = _decode_cursor(cursor)
+            stmt = stmt.where(tuple_(sort_key, Repository.id) > tuple_(value, row_id))
+        stmt = stmt.order_by(sort_key, Repository.id)
+    else:
+        if cursor:
+            value, row_id = _decode_cursor(cursor)
+            try:
+                value = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                raise HTTPException(400, "Invalid cursor")
+            stmt = stmt.where(tuple_(Repository.updated_at, Repository.id) < tuple_(value, row_id))
+        stmt = stmt.order_by(Repository.updated_at.desc(), Repository.id.desc())
+
+    # one extra row tells us whether there is a next page
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        sort_value = last.full_name.lower() if sort == "name" else last.updated_at.isoformat()
+        next_cursor = _encode_cursor(sort_value, last.id)
 
-    data = r.json()
     return {
-        "total_count": data.get("total_count", 0),
-        "repositories": data.get("repositories", []),
+        "repositories": [
+            {
+                "id": r.github_id,
+                "name": r.name,
+                "full_name": r.full_name,
+                "description": r.description,
+                "language": r.language,
+                "private": r.private,
+                "visibility": r.visibility,
+                "html_url": r.html_url,
+                "stargazers_count": r.stargazers_count,
+                "forks_count": r.forks_count,
+                "updated_at": r.updated_at.isoformat() + "Z",
+            }
+            for r in rows
+        ],
+        "next_cursor": next_cursor,
     }
+
+
+async def _installation_repository(db: AsyncSession, installation_id: int, repo_id: int) -> Repository:
+    repo = (
+        await db.execute(
+            select(Repository).where(
+                Repository.installation_id == installation_id,
+                Repository.github_id == repo_id,
+            )
+        )
+    ).scalar_one_or_none()
+    if repo is None:
+        raise HTTPException(404, "Repository not found in this installation")
+    return repo
+
+
+@router.post("/repositories/{repo_id}/ingest", status_code=202, dependencies=[Depends(admission("ingest"))])
+async def ingest_repository(
+    repo_id: int,
+    idempotency_key: str | None = Header(default=None, max_length=200),
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Start downloading a snapshot of the repository's default branch. With
+    JOBS_ENABLED this enqueues a job for the workers and returns it; follow
+    it at `events` (SSE). Otherwise it runs in this process and joins a run
+    already in progress.
+    """
+    if not current_user.github_installation_id:
+        raise HTTPException(400, "GitHub App not connected yet.")
+
+    installation_id = current_user.github_installation_id
+    await ensure_synced(db, installation_id)
+    repo = await _installation_repository(db, installation_id, repo_id)
+
+    if settings.JOBS_ENABLED:
+        job, _ = await enqueue(
+            "ingest_repository",
+            {"installation_id": installation_id, "full_name": repo.full_name},
+            priority=INTERACTIVE,
+            # Scoped to the user, so one user's key can't return another's job.
+            idempotency_key=f"ingest:{current_user.id}:{idempotency_key}" if idempotency_key else None,
+            user_id=current_user.id,
+        )
+        return {**job_dict(job), "events": f"/api/v1/jobs/{job.id}/events"}
+
+    ingestor.schedule(installation_id, repo.full_name)
+    return ingestor.status(installation_id, repo.full_name)
+
+
+@router.get("/repositories/{repo_id}/ingest")
+async def ingest_status(
+    repo_id: int,
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if not current_user.github_installation_id:
+        raise HTTPException(400, "GitHub App not connected yet.")
+
+    repo = await _installation_repository(db, current_user.github_installation_id, repo_id)
+    status = ingestor.status(current_user.github_installation_id, repo.full_name)
+    if status is None:
+        # Nothing in this process yet; fall back to what was recorded by any worker.
+        commit_sha = await last_ingested_sha(current_user.github_installation_id, repo.full_name)
+        if commit_sha is None:
+            raise HTTPException(404, "Repository has not been ingested")
+        status = {"status": "done", "commit_sha": commit_sha}
+    return status
+
+
+# (installation id, GitHub repo id) -> full_name, so symbol queries skip the DB.
+_repo_names: OrderedDict[tuple[int, int], str] = OrderedDict()
+_REPO_NAMES_MAX = 4096
+
+
+async def _repo_full_name(current_user: CachedUser, repo_id: int, db: AsyncSession) -> tuple[int, str]:
+    if not current_user.github_installation_id:
+        raise HTTPException(400, "GitHub App not connected yet.")
+
+    key = (current_user.github_installation_id, repo_id)
+    full_name = _repo_names.get(key)
+    if full_name is None:
+        full_name = (await _installation_repository(db, *key)).full_name
+        _repo_names[key] = full_name
+        while len(_repo_names) > _REPO_NAMES_MAX:
+            _repo_names.popitem(last=False)
+    return current_user.github_installation_id, full_name
+
+
+async def _symbol_index(current_user: CachedUser, repo_id: int, db: AsyncSession):
+    index = symbol_indexes.get(index_path(*await _repo_full_name(current_user, repo_id, db)))
+    if index is None:
+        raise HTTPException(404, "Repository has not been indexed; ingest it first")
+    return index
+
+
+@router.get("/repositories/{repo_id}/symbols")
+async def list_symbols(
+    repo_id: int,
+    path: str | None = Query(default=None, max_length=1024),
+    kind: Literal[KINDS] | None = None,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Symbols in file/line order, optionally under a path prefix and of one kind."""
+    index = await _symbol_index(current_user, repo_id, db)
+    symbols = index.listing(path, kind, offset, limit)
+    return {
+        "commit_sha": index.commit_sha,
+        "symbols": symbols,
+        "next_offset": offset + len(symbols) if len(symbols) == limit else None,
+    }
+
+
+@router.get("/repositories/{repo_id}/symbols/summary")
+async def symbols_summary(
+    repo_id: int,
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return (await _symbol_index(current_user, repo_id, db)).summary()
+
+
+@router.get("/repositories/{repo_id}/symbols/lookup")
+async def lookup_symbols(
+    repo_id: int,
+    name: str = Query(min_length=1, max_length=256),
+    prefix: bool = False,
+    kind: Literal[KINDS] | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Symbols by (case-insensitive) short name, e.g. `handle` finds `Service.handle`."""
+    index = await _symbol_index(current_user, repo_id, db)
+    return {"commit_sha": index.commit_sha, "symbols": index.lookup(name, prefix, kind, limit)}
+
+
+@router.get("/repositories/{repo_id}/search")
+async def search_code(
+    repo_id: int,
+    q: str = Query(min_length=1, max_length=512),
+    k: int = Query(default=10, ge=1, le=100),
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Functions/chunks most similar to `q` (e.g. an interview topic), best first."""
+    # Leased: other requests may evict or replace the index while the thread scores.
+    with vector_indexes.lease(vectors_path(*await _repo_full_name(current_user, repo_id, db))) as index:
+        if index is None:
+            raise HTTPException(404, "Repository has not been indexed; ingest it first")
+        # Scoring is one vectorised pass, but over a large repo it's still worth keeping off the loop.
+        (results,) = await asyncio.to_thread(index.search, [q], k)
+    return {"commit_sha": index.commit_sha, "results": results}
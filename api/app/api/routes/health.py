@@ -1,7 +1,69 @@
-from fastapi import APIRouter
+import secrets
+
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import JSONResponse
+
+from app.api.routes.profiles import require_profile_token
+
+from app.core.admission import admission_control
+from app.core.config import settings
+from app.core.db import db_pool_stats
+from app.core.profiling import profiler
+from app.core.sessions import session_stats
+from app.core.user_cache import user_cache
+from app.core.warmup import warmup
+from app.github.app_jwt import app_jwt_signer
+from app.github.etag_cache import github_get_cache
+from app.github.scheduler import scheduler
+from app.github.tokens import installation_tokens
+from app.ingest.symbol_index import symbol_indexes
+from app.ingest.sync import ingestor
+from app.ingest.vectors import vector_indexes
+from app.interview.session import interview_sessions
+from app.jobs.events import progress_events
 
 router = APIRouter()
 
 @router.get("/healthz")
 def healthz():
+    """Liveness only: the process is serving. Dependencies are /readyz's job."""
     return {"ok": True}
+
+@router.get("/readyz")
+async def readyz():
+    ready, body = await warmup.readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+def require_stats_access(
+    x_profile_token: str | None = Header(default=None),
+    authorization: str | None = Header(default=None),
+) -> None:
+    """Internal counters aren't for the public: the profiling token unlocks them, or METRICS_TOKEN for scrapers."""
+    if settings.STATS_PUBLIC:
+        return
+    if settings.METRICS_TOKEN and authorization is not None:
+        expected = f"Bearer {settings.METRICS_TOKEN}".encode()
+        if secrets.compare_digest(authorization.encode(), expected):
+            return
+    require_profile_token(x_profile_token)
+
+
+@router.get("/stats", dependencies=[Depends(require_stats_access)])
+def stats():
+    return {
+        "installation_tokens": installation_tokens.stats(),
+        "app_jwt": app_jwt_signer.stats(),
+        "github_get_cache": github_get_cache.stats(),
+        "users": user_cache.stats(),
+        "sessions": session_stats.stats(),
+        "db_pool": db_pool_stats(),
+        "github_scheduler": scheduler.stats(),
+        "ingest": ingestor.stats(),
+        "symbol_indexes": symbol_indexes.stats(),
+        "vector_indexes": vector_indexes.stats(),
+        "job_events": progress_events.stats(),
+        "interview_sessions": interview_sessions.stats(),
+        "warmup": warmup.stats(),
+        "profiler": profiler.stats(),
+        "admission": admission_control.stats(),
+    }
@@ -0,0 +1,111 @@
+import json
+import time
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+
+from app.api.deps import get_websocket_user
+from app.core.config import settings
+from app.interview.session import InterviewSession, SessionLimit, UserSessionLimit, interview_sessions
+
+router = APIRouter(tags=["interview"])
+
+# Application close codes (4000-4999); the browser sees these in CloseEvent.code.
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_UNKNOWN_SESSION = 4404
+CLOSE_REPLACED = 4409
+CLOSE_TOO_MANY_SESSIONS = 4429  # this user's other sessions are all connected
+CLOSE_OVERLOADED = 1013  # "try again later"
+MAX_TOPIC_CHARS = 200
+
+
+@router.websocket("/interview/ws")
+async def interview_ws(websocket: WebSocket):
+    """
+    One interview session per connection; see app/interview/session.py for
+    the protocol. Authenticated by the same `session` cookie as the HTTP
+    API, which is also why cross-site origins are refused: browsers send
+    cookies on cross-origin WebSocket handshakes.
+    """
+    origin = websocket.headers.get("origin")
+    if origin is not None and origin != settings.FRONTEND_URL:
+        await websocket.close(code=1008)
+        return
+    try:
+        user = await get_websocket_user(websocket)
+    except HTTPException:
+        await websocket.accept()
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason="Not authenticated")
+        return
+
+    await websocket.accept()
+    session: InterviewSession | None = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if session is not None:
+                session.last_recv = time.monotonic()
+            try:
+                frame = json.loads(message.get("text") or "")
+                kind = frame["type"]
+                seq = int(frame.get("seq") or frame.get("last_seq") or 0)
+            except (ValueError, TypeError, KeyError, AttributeError):
+                await _send_error(websocket, session, "Expected a JSON object with a type.")
+                continue
+
+            if kind == "ack" and session is not None:
+                session.ack(seq)
+            elif kind == "answer" and session is not None:
+                session.answer(str(frame.get("text", "")))
+            elif kind == "answer_end" and session is not None:
+                session.answer_end()
+            elif kind == "ping":
+                if session is not None and session.ws is websocket:
+                    session.control({"type": "pong"})
+                else:
+                    await websocket.send_text('{"type":"pong"}')
+            elif kind == "pong":
+                pass
+            elif kind == "start" and session is None:
+                topic = str(frame.get("topic") or "your last project")[:MAX_TOPIC_CHARS]
+                try:
+                    session = interview_sessions.create(user.id, topic)
+                except UserSessionLimit:
+                    await websocket.close(code=CLOSE_TOO_MANY_SESSIONS, reason="Too many sessions for this user")
+                    return
+                except SessionLimit:
+                    await websocket.close(code=CLOSE_OVERLOADED, reason="Too many sessions")
+                    return
+                session.attach(websocket)
+            elif kind == "resume" and session is None:
+                session = interview_sessions.get(str(frame.get("session_id", "")), user.id)
+                if session is None:
+                    await websocket.close(code=CLOSE_UNKNOWN_SESSION, reason="Unknown or expired session")
+                    return
+                previous = session.ws
+                session.attach(websocket, seq)
+                interview_sessions.resumed += 1
+                session.control({"type": "resumed", **session.state()})
+                if previous is not None:
+                    # A reconnect beat the old socket's timeout; that one is done.
+                    try:
+                        await previous.close(code=CLOSE_REPLACED, reason="Resumed elsewhere")
+                    except Exception:
+                        pass
+            else:
+                await _send_error(websocket, session, f"Unexpected {kind!r} frame.")
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        if session is not None:
+            session.detach(websocket)
+
+
+async def _send_error(websocket: WebSocket, session: InterviewSession | None, message: str) -> None:
+    """While the session's sender owns the socket, frames go through its queue so writes never interleave."""
+    frame = {"type": "error", "message": message}
+    if session is not None and session.ws is websocket:
+        session.control(frame)
+    else:
+        await websocket.send_text(json.dumps(frame))
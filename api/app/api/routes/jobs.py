@@ -0,0 +1,69 @@
+import json
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.user_cache import CachedUser
+from app.jobs.events import progress_events
+from app.jobs.queue import FINISHED, get_job, job_dict
+from app.models.job import Job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+async def _own_job(job_id: int, current_user: CachedUser) -> Job:
+    job = await get_job(job_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+@router.get("/{job_id}")
+async def job_status(job_id: int, current_user: CachedUser = Depends(get_current_user)):
+    return job_dict(await _own_job(job_id, current_user))
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: int, request: Request, current_user: CachedUser = Depends(get_current_user)):
+    """
+    Server-Sent Events: a `progress` event whenever the job changes, then
+    `done` once it has succeeded or failed for good. Works with a plain
+    EventSource (the session cookie authenticates it).
+
+    The stream holds no DB connection while idle: each change is a NOTIFY
+    from the worker that triggers one primary-key read.
+    """
+    await _own_job(job_id, current_user)
+
+    async def stream():
+        last_seen, last_sent = None, time.monotonic()
+        with progress_events.subscribe(str(job_id)) as changed:
+            while True:
+                job = await get_job(job_id)
+                if job is None:
+                    yield "event: gone\ndata: {}\n\n"
+                    return
+                if job.updated_at != last_seen:
+                    last_seen = job.updated_at
+                    event = "done" if job.status in FINISHED else "progress"
+                    data = json.dumps(job_dict(job), separators=(",", ":"))
+                    yield f"event: {event}\ndata: {data}\n\n"
+                    last_sent = time.monotonic()
+                    if event == "done":
+                        return
+                if await request.is_disconnected():
+                    return
+                await progress_events.wait(changed, settings.JOBS_SSE_KEEPALIVE_SECONDS)
+                # Without LISTEN the wait above is a short poll; don't send a comment every time.
+                if time.monotonic() - last_sent >= settings.JOBS_SSE_KEEPALIVE_SECONDS:
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
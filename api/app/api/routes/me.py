@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends
 from app.api.deps import get_current_user
-from app.models.user import User
+from app.core.user_cache import CachedUser
 
 router = APIRouter()
 
 @router.get("/me")
-async def me(user: User = Depends(get_current_user)):
+async def me(user: CachedUser = Depends(get_current_user)):
     return {
         "id": user.id,
         "github_id": user.github_id,
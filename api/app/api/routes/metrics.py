@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.api.routes.health import require_stats_access
+
+from app.core.admission import admission_control
+from app.core.db import db_pool_stats
+from app.core.metrics import registry
+from app.core.profiling import profiler
+from app.core.sessions import session_stats
+from app.core.user_cache import user_cache
+from app.core.warmup import warmup
+from app.github.app_jwt import app_jwt_signer
+from app.github.etag_cache import github_get_cache
+from app.github.scheduler import scheduler
+from app.github.tokens import installation_tokens
+from app.ingest.symbol_index import symbol_indexes
+from app.ingest.sync import ingestor
+from app.ingest.vectors import vector_indexes
+from app.interview.session import interview_sessions
+from app.jobs.events import progress_events
+
+router = APIRouter()
+
+registry.collect_stats("installation_token_cache", "Installation token cache stats", installation_tokens.stats)
+registry.collect_stats("github_get_cache", "GitHub conditional GET cache stats", github_get_cache.stats)
+registry.collect_stats("app_jwt", "GitHub App JWT signer stats", app_jwt_signer.stats)
+registry.collect_stats("user_cache", "Authenticated user cache stats", user_cache.stats)
+registry.collect_stats("sessions", "Login session and refresh token stats", session_stats.stats)
+registry.collect_stats("github_scheduler", "GitHub request scheduler stats", scheduler.stats)
+registry.collect_stats("db_pool", "DB connection pool stats", db_pool_stats)
+registry.collect_stats("ingest", "Repository ingestion stats", ingestor.stats)
+registry.collect_stats("symbol_indexes", "Open symbol index stats", symbol_indexes.stats)
+registry.collect_stats("vector_indexes", "Open code search index stats", vector_indexes.stats)
+registry.collect_stats("job_events", "Job progress LISTEN connection stats", progress_events.stats)
+registry.collect_stats("interview", "WebSocket interview session stats", interview_sessions.stats)
+registry.collect_stats("warmup", "Startup warmup timings", warmup.stats)
+registry.collect_stats("profiler", "Opt-in request profiler stats", profiler.stats)
+registry.collect_stats("admission", "Rate limiting and load shedding stats", admission_control.stats)
+
+# The collected stats are the same internal counters as /api/v1/stats, so the same access rules.
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_stats_access)])
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
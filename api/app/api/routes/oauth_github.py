@@ -1,26 +1,53 @@
+import asyncio
+import logging
 import secrets
+import time
+from contextlib import contextmanager
+
 import httpx
-from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Request, HTTPException, Depends
 from fastapi.responses import RedirectResponse
 
 from app.core.config import settings
 from app.core.db import get_db
-from app.core.security import create_access_token
+from app.core.metrics import oauth_callback_stages, oauth_installations_linked
+from app.core.user_cache import user_cache
+from app.github.scheduler import scheduler
+from app.github.sync import schedule_sync
+from app.api.deps import admission
+from app.api.routes.auth import upsert_github_identity
+from app.core.sessions import set_session_cookies, start_session
 from app.models.user import User
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-AUTHORIZE_URL = "https://github.com/login/oauth/authorize"
-TOKEN_URL = "https://github.com/login/oauth/access_token"
-USER_URL = "https://api.github.com/user"
+AUTHORIZE_URL = f"{settings.GITHUB_WEB_URL}/login/oauth/authorize"
+TOKEN_URL = f"{settings.GITHUB_WEB_URL}/login/oauth/access_token"
+USER_URL = f"{settings.GITHUB_API_URL}/user"
+INSTALLATIONS_URL = f"{settings.GITHUB_API_URL}/user/installations"
+
+def _uses_app_credentials() -> bool:
+    """
+    Sign-in goes through the GitHub App's own client when it is configured.
+    Only its user-to-server tokens can call /user/installations; an OAuth
+    App token gets 403 there, so with GITHUB_CLIENT_ID alone the callback
+    skips the lookup and users link their installation through
+    /github/app/start.
+    """
+    return bool(settings.GITHUB_APP_CLIENT_ID and settings.GITHUB_APP_CLIENT_SECRET)
 
-SESSION_COOKIE = "session"
 
 def _get_github_config():
-    client_id = settings.GITHUB_CLIENT_ID
-    client_secret = settings.GITHUB_CLIENT_SECRET
+    if _uses_app_credentials():
+        client_id = settings.GITHUB_APP_CLIENT_ID
+        client_secret = settings.GITHUB_APP_CLIENT_SECRET
+    else:
+        client_id = settings.GITHUB_CLIENT_ID
+        client_secret = settings.GITHUB_CLIENT_SECRET
     redirect_uri = settings.GITHUB_REDIRECT_URI
     if not client_id or not client_secret or not redirect_uri:
         raise HTTPException(status_code=503, detail="GitHub OAuth is not configured")
@@ -35,8 +62,10 @@ def github_login():
         "client_id": client_id,
         "redirect_uri": redirect_uri,
         "state": state,
-        "scope": "read:user user:email",
     }
+    if not _uses_app_credentials():
+        # GitHub Apps ignore scopes; their permissions come from the app settings.
+        params["scope"] = "read:user user:email"
 
     authorize_url = httpx.URL(AUTHORIZE_URL).copy_merge_params(params)
     resp = RedirectResponse(str(authorize_url))
@@ -52,7 +81,7 @@ def github_login():
     )
     return resp
 
-@router.get("/auth/github/callback")
+@router.get("/auth/github/callback", dependencies=[Depends(admission("oauth_callback"))])
 async def github_callback(
     request: Request,
     code: str | None = None,
@@ -68,8 +97,12 @@ async def github_callback(
 
     client_id, client_secret, redirect_uri = _get_github_config()
 
-    async with httpx.AsyncClient(timeout=15) as client:
-        token_resp = await client.post(
+    timings = _StageTimer()
+
+    # User-token calls: no shared quota to track, but rate limits are still retried.
+    with timings.stage("exchange"):
+        token_resp = await scheduler.request(
+            "POST",
             TOKEN_URL,
             headers={"Accept": "application/json"},
             json={
@@ -84,10 +117,16 @@ async def github_callback(
         if not access_token:
             raise HTTPException(status_code=400, detail="No access token returned by GitHub")
 
-        user_resp = await client.get(
-            USER_URL,
-            headers={"Authorization": f"Bearer {access_token}", "Accept": "application/json"},
-        )
+    # Both only need the access token, so they go out together.
+    headers = {"Authorization": f"Bearer {access_token}", "Accept": "application/json"}
+    with timings.stage("github"):
+        calls = [scheduler.request("GET", USER_URL, headers=headers)]
+        if _uses_app_credentials():
+            calls.append(scheduler.request("GET", INSTALLATIONS_URL, headers=headers, params={"per_page": 100}))
+        user_resp, *rest = await asyncio.gather(*calls, return_exceptions=True)
+        installations_resp = rest[0] if rest else None
+        if isinstance(user_resp, BaseException):
+            raise user_resp
         user_resp.raise_for_status()
         gh = user_resp.json()
 
@@ -95,37 +134,70 @@ async def github_callback(
     username = gh["login"]
     avatar_url = gh.get("avatar_url")
 
-    stmt = select(User).where(User.github_id == github_id)
-    user = (await db.execute(stmt)).scalar_one_or_none()
+    with timings.stage("upsert"):
+        user_id, _ = await upsert_github_identity(db, github_id, username, avatar_url)
 
-    if not user:
-        user = User(github_id=github_id, username=username, avatar_url=avatar_url)
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
-    else:
-        changed = False
-        if user.username != username:
-            user.username = username
-            changed = True
-        if user.avatar_url != avatar_url:
-            user.avatar_url = avatar_url
-            changed = True
-        if changed:
-            await db.commit()
-
-    jwt = create_access_token(subject=str(user.id))
+    if installations_resp is not None:
+        with timings.stage("link"):
+            installation_id = _own_installation(installations_resp, gh["id"])
+            if installation_id is not None:
+                await _link_installation(db, user_id, installation_id)
+
+    with timings.stage("session"):
+        access, refresh = await start_session(db, user_id)
 
     resp = RedirectResponse(url=f"{settings.FRONTEND_URL}/", status_code=302)
     resp.delete_cookie("oauth_state", path="/auth/github")
+    set_session_cookies(resp, access, refresh)
+    resp.headers["Server-Timing"] = timings.header()
+    return resp
 
-    resp.set_cookie(
-        key=SESSION_COOKIE,
-        value=jwt,
-        httponly=True,
-        samesite="lax",
-        secure=settings.COOKIE_SECURE,
-        max_age=60 * 60 * 24 * 7,
-        path="/",
+
+class _StageTimer:
+    """Per-stage durations: observed into oauth_callback_stage_seconds and echoed as Server-Timing."""
+
+    def __init__(self):
+        self.stages: list[tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages.append((name, elapsed))
+            oauth_callback_stages.observe(elapsed, name)
+
+    def header(self) -> str:
+        return ", ".join(f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in self.stages)
+
+
+def _own_installation(resp, github_user_id: int) -> int | None:
+    """
+    The installation of our app to link automatically: the one on the user's
+    own account, else the only one they can see. Several org installations
+    are ambiguous and left to the explicit install flow, as is any failure.
+    """
+    if isinstance(resp, BaseException) or resp.status_code != 200:
+        logger.warning("Listing user installations failed: %r", resp if isinstance(resp, BaseException) else resp.status_code)
+        return None
+    ours = [i for i in resp.json().get("installations", []) if i.get("app_id") == settings.GITHUB_APP_ID]
+    for installation in ours:
+        if (installation.get("account") or {}).get("id") == github_user_id:
+            return installation["id"]
+    return ours[0]["id"] if len(ours) == 1 else None
+
+
+async def _link_installation(db: AsyncSession, user_id: int, installation_id: int) -> None:
+    # Only fills an empty slot: a choice made through the install flow wins.
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id, User.github_installation_id.is_(None))
+        .values(github_installation_id=installation_id)
     )
-    return resp
+    await db.commit()
+    if result.rowcount:
+        oauth_installations_linked.inc()
+        user_cache.invalidate(user_id)
+        schedule_sync(installation_id)
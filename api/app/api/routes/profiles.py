@@ -0,0 +1,50 @@
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+
+from app.core.profiling import collapsed, profiler, valid_profile_token
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+def require_profile_token(x_profile_token: str | None = Header(default=None)) -> None:
+    """The same token that turns profiling on for a request; `python -m app.core.profiling token` mints one."""
+    if not valid_profile_token(x_profile_token):
+        raise HTTPException(401, "Missing or invalid X-Profile-Token")
+
+
+class ProfilingSettings(BaseModel):
+    sample_one_in: int = Field(ge=0)  # 0 turns sampling off
+    path_prefix: str = "/"
+
+
+@router.get("", dependencies=[Depends(require_profile_token)])
+def list_profiles():
+    return {
+        "sample_one_in": profiler.sample_one_in,
+        "path_prefix": profiler.path_prefix,
+        "captures": profiler.captures(),
+    }
+
+
+@router.put("/settings", dependencies=[Depends(require_profile_token)])
+def update_settings(body: ProfilingSettings):
+    """Per process: with several workers, each one needs the call (or set PROFILING_SAMPLE_ONE_IN)."""
+    profiler.configure(body.sample_one_in, body.path_prefix)
+    return {"sample_one_in": profiler.sample_one_in, "path_prefix": profiler.path_prefix}
+
+
+@router.get("/{capture_id}", dependencies=[Depends(require_profile_token)])
+def download_profile(capture_id: str, format: str = "speedscope"):
+    """`speedscope` opens at speedscope.app; `collapsed` feeds flamegraph.pl / inferno."""
+    path = profiler.capture_path(capture_id)
+    if path is None:
+        raise HTTPException(404, "Profile not found")
+    if format == "speedscope":
+        return FileResponse(path, media_type="application/json", filename=f"{capture_id}.speedscope.json")
+    if format == "collapsed":
+        with open(path) as f:
+            return PlainTextResponse(collapsed(json.load(f)))
+    raise HTTPException(400, "format must be speedscope or collapsed")
@@ -0,0 +1,46 @@
+import hashlib
+import json
+
+from fastapi import APIRouter, Depends, Request, Response
+
+from app.api.deps import get_optional_user
+from app.core.user_cache import CachedUser
+
+router = APIRouter()
+
+@router.get("/session")
+async def session(
+    request: Request,
+    user: CachedUser | None = Depends(get_optional_user),
+):
+    """
+    Everything the frontend needs to decide where to route a page view:
+    who the user is and whether the GitHub App is connected. Answered from
+    our own data only (no GitHub calls), and ETag'd so repeat checks are 304s.
+    """
+    if user is None:
+        body = {"authenticated": False, "user": None, "app_connected": False}
+    else:
+        body = {
+            "authenticated": True,
+            "user": {
+                "id": user.id,
+                "github_id": user.github_id,
+                "username": user.username,
+                "avatar_url": user.avatar_url,
+            },
+            "app_connected": user.github_installation_id is not None,
+        }
+
+    payload = json.dumps(body, separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+    headers = {
+        "ETag": etag,
+        # private: per-user; no-cache: always revalidate, so connecting the app shows up immediately
+        "Cache-Control": "private, no-cache",
+        "Vary": "Cookie",
+    }
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(payload, media_type="application/json", headers=headers)
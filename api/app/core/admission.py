@@ -0,0 +1,117 @@
+"""
+Admission control for the routes that fan out to GitHub and the DB.
+
+Two checks, run before anything else on those routes (see
+app.api.deps.admission):
+
+- Load shedding: while the DB pool has a checkout waiting longer than
+  SHED_DB_POOL_WAIT_MS, or more than SHED_GITHUB_OUTBOUND GitHub calls
+  are in flight or queued in the scheduler, new requests get 503 with
+  Retry-After instead of joining a queue that only makes everyone slower.
+- Rate limiting: a token bucket per (route, user id), or per client IP
+  when signed out. Limits are "<requests>/<seconds>": a burst of
+  <requests>, refilled evenly over <seconds>. Going over gives 429 with
+  Retry-After set to when the next token is due.
+
+Both are per process; with several workers the effective limit is the sum.
+"""
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.db import pool_stats
+from app.core.metrics import admission_rejections
+from app.github import client as github_client
+from app.github.scheduler import scheduler
+
+# Overridden per route by settings.RATE_LIMITS.
+DEFAULT_RATE_LIMITS = {
+    "github_repos": "30/60",  # /github/app/repos: a page load makes one call
+    "github_connect": "10/60",  # /github/app/start and its callback
+    "ingest": "10/60",
+    "oauth_callback": "10/60",
+    "dev_login": "10/60",
+}
+
+
+def parse_limit(spec: str) -> tuple[float, float]:
+    """"30/60" -> (burst 30, refill 0.5 per second)."""
+    requests, _, seconds = spec.partition("/")
+    burst, period = float(requests), float(seconds or 1)
+    if burst <= 0 or period <= 0:
+        raise ValueError(f"bad rate limit {spec!r}")
+    return burst, burst / period
+
+
+class AdmissionControl:
+    def __init__(self, limits: dict[str, str], max_keys: int):
+        self.limits = {route: parse_limit(spec) for route, spec in {**DEFAULT_RATE_LIMITS, **limits}.items()}
+        self.max_keys = max_keys
+        # (route, key) -> [tokens, updated]; least recently used first
+        self._buckets: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+
+    def overload(self) -> str | None:
+        """Why new work should be turned away right now, or None."""
+        threshold = settings.SHED_DB_POOL_WAIT_MS / 1000
+        if threshold > 0 and pool_stats.current_wait() > threshold:
+            return "db_pool"
+        limit = settings.SHED_GITHUB_OUTBOUND
+        if limit > 0 and github_client.in_flight() + scheduler.waiting > limit:
+            return "github"
+        return None
+
+    def retry_after(self, route: str, key: str, now: float | None = None) -> float:
+        """Take a token: 0 if there was one, else seconds until there will be."""
+        limit = self.limits.get(route)
+        if limit is None:
+            return 0.0
+        burst, rate = limit
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get((route, key))
+        if bucket is None:
+            bucket = self._buckets[(route, key)] = [burst, now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end((route, key))
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    def check(self, route: str, key: str) -> None:
+        reason = self.overload()
+        if reason is not None:
+            self.shed += 1
+            admission_rejections.inc(route, reason)
+            raise HTTPException(
+                503, "Server busy, retry shortly", headers={"Retry-After": str(settings.SHED_RETRY_AFTER_SECONDS)}
+            )
+        if settings.RATE_LIMIT_ENABLED:
+            wait = self.retry_after(route, key)
+            if wait > 0:
+                self.rate_limited += 1
+                admission_rejections.inc(route, "rate_limited")
+                raise HTTPException(429, "Too many requests", headers={"Retry-After": str(math.ceil(wait))})
+        self.admitted += 1
+
+    def stats(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+            "buckets": len(self._buckets),
+            "github_outbound": github_client.in_flight() + scheduler.waiting,
+            "db_pool_wait_ms": round(pool_stats.current_wait() * 1000, 3),
+        }
+
+
+admission_control = AdmissionControl(settings.RATE_LIMITS, settings.RATE_LIMIT_MAX_KEYS)
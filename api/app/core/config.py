@@ -14,11 +14,61 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
     ALEMBIC_DATABASE_URL: str | None = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds; keep below the server/proxy idle timeout
+    # Pre-ping costs a round trip per checkout. With a recycle shorter than the
+    # server's idle timeout it can usually be turned off.
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statement cache
+    # Behind pgbouncer in transaction-pooling mode (e.g. Neon's pooled endpoint):
+    # disables prepared statement caching, which breaks there.
+    DB_PGBOUNCER: bool = False
 
     # JWT
     JWT_SECRET: str
     JWT_ALG: str = "HS256"
     ACCESS_TOKEN_MINUTES: int = 15
+    # Refresh tokens (app/core/sessions.py): rotated on every renewal, so this is an idle timeout
+    REFRESH_TOKEN_DAYS: int = 7
+    ACCESS_TOKEN_RENEW_SECONDS: int = 120  # renew in-band once the access token has less than this left
+    REFRESH_REUSE_GRACE_SECONDS: float = 30.0  # a just-rotated token still works for requests racing the rotation
+
+    # get_current_user cache (per process; TTL bounds staleness across workers)
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+
+    # Request/GitHub/DB metrics, scraped at /metrics
+    METRICS_ENABLED: bool = True
+    # /metrics and /api/v1/stats need X-Profile-Token, or "Authorization: Bearer <METRICS_TOKEN>"
+    # (static, for Prometheus' scrape config), unless STATS_PUBLIC is set (trusted networks, local dev)
+    METRICS_TOKEN: str | None = None
+    STATS_PUBLIC: bool = False
+
+    # Opt-in request profiling (app/core/profiling.py); captures listed at /api/v1/profiles
+    PROFILING_ENABLED: bool = True  # installs the middleware; nothing is profiled without a token or a sample rate
+    PROFILING_SAMPLE_ONE_IN: int = 0  # also profile one in N requests (0: only X-Profile-Token requests)
+    PROFILING_PATH_PREFIX: str = "/"  # sampled requests must start with this path
+    PROFILING_INTERVAL_MS: float = 1.0  # sampler period
+    PROFILING_MAX_SECONDS: float = 30.0  # stop sampling a request after this long
+    PROFILING_MAX_CONCURRENT: int = 2  # profiled requests at once per process; more go unprofiled
+    PROFILING_DIR: str = "./data/profiles"
+    PROFILING_MAX_CAPTURES: int = 50  # oldest are deleted past this
+
+    # Admission control for GitHub-backed routes (app/core/admission.py)
+    RATE_LIMIT_ENABLED: bool = True
+    # route -> "<requests>/<seconds>" (JSON in the env), over the defaults in admission.py
+    RATE_LIMITS: dict[str, str] = {}
+    RATE_LIMIT_MAX_KEYS: int = 100_000  # (route, user or IP) buckets kept per process, least recently used dropped
+    SHED_DB_POOL_WAIT_MS: float = 500.0  # 503 while a pool checkout has been waiting this long; 0 disables
+    SHED_GITHUB_OUTBOUND: int = 150  # 503 while this many GitHub calls are in flight or queued; 0 disables
+    SHED_RETRY_AFTER_SECONDS: int = 2
+
+    # Large JSON responses (app/api/responses.py)
+    RESPONSE_COMPRESS_MIN_BYTES: int = 1024  # below this, compression costs more than it saves
+    RESPONSE_BROTLI_QUALITY: int = 4  # 0-11; 4 is about gzip's speed at a better ratio
+    RESPONSE_GZIP_LEVEL: int = 6
 
     # Frontend
     FRONTEND_URL: str = "http://localhost:5173"
@@ -28,8 +78,86 @@ class Settings(BaseSettings):
     GITHUB_APP_SLUG: str
     GITHUB_APP_PRIVATE_KEY_PATH: str
 
+    # Outbound GitHub HTTP (one pooled client for the whole process)
+    GITHUB_API_URL: str = "https://api.github.com"
+    GITHUB_WEB_URL: str = "https://github.com"
+    GITHUB_HTTP_MAX_CONNECTIONS: int = 100
+    GITHUB_HTTP_MAX_KEEPALIVE: int = 20
+    GITHUB_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    GITHUB_HTTP_TIMEOUT: float = 20.0
+    GITHUB_HTTP_CONNECT_TIMEOUT: float = 5.0
+    GITHUB_HTTP_POOL_TIMEOUT: float = 5.0
+    GITHUB_HTTP2: bool = False
+    GITHUB_FAKE: bool = False  # serve GitHub calls from app.github.fake (local dev / benchmarks)
+
+    # Per-installation GitHub request scheduling (app/github/scheduler.py)
+    GITHUB_MAX_CONCURRENCY_PER_INSTALLATION: int = 8
+    GITHUB_BACKGROUND_RESERVE: int = 500  # of the hourly quota, kept for interactive calls
+    GITHUB_MAX_RETRIES: int = 3
+    GITHUB_INTERACTIVE_MAX_WAIT_SECONDS: float = 10.0
+    GITHUB_BACKGROUND_MAX_WAIT_SECONDS: float = 900.0
+
+    # Max concurrent page fetches when listing installation repositories
+    GITHUB_REPOS_PAGE_CONCURRENCY: int = 4
+
+    # Stored repositories older than this are refreshed from GitHub in the background
+    REPO_SYNC_MAX_AGE_SECONDS: int = 600
+
+    # Conditional-request (ETag) cache for GitHub GETs, bounded by body bytes
+    GITHUB_ETAG_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Installation access token cache
+    GITHUB_TOKEN_CACHE_SIZE: int = 1024
+    GITHUB_TOKEN_REFRESH_MARGIN_SECONDS: int = 300
+
+    # Repository snapshot ingestion (app/ingest)
+    INGEST_DIR: str = "./data/snapshots"
+    INGEST_MAX_CONCURRENCY: int = 2  # repositories downloaded/extracted at once per process
+    INGEST_MAX_FILE_BYTES: int = 512 * 1024  # larger files are skipped
+    INGEST_MAX_ARCHIVE_BYTES: int = 1024 * 1024 * 1024  # give up on tarballs bigger than this
+    INGEST_MAX_EXTRACTED_BYTES: int = 256 * 1024 * 1024  # stop keeping files past this
+    BLOB_DIR: str = "./data/blobs"  # content-addressed file store shared by all snapshots
+    INGEST_BLOB_CONCURRENCY: int = 8  # blob fetches in flight per incremental re-sync
+    # Past this many new blobs one tarball is cheaper than per-file API calls
+    INGEST_INCREMENTAL_MAX_BLOBS: int = 200
+    SYMBOL_INDEX_MAX_OPEN: int = 256  # memory-mapped symbol indexes kept open per process
+    VECTOR_INDEX_MAX_OPEN: int = 64  # memory-mapped code search indexes kept open per process
+
+    # Background job queue (app/jobs); run workers with `entrypoint.sh worker`
+    JOBS_ENABLED: bool = False  # send ingestion to the queue instead of running it in the API process
+    JOBS_WORKER_CONCURRENCY: int = 4  # jobs run at once per worker process
+    JOBS_POLL_SECONDS: float = 2.0  # idle re-check when LISTEN/NOTIFY isn't available
+    JOBS_LEASE_SECONDS: int = 60  # a running job without a heartbeat for this long is requeued
+    JOBS_MAX_ATTEMPTS: int = 5
+    JOBS_RETRY_BASE_SECONDS: float = 5.0  # doubled per attempt, with jitter
+    JOBS_RETRY_MAX_SECONDS: float = 600.0
+    JOBS_RETENTION_DAYS: int = 7  # finished jobs are deleted after this
+    JOBS_PROGRESS_MIN_INTERVAL: float = 0.25  # progress writes per job are throttled to this
+    JOBS_SSE_KEEPALIVE_SECONDS: float = 15.0  # comment lines so proxies keep idle streams open
+
+    # Interview sessions over WebSocket (app/interview)
+    INTERVIEW_GENERATOR: str = "app.interview.generator:StubGenerator"  # "module:attr", called with no args
+    INTERVIEW_STUB_TOKEN_DELAY_MS: float = 0.0  # pacing of the stub generator, to mimic a model
+    INTERVIEW_QUESTIONS: int = 5  # per session
+    INTERVIEW_MAX_SESSIONS: int = 10_000  # per process, attached or waiting for a reconnect
+    INTERVIEW_MAX_SESSIONS_PER_USER: int = 3  # past this a new one replaces the user's oldest detached one
+    INTERVIEW_HEARTBEAT_SECONDS: float = 20.0  # ping an otherwise quiet connection this often
+    INTERVIEW_IDLE_TIMEOUT_SECONDS: float = 60.0  # nothing from the client this long: connection is dead
+    INTERVIEW_RESUME_SECONDS: float = 300.0  # a detached session waits this long for a reconnect
+    INTERVIEW_WINDOW_FRAMES: int = 64  # unacknowledged frames in flight before sending pauses
+    INTERVIEW_MAX_PENDING_BYTES: int = 64 * 1024  # queued output past which the generator is paused
+    INTERVIEW_MAX_ANSWER_BYTES: int = 64 * 1024
+
+    # Startup warmup (app/core/warmup.py) and /readyz
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 2  # pool connections opened before taking traffic (capped at DB_POOL_SIZE)
+    WARMUP_HTTP_CONNECTIONS: int = 1  # keep-alive connections opened to each GitHub host; 0 skips it
+    WARMUP_TIMEOUT_SECONDS: float = 10.0  # per step; a slow dependency doesn't hold startup forever
+    READYZ_CHECK_TIMEOUT_SECONDS: float = 2.0
 
-    # Optional (not used by your current github_app.py)
+    # Sign in with the GitHub App's client (app/api/routes/oauth_github.py). Its
+    # user tokens can list the user's installations, so the login callback links
+    # one automatically. Unset: falls back to the OAuth App below, without that.
     GITHUB_APP_CLIENT_ID: str | None = None
     GITHUB_APP_CLIENT_SECRET: str | None = None
     GITHUB_APP_CALLBACK_URL: str | None = None
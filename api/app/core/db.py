@@ -1,8 +1,123 @@
+import itertools
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import db_queries
+from app.core.profiling import span_end, span_start
+
+
+class PoolStats:
+    """Checkout wait times, fed by InstrumentedPool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_recent = 0.0  # EWMA, seconds
+        self.waiters: dict[int, float] = {}  # checkouts blocked right now -> start, oldest first
+        self._seq = itertools.count()
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        self.timeouts += timed_out
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.wait_recent = self.wait_recent * 0.9 + waited * 0.1
+
+    def current_wait(self) -> float:
+        """How long the longest-waiting checkout in progress has waited so far."""
+        for started in self.waiters.values():
+            return time.perf_counter() - started
+        return 0.0
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        waiter = next(pool_stats._seq)
+        pool_stats.waiters[waiter] = start
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        finally:
+            del pool_stats.waiters[waiter]
+        pool_stats.record(time.perf_counter() - start)
+        return conn
+
+
+def _engine_kwargs() -> dict:
+    kwargs = {
+        "poolclass": InstrumentedPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+    if make_url(settings.DATABASE_URL).get_driver_name() == "asyncpg":
+        if settings.DB_PGBOUNCER:
+            # Transaction-pooling pgbouncer hands each transaction to any server
+            # connection, so named prepared statements must not be reused.
+            kwargs["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        else:
+            kwargs["connect_args"] = {
+                "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            }
+    return kwargs
+
+
+engine = create_async_engine(settings.DATABASE_URL, **_engine_kwargs())
+
+# Timing lives on the execution context, not the pooled connection: a failed
+# statement gets no after_cursor_execute, and its context is dropped with it.
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = (time.perf_counter(), span_start("db"))
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    query_start = getattr(context, "_query_start", None)
+    if query_start is None:
+        return
+    context._query_start = None
+    started, span = query_start
+    span_end(span)
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement else "OTHER"
+    db_queries.observe(time.perf_counter() - started, verb if verb in _VERBS else "OTHER")
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _handle_error(exception_context):
+    # Close the profiler span of the failed statement; its profile may long outlive the request.
+    query_start = getattr(exception_context.execution_context, "_query_start", None)
+    if query_start is not None:
+        exception_context.execution_context._query_start = None
+        span_end(query_start[1])
+
+
+_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
 
-engine = create_async_engine(settings.DATABASE_URL, pool_pre_ping=True)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 class Base(DeclarativeBase):
@@ -11,3 +126,25 @@ class Base(DeclarativeBase):
 async def get_db():
     async with SessionLocal() as session:
         yield session
+
+def dialect_insert(table):
+    """INSERT supporting .on_conflict_do_update(); SQLite is only used for local runs."""
+    if engine.dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+def db_pool_stats() -> dict:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checkouts": pool_stats.checkouts,
+        "timeouts": pool_stats.timeouts,
+        "wait_avg_ms": round(pool_stats.wait_total / pool_stats.checkouts * 1000, 3) if pool_stats.checkouts else 0.0,
+        "wait_max_ms": round(pool_stats.wait_max * 1000, 3),
+        "wait_recent_ms": round(pool_stats.wait_recent * 1000, 3),
+        "waiting": len(pool_stats.waiters),
+    }
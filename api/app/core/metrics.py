@@ -0,0 +1,207 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Deliberately tiny (no prometheus_client dependency): counters, gauges and
+fixed-bucket histograms keyed by label tuples, plus collectors that turn
+existing stats() dicts into gauges at scrape time.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+INGEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Sample = tuple[str, dict, float]  # (name suffix, labels, value)
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_fmt_labels(self.labels, key)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *label_values, value: float) -> None:
+        self._values[label_values] = value
+
+    def dec(self, *label_values, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            inf = 'le="+Inf"'
+            yield f"{self.name}_bucket{_fmt_labels(self.labels, key, inf)} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(self.labels, key)} {series[-1]}"
+            yield f"{self.name}_count{_fmt_labels(self.labels, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list[tuple[str, str, Callable[[], dict]]] = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self._add(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self._add(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self._add(Histogram(*args, **kwargs))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collect_stats(self, prefix: str, help: str, fn: Callable[[], dict]) -> None:
+        """Expose every numeric value of fn() as a gauge named <prefix>_<key> at scrape time."""
+        self._collectors.append((prefix, help, fn))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for prefix, help, fn in self._collectors:
+            for key, value in fn().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status")
+)
+http_in_flight = registry.gauge("http_requests_in_flight", "Requests currently being handled")
+github_requests = registry.histogram(
+    "github_request_duration_seconds", "Outbound GitHub call latency (until response headers)", ("op", "status")
+)
+github_ratelimit_remaining = registry.gauge(
+    "github_ratelimit_remaining", "Last X-RateLimit-Remaining seen from GitHub", ("op", "resource")
+)
+db_queries = registry.histogram("db_query_duration_seconds", "DB statement latency", ("statement",), buckets=DB_BUCKETS)
+ingest_stages = registry.histogram(
+    "ingest_stage_duration_seconds", "Repository snapshot ingestion time per stage", ("stage",), buckets=INGEST_BUCKETS
+)
+ingest_bytes = registry.counter("ingest_bytes_total", "Bytes processed by repository ingestion", ("stage",))
+ingest_files = registry.counter("ingest_files_total", "Archive entries seen by repository ingestion", ("outcome",))
+oauth_callback_stages = registry.histogram(
+    "oauth_callback_stage_seconds", "GitHub OAuth callback time per stage", ("stage",)
+)
+oauth_installations_linked = registry.counter(
+    "oauth_installations_linked_total", "Existing app installations linked to a user at login"
+)
+admission_rejections = registry.counter(
+    "admission_rejected_total", "Requests turned away by admission control", ("route", "reason")
+)
+interview_first_token = registry.histogram(
+    "interview_first_token_seconds", "Interview session: trigger to first streamed token sent", ("stream",)
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI (no BaseHTTPMiddleware) so the per-request cost stays at a few microseconds."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            http_requests.observe(time.perf_counter() - start, scope["method"], route_template(scope), status)
+
+
+def route_template(scope) -> str:
+    """The matched route's path template (never the raw path, to keep label cardinality bounded)."""
+    # Newer FastAPI keeps included routes un-prefixed and records the effective path separately.
+    fastapi_scope = scope.get("fastapi")
+    context = fastapi_scope.get("effective_route_context") if isinstance(fastapi_scope, dict) else None
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+def github_op(path: str) -> str:
+    if path.endswith("/access_tokens"):
+        return "token_mint"
+    if path.startswith("/installation/repositories"):
+        return "repo_list"
+    if path.endswith("/login/oauth/access_token"):
+        return "oauth_exchange"
+    if path == "/user":
+        return "user"
+    if path == "/user/installations":
+        return "user_installations"
+    if "/tarball" in path:
+        return "tarball"
+    if "/legacy.tar.gz/" in path:
+        return "codeload"
+    return "other"
@@ -0,0 +1,444 @@
+"""
+Opt-in, per-request profiling.
+
+A request is profiled when it carries a valid `X-Profile-Token` (a short
+JWT with scope "profile", see `create_profile_token`) or when it is picked
+by the admin sample rate (one in PROFILING_SAMPLE_ONE_IN requests under
+PROFILING_PATH_PREFIX, adjustable at runtime through /api/v1/profiles).
+Everything else goes straight through: the middleware's cost is a header
+scan and, with sampling on, a counter.
+
+A profiled request gets a sampler thread that looks at the event loop
+thread every PROFILING_INTERVAL_MS:
+
+- if one of the request's tasks (the one running the middleware, plus any
+  task it spawns while profiled) is on the CPU, the sample is its Python
+  stack;
+- otherwise the request is waiting, and the sample is the await chain of
+  the suspended coroutine ending in `[await db]`, `[await http]` or
+  `[await jwt]` when one of those calls is open, else `[await other]`
+  (or `[loop busy]` if some other request's task holds the loop).
+
+DB statements, outbound GitHub calls and JWT signing are also timed as
+spans, which gives the summary's per-category totals.
+
+When the request ends the sampler thread writes the capture (a speedscope
+file plus a small summary) to PROFILING_DIR, keeping the newest
+PROFILING_MAX_CAPTURES; the loop never waits on the disk. Downloads can
+also be had as collapsed stacks for flamegraph.pl / inferno.
+
+Sync endpoints run in a threadpool and show up as `[await other]` below
+`run_sync`; their own frames aren't sampled.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from datetime import datetime, timedelta, timezone
+
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+_HEADER_KEY = PROFILE_HEADER.lower().encode()
+CAPTURE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+_active: ContextVar["Profile | None"] = ContextVar("active_profile", default=None)
+
+
+def create_profile_token(minutes: int = 60) -> str:
+    exp = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+    return jwt.encode({"sub": "profiler", "scope": "profile", "exp": exp}, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
+
+
+def valid_profile_token(token: str | None) -> bool:
+    """Access tokens carry no scope, so they can't be used here."""
+    if not token:
+        return False
+    try:
+        claims = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+    except JWTError:
+        return False
+    return claims.get("scope") == "profile"
+
+
+# ---- spans -------------------------------------------------------------------
+
+
+def span_start(category: str):
+    """For instrumentation split across callbacks (e.g. DB cursor events); pair with span_end."""
+    profile = _active.get()
+    if profile is None or profile._done.is_set():
+        return None
+    entry = (category, asyncio.current_task(), time.perf_counter())
+    profile.open_spans.append(entry)
+    return profile, entry
+
+
+def span_end(handle) -> None:
+    if handle is None:
+        return
+    profile, entry = handle
+    category, _, started = entry
+    profile.span_seconds[category] += time.perf_counter() - started
+    profile.span_counts[category] += 1
+    try:
+        profile.open_spans.remove(entry)
+    except ValueError:
+        pass
+
+
+@contextmanager
+def span(category: str):
+    handle = span_start(category)
+    try:
+        yield
+    finally:
+        span_end(handle)
+
+
+# ---- sampling ----------------------------------------------------------------
+
+
+def _frame_name(code) -> str:
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_qualname} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+
+def _cpu_stack(frame) -> tuple[str, ...]:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        # Everything above the task step is the event loop itself.
+        if code.co_name == "_run" and code.co_filename.endswith("events.py"):
+            break
+        names.append(_frame_name(code))
+        frame = frame.f_back
+    names.reverse()
+    return tuple(names)
+
+
+def _await_stack(task) -> list[str]:
+    names = []
+    awaitable = task.get_coro() if task is not None else None
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "ag_frame", None) \
+            or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(_frame_name(frame.f_code))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "ag_await", None) \
+            or getattr(awaitable, "gi_yieldfrom", None)
+    return names
+
+
+class Profile:
+    def __init__(self, scope, trigger: str):
+        now = datetime.utcnow()
+        self.id = f"{now:%Y%m%dT%H%M%S}-{secrets.token_hex(4)}"
+        self.trigger = trigger
+        self.method = scope.get("method", "")
+        self.path = scope.get("path", "")
+        self.started_at = now
+        self.status = 0
+        self.route = "unmatched"
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.tasks = {asyncio.current_task()}
+        self.root = asyncio.current_task()
+        self.open_spans: list[tuple] = []
+        self.span_seconds: dict[str, float] = defaultdict(float)
+        self.span_counts: dict[str, int] = defaultdict(int)
+        self.samples: dict[tuple[str, ...], float] = defaultdict(float)  # stack -> seconds
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self._started = time.perf_counter()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def finish(self, status: int, route: str) -> None:
+        self.status, self.route = status, route
+        self.wall_seconds = time.perf_counter() - self._started
+        self._done.set()
+
+    def _sample(self, weight: float) -> None:
+        frame = sys._current_frames().get(self.loop_thread)
+        try:
+            running = asyncio.current_task(self.loop)
+        except RuntimeError:
+            running = None
+        if running is not None and running in self.tasks and frame is not None:
+            self.samples[_cpu_stack(frame)] += weight
+            self.cpu_seconds += weight
+            return
+        if self.open_spans:
+            category, task, _ = self.open_spans[-1]
+            leaf = f"[await {category}]"
+        else:
+            task = self.root
+            leaf = "[loop busy]" if running is not None else "[await other]"
+        self.samples[(*_await_stack(task or self.root), leaf)] += weight
+
+    def _run(self) -> None:
+        interval = settings.PROFILING_INTERVAL_MS / 1000
+        deadline = self._started + settings.PROFILING_MAX_SECONDS
+        last = time.perf_counter()
+        while not self._done.wait(interval):
+            now = time.perf_counter()
+            try:
+                self._sample(now - last)
+            except Exception:  # racing the loop thread; drop the sample
+                pass
+            last = now
+            if now >= deadline:
+                break
+        self._done.wait()
+        try:
+            profiler.save(self)
+        except Exception:
+            logger.exception("writing profile %s failed", self.id)
+
+    def summary(self) -> dict:
+        wall_ms = round(self.wall_seconds * 1000, 2)
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "wall_ms": wall_ms,
+            "cpu_ms": round(self.cpu_seconds * 1000, 2),
+            "await_ms": round(max(wall_ms - self.cpu_seconds * 1000, 0.0), 2),
+            # Summed per call, so concurrent calls can add up to more than wall_ms.
+            "span_ms": {k: round(v * 1000, 2) for k, v in self.span_seconds.items()},
+            "span_counts": dict(self.span_counts),
+            "stacks": len(self.samples),
+        }
+
+    def speedscope(self) -> dict:
+        frames: dict[str, int] = {}
+        samples, weights = [], []
+        for stack, seconds in self.samples.items():
+            samples.append([frames.setdefault(name, len(frames)) for name in stack])
+            weights.append(round(seconds * 1000, 3))
+        name = f"{self.method} {self.route} ({self.id})"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "interview-defender",
+            "shared": {"frames": [{"name": n} for n in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+def collapsed(speedscope: dict) -> str:
+    """speedscope -> `frame;frame;frame <microseconds>` lines."""
+    frames = [f["name"].replace(";", ":") for f in speedscope["shared"]["frames"]]
+    profile = speedscope["profiles"][0]
+    lines = [
+        ";".join(frames[i] for i in stack) + f" {round(weight * 1000)}"
+        for stack, weight in zip(profile["samples"], profile["weights"])
+    ]
+    return "".join(line + "\n" for line in lines)
+
+
+# ---- the process-wide profiler -------------------------------------------------
+
+
+class Profiler:
+    def __init__(self):
+        self.sample_one_in = settings.PROFILING_SAMPLE_ONE_IN
+        self.path_prefix = settings.PROFILING_PATH_PREFIX
+        self._counter = itertools.count()
+        self._active = 0
+        self._lock = threading.Lock()
+        self._saved_factory = None
+        self.started = 0
+        self.skipped_busy = 0
+        self.rejected_tokens = 0
+        self.captures_written = 0
+
+    def configure(self, sample_one_in: int, path_prefix: str) -> None:
+        self.sample_one_in, self.path_prefix = sample_one_in, path_prefix
+
+    def should_sample(self, path: str) -> bool:
+        return path.startswith(self.path_prefix) and next(self._counter) % self.sample_one_in == 0
+
+    def begin(self, scope, trigger: str) -> Profile | None:
+        if self._active >= settings.PROFILING_MAX_CONCURRENT:
+            self.skipped_busy += 1
+            return None
+        profile = Profile(scope, trigger)
+        if self._active == 0:
+            # Tasks spawned by a profiled request (gather, task groups) join its profile.
+            self._saved_factory = profile.loop.get_task_factory()
+            profile.loop.set_task_factory(_task_factory)
+        self._active += 1
+        self.started += 1
+        profile.start()
+        return profile
+
+    def end(self, profile: Profile, status: int, route: str) -> None:
+        self._active -= 1
+        if self._active == 0:
+            profile.loop.set_task_factory(self._saved_factory)
+            self._saved_factory = None
+        profile.finish(status, route)
+
+    # Called from the sampler thread.
+    def save(self, profile: Profile) -> None:
+        directory = settings.PROFILING_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, profile.id)
+        with open(base + ".speedscope.json", "w") as f:
+            json.dump(profile.speedscope(), f)
+        with open(base + ".json", "w") as f:
+            json.dump(profile.summary(), f)
+        with self._lock:
+            self.captures_written += 1
+            self._prune(directory)
+
+    def _prune(self, directory: str) -> None:
+        ids = sorted({name.split(".", 1)[0] for name in os.listdir(directory) if CAPTURE_ID.match(name.split(".", 1)[0])})
+        for capture_id in ids[: max(len(ids) - settings.PROFILING_MAX_CAPTURES, 0)]:
+            for suffix in (".speedscope.json", ".json"):
+                try:
+                    os.remove(os.path.join(directory, capture_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def captures(self) -> list[dict]:
+        """Summaries, newest first."""
+        try:
+            names = os.listdir(settings.PROFILING_DIR)
+        except FileNotFoundError:
+            return []
+        out = []
+        for name in sorted(names, reverse=True):
+            if name.endswith(".json") and not name.endswith(".speedscope.json") and CAPTURE_ID.match(name[:-5]):
+                try:
+                    with open(os.path.join(settings.PROFILING_DIR, name)) as f:
+                        out.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return out
+
+    def capture_path(self, capture_id: str) -> str | None:
+        if not CAPTURE_ID.match(capture_id):
+            return None
+        path = os.path.join(settings.PROFILING_DIR, capture_id + ".speedscope.json")
+        return path if os.path.exists(path) else None
+
+    def stats(self) -> dict:
+        return {
+            "sample_one_in": self.sample_one_in,
+            "active": self._active,
+            "started": self.started,
+            "captures_written": self.captures_written,
+            "skipped_busy": self.skipped_busy,
+            "rejected_tokens": self.rejected_tokens,
+        }
+
+
+def _task_factory(loop, coro, **kwargs):
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    context = kwargs.get("context")
+    profile = context.get(_active) if context is not None else _active.get()
+    if profile is not None and not profile._done.is_set():
+        profile.tasks.add(task)
+    return task
+
+
+def background_task(coro) -> asyncio.Task:
+    """
+    A task for work that outlives the request starting it (syncs, interview
+    scripts): it joins no profile and doesn't keep the request's alive.
+    """
+    context = copy_context()
+    context.run(_active.set, None)
+    return asyncio.get_running_loop().create_task(coro, context=context)
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI; requests that aren't profiled only pay for the header scan."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        trigger = None
+        for key, value in scope["headers"]:
+            if key == _HEADER_KEY:
+                if valid_profile_token(value.decode("latin-1")):
+                    trigger = "header"
+                else:
+                    profiler.rejected_tokens += 1
+                break
+        if trigger is None and profiler.sample_one_in and profiler.should_sample(scope["path"]):
+            trigger = "sampled"
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        profile = profiler.begin(scope, trigger)
+        if profile is None:
+            return await self.app(scope, receive, send)
+
+        status = 500
+        id_header = (PROFILE_ID_HEADER.lower().encode(), profile.id.encode())
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), id_header]}
+            await send(message)
+
+        token = _active.set(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active.reset(token)
+            profiler.end(profile, status, route_template(scope))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mint an X-Profile-Token")
+    parser.add_argument("command", choices=["token"])
+    parser.add_argument("--minutes", type=int, default=60)
+    args = parser.parse_args()
+    print(create_profile_token(args.minutes))
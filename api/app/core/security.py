@@ -2,18 +2,22 @@ from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.core.profiling import span
 
 def create_access_token(*, subject: str) -> str:
     exp = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_MINUTES)
     payload = {"sub": subject, "exp": exp}
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
+    with span("jwt"):
+        return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
 
-def decode_token(token: str) -> str:
+def decode_token_claims(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
-        sub = payload.get("sub")
-        if not sub:
+        if not payload.get("sub"):
             raise ValueError("missing sub")
-        return sub
+        return payload
     except (JWTError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+def decode_token(token: str) -> str:
+    return decode_token_claims(token)["sub"]
@@ -0,0 +1,197 @@
+"""
+Login sessions: a short-lived access JWT (`session` cookie) plus a
+long-lived, rotating refresh token (`refresh` cookie).
+
+get_current_user renews in-band: when the access token is missing,
+expired or within ACCESS_TOKEN_RENEW_SECONDS of expiring and a refresh
+cookie came with the request, the refresh token is rotated and both
+cookies are re-issued on that same response (SessionCookieMiddleware
+attaches them), so an active user never falls back to the OAuth flow.
+
+Refresh tokens are stored as SHA-256 hashes. Each rotation marks the old
+token used and issues a new one in the same family. A used token
+presented again within REFRESH_REUSE_GRACE_SECONDS is a concurrent
+request racing the rotation and just gets a new access token; later than
+that it means the token leaked, and the whole family is revoked.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.security import create_access_token
+from app.models.refresh_token import RefreshToken
+
+SESSION_COOKIE = "session"
+REFRESH_COOKIE = "refresh"
+
+
+class SessionStats:
+    def __init__(self):
+        self.logins = 0
+        self.renewed = 0  # refresh token rotated, new access token issued
+        self.raced = 0  # concurrent use inside the grace window; access token only
+        self.reuse_revoked = 0  # families revoked because a used token came back
+        self.rejected = 0  # unknown, expired or revoked refresh tokens
+        self.logouts = 0
+
+    def stats(self) -> dict:
+        return dict(vars(self))
+
+
+session_stats = SessionStats()
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _add_refresh_token(db: AsyncSession, user_id: int, family: str, now: datetime) -> str:
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_hash(token),
+        family=family,
+        created_at=now,
+        expires_at=now + timedelta(days=settings.REFRESH_TOKEN_DAYS),
+    ))
+    return token
+
+
+async def start_session(db: AsyncSession, user_id: int) -> tuple[str, str]:
+    """New login: returns (access token, refresh token) and commits."""
+    now = datetime.utcnow()
+    # Rotation leaves a row per renewal; expired ones of this user go here.
+    await db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id, RefreshToken.expires_at < now))
+    refresh = _add_refresh_token(db, user_id, secrets.token_hex(16), now)
+    await db.commit()
+    session_stats.logins += 1
+    return create_access_token(subject=str(user_id)), refresh
+
+
+async def renew_session(refresh: str) -> tuple[int, str, str | None] | None:
+    """
+    Rotate `refresh`. Returns (user_id, access token, new refresh token or
+    None when only the access token was re-issued), or None if it can't be used.
+    """
+    token_hash = _hash(refresh)
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        # Claiming the token is one conditional UPDATE, so two concurrent
+        # refreshes can't both rotate it.
+        row = (await db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.rotated_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now,
+            )
+            .values(rotated_at=now)
+            .returning(RefreshToken.user_id, RefreshToken.family)
+        )).first()
+        if row is not None:
+            new_refresh = _add_refresh_token(db, row.user_id, row.family, now)
+            await db.commit()
+            session_stats.renewed += 1
+            return row.user_id, create_access_token(subject=str(row.user_id)), new_refresh
+
+        token = (await db.execute(select(RefreshToken).where(RefreshToken.token_hash == token_hash))).scalar_one_or_none()
+        if token is None or token.revoked_at is not None or token.expires_at <= now:
+            session_stats.rejected += 1
+            return None
+        if token.rotated_at >= now - timedelta(seconds=settings.REFRESH_REUSE_GRACE_SECONDS):
+            session_stats.raced += 1
+            return token.user_id, create_access_token(subject=str(token.user_id)), None
+
+        await _revoke(db, RefreshToken.family == token.family, now)
+        session_stats.reuse_revoked += 1
+        return None
+
+
+async def _revoke(db: AsyncSession, where, now: datetime) -> None:
+    await db.execute(
+        update(RefreshToken).where(where, RefreshToken.revoked_at.is_(None)).values(revoked_at=now)
+    )
+    await db.commit()
+
+
+async def end_session(db: AsyncSession, refresh: str | None) -> None:
+    """Logout: revoke the refresh token's family (this login on this device)."""
+    session_stats.logouts += 1
+    if not refresh:
+        return
+    family = (await db.execute(
+        select(RefreshToken.family).where(RefreshToken.token_hash == _hash(refresh))
+    )).scalar_one_or_none()
+    if family is not None:
+        await _revoke(db, RefreshToken.family == family, datetime.utcnow())
+
+
+async def end_all_sessions(db: AsyncSession, user_id: int) -> None:
+    """Revoke every refresh token of the user; access tokens already out lapse within ACCESS_TOKEN_MINUTES."""
+    await _revoke(db, RefreshToken.user_id == user_id, datetime.utcnow())
+
+
+def set_session_cookies(resp: Response, access: str, refresh: str | None) -> None:
+    resp.set_cookie(
+        key=SESSION_COOKIE,
+        value=access,
+        httponly=True,
+        samesite="lax",
+        secure=settings.COOKIE_SECURE,
+        max_age=int(settings.ACCESS_TOKEN_MINUTES * 60),
+        path="/",
+    )
+    if refresh is not None:
+        resp.set_cookie(
+            key=REFRESH_COOKIE,
+            value=refresh,
+            httponly=True,
+            samesite="lax",
+            secure=settings.COOKIE_SECURE,
+            max_age=settings.REFRESH_TOKEN_DAYS * 24 * 60 * 60,
+            path="/",
+        )
+
+
+def clear_session_cookies(resp: Response) -> None:
+    resp.delete_cookie(SESSION_COOKIE, path="/")
+    resp.delete_cookie(REFRESH_COOKIE, path="/")
+
+
+def _sets_session_cookie(headers) -> bool:
+    prefix = f"{SESSION_COOKIE}=".encode()
+    return any(k == b"set-cookie" and v.startswith(prefix) for k, v in headers)
+
+
+class SessionCookieMiddleware:
+    """Adds the cookies of an in-band renewal (left in request.state by get_current_user) to any response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Created here so request.state downstream writes into the dict this reads.
+        state = scope.setdefault("state", {})
+
+        async def send_with_cookies(message):
+            if message["type"] == "http.response.start":
+                renewed = state.get("renewed_session")
+                # A response that sets or clears the session itself (logout, refresh) wins.
+                if renewed is not None and not _sets_session_cookie(message.get("headers", [])):
+                    carrier = Response()
+                    set_session_cookies(carrier, *renewed)
+                    cookies = [(k, v) for k, v in carrier.raw_headers if k == b"set-cookie"]
+                    message = {**message, "headers": [*message.get("headers", []), *cookies]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookies)
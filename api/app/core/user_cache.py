@@ -0,0 +1,80 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True, slots=True)
+class CachedUser:
+    """Detached, immutable snapshot of a users row (safe to share across requests)."""
+
+    id: int
+    github_id: str
+    username: str
+    avatar_url: str | None
+    github_installation_id: int | None
+
+    @classmethod
+    def from_orm(cls, user) -> "CachedUser":
+        return cls(
+            id=user.id,
+            github_id=user.github_id,
+            username=user.username,
+            avatar_url=user.avatar_url,
+            github_installation_id=user.github_installation_id,
+        )
+
+
+class UserCache:
+    """
+    Bounded TTL cache of CachedUser by id. Writers call invalidate(); the
+    generation counter stops a lookup that raced with an invalidation from
+    re-inserting the stale row.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, CachedUser]] = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> CachedUser | None:
+        item = self._entries.get(user_id)
+        if item is None or item[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return item[1]
+
+    def put(self, user: CachedUser, generation: int) -> None:
+        if generation != self.generation or self.ttl <= 0:
+            return
+        self._entries[user.id] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self.generation += 1
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+user_cache = UserCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
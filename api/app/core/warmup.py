@@ -0,0 +1,150 @@
+"""
+Startup warmup and readiness.
+
+The lifespan calls `warmup.run()` before the app takes traffic: it opens
+WARMUP_DB_CONNECTIONS pool connections (and runs the auth lookup once
+so its statement is compiled), parses the GitHub App key (and
+signs the first app JWT) and opens WARMUP_HTTP_CONNECTIONS keep-alive
+connections to GitHub, all at once and bounded by WARMUP_TIMEOUT_SECONDS.
+A failed step doesn't stop startup; it is recorded, and /readyz stays
+503 until the dependency answers.
+
+/healthz is liveness (the process is up); /readyz is readiness: the
+database and the signing key are re-checked on each probe (a cheap
+SELECT 1 and a stat of the PEM), GitHub connectivity is reported from
+warmup but doesn't gate readiness, since an outage there shouldn't pull
+every instance out of rotation.
+"""
+import asyncio
+import logging
+import time
+
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.core.db import SessionLocal, engine
+from app.core.security import create_access_token, decode_token
+from app.github import client as github_client
+from app.github.app_jwt import app_jwt_signer
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Set when this module is first imported, which app.main does at startup.
+_process_start = time.monotonic()
+
+
+async def _open_db_connections(count: int) -> None:
+    async def one():
+        conn = await engine.connect()
+        try:
+            await conn.execute(text("SELECT 1"))
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
+
+    # All open at once: closing one before opening the next would just warm
+    # the same pooled connection over and over.
+    conns = await asyncio.gather(*(one() for _ in range(count)), return_exceptions=True)
+    for conn in conns:
+        if not isinstance(conn, BaseException):
+            await conn.close()  # back to the pool, still connected
+    for conn in conns:
+        if isinstance(conn, BaseException):
+            raise conn
+
+
+async def _prime_auth() -> None:
+    # Every authenticated request starts with a token decode and, on a user
+    # cache miss, this query; doing both once compiles and caches the statement.
+    decode_token(create_access_token(subject="0"))
+    async with SessionLocal() as db:
+        await db.execute(select(User).where(User.id == 0))
+
+
+async def _warm_database(count: int) -> None:
+    await _open_db_connections(count)
+    await _prime_auth()
+
+
+def _load_key() -> None:
+    app_jwt_signer.load()
+    app_jwt_signer.get()
+
+
+async def _connect_github(count: int) -> None:
+    client = github_client.get_client()
+    hosts = [settings.GITHUB_API_URL, settings.GITHUB_WEB_URL]
+    # Any response (even a 404) means the TCP and TLS handshakes are done and
+    # the connection is back in the keep-alive pool.
+    await asyncio.gather(*(client.head(host) for host in hosts for _ in range(count)))
+
+
+class Warmup:
+    def __init__(self):
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.steps: dict[str, dict] = {}
+
+    async def _step(self, name: str, work) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(work, settings.WARMUP_TIMEOUT_SECONDS)
+            error = None
+        except Exception as e:
+            # Only the exception type goes into /readyz, which is unauthenticated.
+            error = type(e).__name__
+            logger.warning("Warmup step %s failed: %r", name, e)
+        self.steps[name] = {"ok": error is None, "ms": round((time.perf_counter() - start) * 1000, 1), "error": error}
+
+    async def run(self) -> None:
+        self.started_at = time.monotonic()
+        if settings.WARMUP_ENABLED:
+            steps = {
+                "database": _warm_database(min(settings.WARMUP_DB_CONNECTIONS, settings.DB_POOL_SIZE)),
+                "github_key": asyncio.to_thread(_load_key),
+            }
+            if settings.WARMUP_HTTP_CONNECTIONS > 0:
+                steps["github_http"] = _connect_github(settings.WARMUP_HTTP_CONNECTIONS)
+            await asyncio.gather(*(self._step(name, work) for name, work in steps.items()))
+        self.finished_at = time.monotonic()
+        logger.info("Warmup done in %.0fms: %s", (self.finished_at - self.started_at) * 1000, self.steps)
+
+    async def _check(self, work) -> dict:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(work, settings.READYZ_CHECK_TIMEOUT_SECONDS)
+            error = None
+        except Exception as e:
+            error = type(e).__name__
+        return {"ok": error is None, "ms": round((time.perf_counter() - start) * 1000, 1), "error": error}
+
+    async def _ping_db(self) -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def readiness(self) -> tuple[bool, dict]:
+        database, key = await asyncio.gather(
+            self._check(self._ping_db()),
+            self._check(asyncio.to_thread(app_jwt_signer.load)),
+        )
+        checks = {"database": database, "github_key": key}
+        if "github_http" in self.steps:
+            checks["github_http"] = {**self.steps["github_http"], "required": False}
+        warmed = self.finished_at is not None
+        ready = warmed and database["ok"] and key["ok"]
+        return ready, {"ready": ready, "checks": checks, "warmup": self.stats()}
+
+    def stats(self) -> dict:
+        done = self.finished_at is not None
+        return {
+            "done": done,
+            # From first import to the end of warmup: roughly the cold start of this process.
+            "startup_ms": round((self.finished_at - _process_start) * 1000, 1) if done else None,
+            "warmup_ms": round((self.finished_at - self.started_at) * 1000, 1) if done else None,
+            "steps": self.steps,
+        }
+
+
+warmup = Warmup()
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+import jwt  # pyjwt
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.profiling import span
+
+APP_JWT_TTL = 9 * 60  # GitHub rejects app JWTs that live longer than 10 minutes
+APP_JWT_REFRESH_MARGIN = 60
+KEY_CHECK_INTERVAL = 30  # how often we stat() the PEM file to notice rotation
+
+
+class AppJwtSigner:
+    """
+    Signs GitHub App JWTs with a private key that is parsed once and reused.
+
+    The signed JWT itself is cached until shortly before its exp, and the key
+    file's mtime is re-checked every KEY_CHECK_INTERVAL seconds so a rotated
+    PEM is picked up without a restart.
+    """
+
+    def __init__(self, app_id: int | None, key_path: str | None):
+        self.app_id = app_id
+        self.key_path = key_path
+        self._lock = threading.Lock()
+        self._key = None
+        self._key_mtime: float | None = None
+        self._next_key_check = 0.0
+        self._jwt: str | None = None
+        self._jwt_exp = 0
+        self.signs = 0
+        self.key_loads = 0
+
+    def _load_key_if_changed(self, now: float) -> None:
+        path = self.key_path
+        if not path:
+            raise HTTPException(503, "Missing GITHUB_APP_PRIVATE_KEY_PATH")
+        try:
+            mtime = os.stat(path).st_mtime
+            if self._key is None or mtime != self._key_mtime:
+                with open(path, "rb") as f:
+                    self._key = load_pem_private_key(f.read(), password=None)
+                self._key_mtime = mtime
+                self._jwt = None  # never hand out a JWT signed with the old key
+                self.key_loads += 1
+        except FileNotFoundError:
+            raise HTTPException(503, f"Private key not found at {path}")
+        self._next_key_check = now + KEY_CHECK_INTERVAL
+
+    def load(self) -> None:
+        """Eagerly parse the key (e.g. during startup)."""
+        with self._lock:
+            self._load_key_if_changed(time.time())
+
+    def get(self) -> str:
+        now = time.time()
+        token = self._jwt
+        if token and now < self._jwt_exp - APP_JWT_REFRESH_MARGIN and now < self._next_key_check:
+            return token
+
+        with self._lock:
+            if not self.app_id:
+                raise HTTPException(503, "Missing GITHUB_APP_ID")
+            if now >= self._next_key_check or self._key is None:
+                self._load_key_if_changed(now)
+            if self._jwt and now < self._jwt_exp - APP_JWT_REFRESH_MARGIN:
+                return self._jwt
+
+            iat = int(now)
+            payload = {
+                "iat": iat - 30,
+                "exp": iat + APP_JWT_TTL,
+                "iss": str(self.app_id),
+            }
+            with span("jwt"):
+                self._jwt = jwt.encode(payload, self._key, algorithm="RS256")
+            self._jwt_exp = payload["exp"]
+            self.signs += 1
+            return self._jwt
+
+    def stats(self) -> dict:
+        return {"signs": self.signs, "key_loads": self.key_loads}
+
+
+app_jwt_signer = AppJwtSigner(settings.GITHUB_APP_ID, settings.GITHUB_APP_PRIVATE_KEY_PATH)
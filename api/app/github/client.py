@@ -0,0 +1,106 @@
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import github_op, github_ratelimit_remaining, github_requests
+from app.core.profiling import span
+
+_client: httpx.AsyncClient | None = None
+_transport: httpx.AsyncBaseTransport | None = None
+_in_flight = 0
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Times every outbound call and records GitHub's rate-limit headers."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        global _in_flight
+        op = github_op(request.url.path)
+        start = time.perf_counter()
+        _in_flight += 1
+        try:
+            with span("http"):
+                response = await self.inner.handle_async_request(request)
+        except Exception:
+            github_requests.observe(time.perf_counter() - start, op, "error")
+            raise
+        finally:
+            _in_flight -= 1
+        github_requests.observe(time.perf_counter() - start, op, response.status_code)
+
+        remaining = response.headers.get("x-ratelimit-remaining")
+        if remaining is not None:
+            resource = response.headers.get("x-ratelimit-resource", "core")
+            github_ratelimit_remaining.set(op, resource, value=float(remaining))
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.GITHUB_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.GITHUB_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.GITHUB_HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.GITHUB_HTTP_TIMEOUT,
+        connect=settings.GITHUB_HTTP_CONNECT_TIMEOUT,
+        pool=settings.GITHUB_HTTP_POOL_TIMEOUT,
+    )
+    transport = _transport
+    if transport is None and settings.GITHUB_FAKE:
+        from app.github.fake import fake_github_transport
+
+        transport = fake_github_transport()
+
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=settings.GITHUB_HTTP2)
+
+    return httpx.AsyncClient(
+        timeout=timeout,
+        transport=InstrumentedTransport(transport),
+        headers={"User-Agent": "interview-defender"},
+    )
+
+
+async def start() -> None:
+    global _client
+    if _client is None:
+        _client = _build_client()
+
+
+async def stop() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def in_flight() -> int:
+    """GitHub requests sent and not yet answered (including those waiting for a pooled connection)."""
+    return _in_flight
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    The shared, pooled client for everything that talks to GitHub.
+    Opened/closed by the app lifespan; created lazily if used outside of it.
+    """
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+async def use_transport(transport: httpx.AsyncBaseTransport | None) -> None:
+    """Route all GitHub traffic through `transport` (e.g. a local fake). None restores the network."""
+    global _transport
+    _transport = transport
+    await stop()
+    await start()
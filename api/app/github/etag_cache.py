@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable
+
+import httpx
+
+from app.core.config import settings
+from app.github.scheduler import scheduler
+
+# Only these headers are replayed when a stored body is served for a 304.
+_REPLAYED_HEADERS = ("content-type", "etag", "last-modified", "link")
+
+
+@dataclass(frozen=True, slots=True)
+class _Stored:
+    etag: str | None
+    last_modified: str | None
+    headers: tuple[tuple[str, str], ...]
+    body: bytes
+
+
+class ConditionalGetCache:
+    """
+    Response cache for outbound GitHub GETs, keyed by (scope, url). The scope
+    is also the scheduler bucket whose rate limit the request spends.
+
+    Stored ETag/Last-Modified values are sent back as If-None-Match /
+    If-Modified-Since; GitHub answers 304 without charging the rate limit,
+    and we serve the stored body. Bounded by total body bytes, LRU evicted.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[Hashable, str], _Stored] = OrderedDict()
+        self._bytes = 0
+        self.requests = 0
+        self.revalidated = 0  # 304s served from the cache
+        self.stored = 0
+        self.evictions = 0
+
+    async def get(
+        self,
+        scope: Hashable,
+        url: str,
+        *,
+        params: dict | None = None,
+        headers: dict | None = None,
+    ) -> httpx.Response:
+        # httpx.URL(url, params=...) would replace an existing query string; merge instead.
+        full_url = str(httpx.URL(url).copy_merge_params(params) if params else httpx.URL(url))
+        key = (scope, full_url)
+        entry = self._entries.get(key)
+        self.requests += 1
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                request_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request_headers["If-Modified-Since"] = entry.last_modified
+
+        r = await scheduler.request("GET", full_url, bucket=scope, headers=request_headers)
+
+        if r.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            self._entries.move_to_end(key)
+            return httpx.Response(200, headers=list(entry.headers), content=entry.body, request=r.request)
+
+        if r.status_code == 200:
+            etag = r.headers.get("etag")
+            last_modified = r.headers.get("last-modified")
+            if etag or last_modified:
+                self._put(key, _Stored(
+                    etag=etag,
+                    last_modified=last_modified,
+                    headers=tuple((k, r.headers[k]) for k in _REPLAYED_HEADERS if k in r.headers),
+                    body=r.content,
+                ))
+        elif entry is not None and r.status_code in (401, 403, 404):
+            # Access is gone; don't keep serving the old body to this scope.
+            self._drop(key)
+
+        return r
+
+    def _put(self, key: tuple[Hashable, str], entry: _Stored) -> None:
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = entry
+        self._bytes += size
+        self.stored += 1
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+            self.evictions += 1
+
+    def _drop(self, key: tuple[Hashable, str]) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.body)
+
+    def invalidate_scope(self, scope: Hashable) -> None:
+        for key in [k for k in self._entries if k[0] == scope]:
+            self._drop(key)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "requests": self.requests,
+            "revalidated": self.revalidated,
+            "stored": self.stored,
+            "evictions": self.evictions,
+            "revalidation_ratio": round(self.revalidated / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+github_get_cache = ConditionalGetCache(max_bytes=settings.GITHUB_ETAG_CACHE_MAX_BYTES)
@@ -0,0 +1,384 @@
+"""
+A tiny local stand-in for the parts of GitHub this app talks to.
+
+Used with httpx.ASGITransport so routes can be exercised without network
+access (set GITHUB_FAKE=true, or call app.github.client.use_transport()).
+"""
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import random
+import secrets
+import tarfile
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, RedirectResponse
+
+
+def create_fake_github(
+    repo_count: int = 3,
+    rate_limit: int | None = None,
+    rate_window: float = 3600.0,
+    retry_after: float | None = None,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    files_per_repo: int = 40,
+    full_repo_objects: bool = False,
+    max_concurrency: int | None = None,
+) -> FastAPI:
+    """
+    rate_limit: requests allowed per identity (installation, OAuth user, or
+    the app JWT) per rate_window seconds. Like GitHub, every response carries
+    X-RateLimit-* headers, 304s are free, and going over returns 403.
+    retry_after: also send Retry-After (seconds) on that 403, like GitHub's
+    secondary rate limits.
+
+    latency/jitter: seconds added to every response (uniform in
+    latency +/- jitter) to stand in for the round trip to api.github.com.
+
+    files_per_repo: source files in each generated repository snapshot.
+    fake.state.repo_files[full_name] can be edited to simulate new commits.
+
+    full_repo_objects: return repositories with every field and URL template
+    GitHub's real repository objects carry (for payload size benchmarks).
+
+    max_concurrency: requests served at once; the rest queue, like a
+    saturated upstream (for overload benchmarks).
+    """
+    fake = FastAPI(title="Fake GitHub")
+    fake.state.repo_count = repo_count
+    fake.state.tokens = {}  # token -> identity whose quota it spends
+    fake.state.calls = Counter()  # "METHOD /path" -> count, for benchmarks
+    fake.state.usage = {}  # identity -> (window start, used)
+    fake.state.rate_limited = 0
+    fake.state.repo_files = {}  # full_name -> {path: bytes}; "symlink:<path>" -> link target
+    fake.state.app_id = 1  # the app whose installations /user/installations lists
+    fake.state.user_installations = {}  # OAuth code (= account) -> installation ids of the app on that account
+
+    capacity = asyncio.Semaphore(max_concurrency) if max_concurrency else contextlib.nullcontext()
+
+    @fake.middleware("http")
+    async def count_calls(request: Request, call_next):
+        fake.state.calls[f"{request.method} {request.url.path}"] += 1
+        async with capacity:
+            if latency or jitter:
+                await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+            return await call_next(request)
+
+    @fake.middleware("http")
+    async def enforce_rate_limit(request: Request, call_next):
+        auth = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if request.url.path.endswith("/access_tokens"):
+            identity = "app"
+        else:
+            identity = fake.state.tokens.get(auth)
+        if rate_limit is None or identity is None:
+            return await call_next(request)
+
+        now = time.time()
+        window_start, used = fake.state.usage.get(identity, (now, 0))
+        if now - window_start >= rate_window:
+            window_start, used = now, 0
+        reset = str(int(window_start + rate_window) + 1)
+
+        if used >= rate_limit:
+            fake.state.rate_limited += 1
+            headers = {"X-RateLimit-Limit": str(rate_limit), "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}
+            if retry_after is not None:
+                headers["Retry-After"] = f"{retry_after:g}"
+            return JSONResponse({"message": "API rate limit exceeded"}, status_code=403, headers=headers)
+
+        # Charge before awaiting so concurrent requests see each other.
+        fake.state.usage[identity] = (window_start, used + 1)
+        response = await call_next(request)
+        if response.status_code == 304:
+            start, charged = fake.state.usage[identity]
+            fake.state.usage[identity] = (start, charged - 1)
+        response.headers["X-RateLimit-Limit"] = str(rate_limit)
+        response.headers["X-RateLimit-Remaining"] = str(rate_limit - fake.state.usage[identity][1])
+        response.headers["X-RateLimit-Reset"] = reset
+        response.headers["X-RateLimit-Resource"] = "core"
+        return response
+
+    def _require_token(authorization: str | None) -> None:
+        if not authorization or authorization.removeprefix("Bearer ") not in fake.state.tokens:
+            raise HTTPException(401, "Bad credentials")
+
+    def _repo(i: int) -> dict:
+        repo = {
+            "id": 1000 + i,
+            "name": f"repo-{i}",
+            "full_name": f"octo/repo-{i}",
+            "private": i % 2 == 0,
+            "visibility": "private" if i % 2 == 0 else "public",
+            "description": f"Fake repository {i}",
+            "language": ("Python", "TypeScript", "Go")[i % 3],
+            "html_url": f"https://github.com/octo/repo-{i}",
+            "stargazers_count": i % 50,
+            "forks_count": i % 7,
+            "updated_at": "2026-01-01T00:00:00Z",
+            "owner": {"login": "octo", "id": 1},
+        }
+        return _full_repo(repo) if full_repo_objects else repo
+
+    @fake.post("/app/installations/{installation_id}/access_tokens", status_code=201)
+    async def access_tokens(installation_id: int, authorization: str | None = Header(default=None)):
+        if not authorization or not authorization.startswith("Bearer "):
+            raise HTTPException(401, "A JSON web token could not be decoded")
+        token = f"ghs_{secrets.token_hex(16)}"
+        fake.state.tokens[token] = f"installation:{installation_id}"
+        expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+        return {"token": token, "expires_at": expires_at.strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+    @fake.get("/installation/repositories")
+    async def installation_repositories(
+        per_page: int = 30,
+        page: int = 1,
+        authorization: str | None = Header(default=None),
+        if_none_match: str | None = Header(default=None),
+    ):
+        _require_token(authorization)
+        per_page = min(per_page, 100)
+        start = (page - 1) * per_page
+        end = min(start + per_page, fake.state.repo_count)
+        body = json.dumps({
+            "total_count": fake.state.repo_count,
+            "repositories": [_repo(i) for i in range(start, end)],
+        }).encode()
+
+        # Like GitHub: a matching If-None-Match gets an empty 304.
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    @fake.post("/login/oauth/access_token")
+    async def oauth_access_token(request: Request):
+        body = await request.json()
+        if not body.get("code"):
+            return {"error": "bad_verification_code"}
+        # GitHub App client IDs start with "Iv"; their user tokens are ghu_, OAuth App ones gho_.
+        prefix = "ghu_" if str(body.get("client_id", "")).startswith("Iv") else "gho_"
+        token = f"{prefix}{secrets.token_hex(16)}"
+        # The code picks the GitHub account, so load tests can log in many users.
+        fake.state.tokens[token] = f"user:{body['code']}"
+        return {"access_token": token, "token_type": "bearer", "scope": "read:user"}
+
+    @fake.get("/user")
+    async def user(authorization: str | None = Header(default=None)):
+        _require_token(authorization)
+        code = fake.state.tokens[authorization.removeprefix("Bearer ")].removeprefix("user:")
+        user_id = zlib.crc32(code.encode())
+        return {"id": user_id, "login": f"octocat-{user_id}", "avatar_url": "https://example.invalid/octocat.png"}
+
+    @fake.get("/user/installations")
+    async def user_installations(authorization: str | None = Header(default=None)):
+        _require_token(authorization)
+        if not authorization.removeprefix("Bearer ").startswith("ghu_"):
+            raise HTTPException(
+                403, "You must authenticate with an access token authorized to a GitHub App in order to list installations"
+            )
+        code = fake.state.tokens[authorization.removeprefix("Bearer ")].removeprefix("user:")
+        user_id = zlib.crc32(code.encode())
+        installations = [
+            {
+                "id": installation_id,
+                "app_id": fake.state.app_id,
+                "account": {"login": f"octocat-{user_id}", "id": user_id, "type": "User"},
+                "target_type": "User",
+            }
+            for installation_id in fake.state.user_installations.get(code, [])
+        ]
+        return {"total_count": len(installations), "installations": installations}
+
+    def _files(full_name: str) -> dict[str, bytes]:
+        files = fake.state.repo_files.get(full_name)
+        if files is None:
+            files = fake.state.repo_files[full_name] = _generate_files(files_per_repo)
+        return files
+
+    def _commit_sha(files: dict[str, bytes]) -> str:
+        digest = hashlib.sha1()
+        for path in sorted(files):
+            digest.update(path.encode() + b"\0" + hashlib.sha1(files[path]).digest())
+        return digest.hexdigest()
+
+    def _git_blob_sha(data: bytes) -> str:
+        return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+    @fake.get("/repos/{owner}/{repo}/commits/{ref:path}")
+    async def commit(
+        owner: str,
+        repo: str,
+        ref: str,
+        authorization: str | None = Header(default=None),
+        accept: str | None = Header(default=None),
+        if_none_match: str | None = Header(default=None),
+    ):
+        _require_token(authorization)
+        sha = _commit_sha(_files(f"{owner}/{repo}"))
+        etag = f'"{sha}"'
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        if accept == "application/vnd.github.sha":
+            return Response(sha, media_type="application/vnd.github.sha", headers={"ETag": etag})
+        return JSONResponse({"sha": sha, "commit": {"tree": {"sha": sha}}}, headers={"ETag": etag})
+
+    @fake.get("/repos/{owner}/{repo}/git/trees/{sha}")
+    async def tree(
+        owner: str,
+        repo: str,
+        sha: str,
+        recursive: str | None = None,
+        authorization: str | None = Header(default=None),
+    ):
+        # Only the current commit exists in the fake.
+        _require_token(authorization)
+        files = _files(f"{owner}/{repo}")
+        if sha not in ("HEAD", _commit_sha(files)):
+            raise HTTPException(404, "Not Found")
+        entries = [
+            {
+                "path": path.removeprefix("symlink:"),
+                "mode": "120000" if path.startswith("symlink:") else "100644",
+                "type": "blob",
+                "sha": _git_blob_sha(data),
+                "size": len(data),
+            }
+            for path, data in sorted(files.items())
+        ]
+        return {"sha": sha, "tree": entries, "truncated": False}
+
+    @fake.get("/repos/{owner}/{repo}/git/blobs/{sha}")
+    async def blob(owner: str, repo: str, sha: str, authorization: str | None = Header(default=None)):
+        _require_token(authorization)
+        for data in _files(f"{owner}/{repo}").values():
+            if _git_blob_sha(data) == sha:
+                return Response(data, media_type="application/vnd.github.raw+json")
+        raise HTTPException(404, "Not Found")
+
+    @fake.get("/repos/{owner}/{repo}/tarball")
+    @fake.get("/repos/{owner}/{repo}/tarball/{ref:path}")
+    async def tarball(
+        request: Request,
+        owner: str,
+        repo: str,
+        ref: str = "HEAD",
+        authorization: str | None = Header(default=None),
+    ):
+        # Like GitHub: the API answers with a redirect to a short-lived codeload URL.
+        _require_token(authorization)
+        return RedirectResponse(f"{request.base_url}_codeload/{owner}/{repo}/legacy.tar.gz/{ref}", status_code=302)
+
+    @fake.get("/_codeload/{owner}/{repo}/legacy.tar.gz/{ref:path}")
+    async def codeload(owner: str, repo: str, ref: str):
+        files = _files(f"{owner}/{repo}")
+        sha = _commit_sha(files)
+        buf = io.BytesIO()
+        # GitHub's archives carry the commit SHA in a pax global header comment.
+        with tarfile.open(fileobj=buf, mode="w:gz", format=tarfile.PAX_FORMAT, pax_headers={"comment": sha}) as tar:
+            root = f"{owner}-{repo}-{sha[:7]}"
+            for path, data in sorted(files.items()):
+                if path.startswith("symlink:"):
+                    info = tarfile.TarInfo(f"{root}/{path.removeprefix('symlink:')}")
+                    info.type, info.linkname = tarfile.SYMTYPE, data.decode()
+                    tar.addfile(info)
+                    continue
+                info = tarfile.TarInfo(f"{root}/{path}")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return Response(buf.getvalue(), media_type="application/x-gzip")
+
+    return fake
+
+
+_REPO_URLS = (
+    "forks", "keys", "collaborators", "teams", "hooks", "issue_events", "events", "assignees", "branches",
+    "tags", "blobs", "git_tags", "git_refs", "trees", "statuses", "languages", "stargazers", "contributors",
+    "subscribers", "subscription", "commits", "git_commits", "comments", "issue_comment", "contents",
+    "compare", "merges", "archive", "downloads", "issues", "pulls", "milestones", "notifications", "labels",
+    "releases", "deployments",
+)
+_OWNER_URLS = (
+    "followers", "following", "gists", "starred", "subscriptions", "organizations", "repos", "events",
+    "received_events",
+)
+
+
+def _full_repo(repo: dict) -> dict:
+    """`repo` padded out to the shape of a real GitHub repository object."""
+    api = f"https://api.github.com/repos/{repo['full_name']}"
+    owner = repo["owner"]["login"]
+    full = {
+        **repo,
+        "node_id": "R_kgDO" + str(repo["id"]).rjust(8, "0"),
+        "fork": False,
+        "url": api,
+        **{f"{name}_url": f"{api}/{name}" for name in _REPO_URLS},
+        "created_at": "2024-03-01T12:00:00Z",
+        "pushed_at": repo["updated_at"],
+        "git_url": f"git://github.com/{repo['full_name']}.git",
+        "ssh_url": f"git@github.com:{repo['full_name']}.git",
+        "clone_url": f"https://github.com/{repo['full_name']}.git",
+        "svn_url": f"https://github.com/{repo['full_name']}",
+        "homepage": None,
+        "size": 1234, "stargazers_count": 7, "watchers_count": 7, "forks_count": 1, "open_issues_count": 2,
+        "watchers": 7, "forks": 1, "open_issues": 2,
+        "has_issues": True, "has_projects": True, "has_downloads": True, "has_wiki": True,
+        "has_pages": False, "has_discussions": False, "archived": False, "disabled": False,
+        "mirror_url": None, "license": None, "allow_forking": True, "is_template": False,
+        "web_commit_signoff_required": False, "topics": [], "default_branch": "main",
+        "permissions": {"admin": False, "maintain": False, "push": False, "triage": False, "pull": True},
+    }
+    full["owner"] = {
+        **repo["owner"],
+        "node_id": "MDQ6VXNlcjE=",
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{repo['owner']['id']}?v=4",
+        "gravatar_id": "",
+        "url": f"https://api.github.com/users/{owner}",
+        "html_url": f"https://github.com/{owner}",
+        **{f"{name}_url": f"https://api.github.com/users/{owner}/{name}" for name in _OWNER_URLS},
+        "type": "User",
+        "user_view_type": "public",
+        "site_admin": False,
+    }
+    return full
+
+
+def _generate_files(count: int) -> dict[str, bytes]:
+    """A small mixed repository: sources, docs, plus things ingestion should skip."""
+    files: dict[str, bytes] = {"README.md": b"# Fake repository\n\nGenerated by app.github.fake.\n"}
+    for i in range(count):
+        if i % 2 == 0:
+            files[f"src/pkg/module_{i}.py"] = (
+                f'"""Module {i}."""\n\n\n'
+                f"class Service{i}:\n"
+                f"    def handle(self, request):\n"
+                f"        return helper_{i}(request)\n\n\n"
+                f"def helper_{i}(value):\n"
+                f"    return value * {i}\n"
+            ).encode()
+        else:
+            files[f"web/src/component{i}.ts"] = (
+                f"export interface Props{i} {{ id: number }}\n\n"
+                f"export function render{i}(props: Props{i}): string {{\n"
+                f"  return `item-${{props.id}}`;\n"
+                f"}}\n\n"
+                f"export const LIMIT_{i} = {i};\n"
+            ).encode()
+    files["node_modules/left-pad/index.js"] = b"module.exports = function leftPad() {};\n"
+    files["assets/logo.png"] = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR" + bytes(range(256))
+    files["data/fixture.json"] = b"[" + b"0," * 400_000 + b"0]"
+    files["symlink:docs/link.md"] = b"../README.md"
+    return files
+
+
+def fake_github_transport(fake: FastAPI | None = None) -> httpx.ASGITransport:
+    return httpx.ASGITransport(app=fake or create_fake_github())
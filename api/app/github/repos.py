@@ -0,0 +1,118 @@
+import asyncio
+import math
+from typing import AsyncIterator, TypedDict
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.github.etag_cache import github_get_cache
+from app.github.tokens import installation_tokens
+
+PER_PAGE = 100  # GitHub's maximum for installation/repositories
+
+
+class RepoSummary(TypedDict):
+    """What the dashboard reads of a GitHub repository object (the default projection)."""
+
+    id: int
+    name: str
+    full_name: str
+    description: str | None
+    language: str | None
+    visibility: str | None
+    updated_at: str
+
+
+DEFAULT_FIELDS = tuple(RepoSummary.__annotations__)
+# Also selectable with ?fields=; everything else GitHub sends (URL templates, owner, ...) is dropped.
+EXTRA_FIELDS = (
+    "private", "html_url", "default_branch", "archived", "fork", "stargazers_count", "pushed_at", "topics",
+)
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...]:
+    """`fields=name,language` -> the projection to apply; None/empty gives DEFAULT_FIELDS."""
+    if not fields:
+        return DEFAULT_FIELDS
+    selected = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in selected if f not in DEFAULT_FIELDS and f not in EXTRA_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields selected")
+    return selected
+
+
+def project_repos(repos: list[dict], fields: tuple[str, ...]) -> list[dict]:
+    return [{f: repo.get(f) for f in fields} for repo in repos]
+
+
+async def fetch_repos_page(installation_id: int, token: str, page: int) -> dict:
+    r = await github_get_cache.get(
+        installation_id,
+        f"{settings.GITHUB_API_URL}/installation/repositories",
+        params={"per_page": PER_PAGE, "page": page},
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+        },
+    )
+
+    if r.status_code == 401:
+        # Token was revoked (e.g. app uninstalled); mint a fresh one next time.
+        installation_tokens.invalidate(installation_id)
+    if r.status_code >= 400:
+        raise HTTPException(r.status_code, r.text)
+
+    return r.json()
+
+
+async def iter_remaining_pages(
+    installation_id: int,
+    token: str,
+    total_count: int,
+    concurrency: int | None = None,
+) -> AsyncIterator[tuple[int, dict]]:
+    """
+    Fetch pages 2..N concurrently and yield (page, data) as each one lands.
+
+    At most `concurrency` pages are in flight or waiting to be consumed, so a
+    slow consumer (e.g. a streaming client) never makes us buffer the whole list.
+    """
+    last_page = math.ceil(total_count / PER_PAGE)
+    pages = iter(range(2, last_page + 1))
+    in_flight: set[asyncio.Task] = set()
+
+    async def fetch(page: int) -> tuple[int, dict]:
+        return page, await fetch_repos_page(installation_id, token, page)
+
+    def launch_next() -> None:
+        page = next(pages, None)
+        if page is not None:
+            in_flight.add(asyncio.ensure_future(fetch(page)))
+
+    for _ in range(concurrency or settings.GITHUB_REPOS_PAGE_CONCURRENCY):
+        launch_next()
+
+    try:
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                in_flight.discard(task)
+                yield task.result()
+                launch_next()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def fetch_all_repos(installation_id: int, token: str) -> dict:
+    first = await fetch_repos_page(installation_id, token, 1)
+    total_count = first.get("total_count", 0)
+
+    pages = {1: first.get("repositories", [])}
+    async for page, data in iter_remaining_pages(installation_id, token, total_count):
+        pages[page] = data.get("repositories", [])
+
+    return {
+        "total_count": total_count,
+        "repositories": [repo for page in sorted(pages) for repo in pages[page]],
+    }
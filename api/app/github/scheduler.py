@@ -0,0 +1,290 @@
+"""
+Rate-limit-aware scheduling of outbound GitHub calls.
+
+Each bucket (an installation id, "app" for app-JWT calls) tracks GitHub's
+X-RateLimit-Remaining/Reset. Calls queue per bucket in priority order, so
+interactive requests go ahead of background syncs, and background work
+stops before it eats the last GITHUB_BACKGROUND_RESERVE requests of the
+hour. 403/429 rate-limit responses are retried after Retry-After (or the
+reset time) with jitter, and identical in-flight GETs share one call.
+
+No call waits in the queue longer than its priority's max wait
+(GITHUB_INTERACTIVE_MAX_WAIT_SECONDS / GITHUB_BACKGROUND_MAX_WAIT_SECONDS):
+one that would, because the bucket is blocked or out of quota until a
+later reset, fails at once with a 503 carrying Retry-After.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Hashable
+
+import httpx
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.github.client import get_client
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# Background jobs set this once; every GitHub call they make inherits it.
+current_priority: ContextVar[int] = ContextVar("github_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(value: int):
+    token = current_priority.set(value)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+@dataclass
+class _Bucket:
+    remaining: int | None = None
+    reset_at: float = 0.0  # unix seconds, from X-RateLimit-Reset
+    blocked_until: float = 0.0  # unix seconds, after a 403/429
+    active: int = 0
+    waiters: list = field(default_factory=list)  # heap of (priority, seq, future)
+    timer: asyncio.TimerHandle | None = None
+    users: int = 0  # _send calls holding this bucket, queued, in flight or between retries
+
+    def idle(self, now: float) -> bool:
+        return (
+            not self.users and not self.active and not self.waiters and self.timer is None
+            and now >= self.reset_at and now >= self.blocked_until
+        )
+
+
+class GitHubScheduler:
+    def __init__(self, max_concurrency: int, background_reserve: int, max_retries: int):
+        self.max_concurrency = max_concurrency
+        self.background_reserve = background_reserve
+        self.max_retries = max_retries
+        self._buckets: dict[Hashable, _Bucket] = {}
+        self._inflight_gets: dict[tuple, asyncio.Future] = {}
+        self._seq = itertools.count()
+        self._sweep_at = 1024  # drop idle buckets once there are this many
+        self.sent = 0
+        self.queued = 0
+        self.waiting = 0  # calls queued right now behind a bucket's concurrency or quota
+        self.deduplicated = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.refused = 0  # calls failed fast instead of waiting past their max wait
+
+    # -- quota gate -----------------------------------------------------
+
+    def _wait_for(self, bucket: _Bucket, prio: int, now: float) -> float:
+        wait = bucket.blocked_until - now
+        if bucket.remaining is not None and now < bucket.reset_at:
+            reserve = self.background_reserve if prio >= BACKGROUND else 0
+            if bucket.remaining <= reserve:
+                wait = max(wait, bucket.reset_at - now)
+        return wait
+
+    def _pump(self, bucket: _Bucket) -> None:
+        bucket.timer = None
+        while bucket.waiters and bucket.active < self.max_concurrency:
+            prio, _, fut = bucket.waiters[0]
+            if fut.done():  # waiter was cancelled
+                heapq.heappop(bucket.waiters)
+                continue
+            wait = self._wait_for(bucket, prio, time.time())
+            if wait > 0:
+                bucket.timer = asyncio.get_running_loop().call_later(wait, self._pump, bucket)
+                return
+            heapq.heappop(bucket.waiters)
+            bucket.active += 1
+            if bucket.remaining is not None:
+                bucket.remaining -= 1  # reserve it now; the response corrects it
+            fut.set_result(None)
+
+    async def _acquire(self, bucket: _Bucket, prio: int) -> None:
+        max_wait = self._max_wait(prio)
+        wait = self._wait_for(bucket, prio, time.time())
+        if wait > max_wait:
+            self.refused += 1
+            raise _busy(wait)
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(bucket.waiters, (prio, next(self._seq), fut))
+        if bucket.timer is not None:
+            bucket.timer.cancel()
+        self._pump(bucket)
+        if fut.done():
+            return
+        self.queued += 1
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(fut, max_wait)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():  # granted as the timeout fired
+                self._release(bucket)
+            self.refused += 1
+            raise _busy(max(self._wait_for(bucket, prio, time.time()), 1.0)) from None
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release(bucket)
+            raise
+        finally:
+            self.waiting -= 1
+
+    def _release(self, bucket: _Bucket) -> None:
+        bucket.active -= 1
+        if bucket.timer is None:
+            self._pump(bucket)
+
+    def _observe(self, bucket: _Bucket, r: httpx.Response) -> None:
+        remaining = r.headers.get("x-ratelimit-remaining")
+        reset = r.headers.get("x-ratelimit-reset")
+        if remaining is None or reset is None:
+            return
+        remaining, reset_at = int(remaining), float(reset)
+        if reset_at == bucket.reset_at and bucket.remaining is not None:
+            # Responses can arrive out of order; never hand back quota
+            # already reserved by requests still in flight.
+            bucket.remaining = min(bucket.remaining, remaining)
+        else:
+            bucket.remaining = remaining - max(bucket.active - 1, 0)
+            bucket.reset_at = reset_at
+
+    # -- retries ----------------------------------------------------------
+
+    def _retry_delay(self, r: httpx.Response, attempt: int) -> float | None:
+        """Seconds to wait before retrying, or None if this isn't a rate-limit response."""
+        if r.status_code not in (403, 429):
+            return None
+        retry_after = r.headers.get("retry-after")
+        if retry_after is not None:
+            delay = float(retry_after)
+        elif r.headers.get("x-ratelimit-remaining") == "0" and r.headers.get("x-ratelimit-reset"):
+            delay = max(float(r.headers["x-ratelimit-reset"]) - time.time(), 1.0)
+        elif r.status_code == 429 or "rate limit" in r.text.lower():
+            delay = min(2.0 ** attempt, 60.0)
+        else:
+            return None  # an ordinary permission error
+        return delay + random.uniform(0, 0.1 * delay + 0.5)
+
+    def _max_wait(self, prio: int) -> float:
+        if prio >= BACKGROUND:
+            return settings.GITHUB_BACKGROUND_MAX_WAIT_SECONDS
+        return settings.GITHUB_INTERACTIVE_MAX_WAIT_SECONDS
+
+    # -- public API -------------------------------------------------------
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        bucket: Hashable | None = None,
+        headers: dict | None = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Send a GitHub request through the scheduler. `bucket` is whose quota
+        the call spends (installation id, "app"); None means untracked (e.g.
+        OAuth user tokens) but still retried on rate limits.
+        """
+        if method.upper() != "GET":
+            return await self._send(method, url, bucket, headers, kwargs)
+
+        full_url = httpx.URL(url)
+        if kwargs.get("params"):
+            full_url = full_url.copy_merge_params(kwargs["params"])
+        key = (bucket, str(full_url), tuple(sorted((headers or {}).items())))
+        shared = self._inflight_gets.get(key)
+        if shared is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(shared)
+
+        task = asyncio.ensure_future(self._send(method, url, bucket, headers, kwargs))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight_gets[key] = task
+        task.add_done_callback(lambda _: self._inflight_gets.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _bucket(self, key: Hashable) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._sweep_at:
+                now = time.time()
+                for k in [k for k, b in self._buckets.items() if b.idle(now)]:
+                    del self._buckets[k]
+                self._sweep_at = max(1024, 2 * len(self._buckets))
+            bucket = self._buckets[key] = _Bucket()
+        return bucket
+
+    async def _send(self, method, url, bucket_key, headers, kwargs) -> httpx.Response:
+        prio = current_priority.get()
+        bucket = self._bucket(bucket_key) if bucket_key is not None else None
+        if bucket is None:
+            return await self._send_in(None, prio, method, url, headers, kwargs)
+        bucket.users += 1
+        try:
+            return await self._send_in(bucket, prio, method, url, headers, kwargs)
+        finally:
+            bucket.users -= 1
+
+    async def _send_in(self, bucket, prio, method, url, headers, kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            if bucket is not None:
+                await self._acquire(bucket, prio)
+            try:
+                self.sent += 1
+                r = await get_client().request(method, url, headers=headers, **kwargs)
+                if bucket is not None:
+                    self._observe(bucket, r)
+            finally:
+                if bucket is not None:
+                    self._release(bucket)
+
+            delay = self._retry_delay(r, attempt)
+            if delay is None:
+                return r
+
+            self.rate_limited += 1
+            if bucket is not None:
+                # Everyone sharing this quota backs off, not just this caller.
+                bucket.blocked_until = max(bucket.blocked_until, time.time() + delay)
+            if attempt >= self.max_retries or delay > self._max_wait(prio):
+                return r
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "buckets": len(self._buckets),
+            "sent": self.sent,
+            "queued": self.queued,
+            "deduplicated": self.deduplicated,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "refused": self.refused,
+            "waiting": self.waiting,
+            "blocked_buckets": sum(1 for b in self._buckets.values() if b.blocked_until > now),
+        }
+
+
+def _busy(wait: float) -> HTTPException:
+    return HTTPException(
+        503, "GitHub rate limit reached, retry later", headers={"Retry-After": str(math.ceil(wait))}
+    )
+
+
+scheduler = GitHubScheduler(
+    max_concurrency=settings.GITHUB_MAX_CONCURRENCY_PER_INSTALLATION,
+    background_reserve=settings.GITHUB_BACKGROUND_RESERVE,
+    max_retries=settings.GITHUB_MAX_RETRIES,
+)
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import SessionLocal, dialect_insert
+from app.core.profiling import background_task
+from app.github.repos import fetch_all_repos
+from app.github.scheduler import BACKGROUND, priority
+from app.github.tokens import get_installation_token
+from app.jobs.queue import enqueue
+from app.models.repository import InstallationSync, Repository
+
+logger = logging.getLogger(__name__)
+
+UPSERT_BATCH = 500
+
+_running: dict[int, asyncio.Task] = {}
+
+
+def _parse_github_ts(value: str | None) -> datetime:
+    # Stored naive UTC, like the rest of our DateTime columns.
+    if not value:
+        return datetime.utcnow()
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def _row(installation_id: int, repo: dict, synced_at: datetime) -> dict:
+    return {
+        "installation_id": installation_id,
+        "github_id": repo["id"],
+        "name": repo.get("name") or "",
+        "full_name": repo.get("full_name") or repo.get("name") or "",
+        "description": repo.get("description"),
+        "language": repo.get("language"),
+        "private": bool(repo.get("private")),
+        "visibility": repo.get("visibility"),
+        "html_url": repo.get("html_url"),
+        "stargazers_count": repo.get("stargazers_count") or 0,
+        "forks_count": repo.get("forks_count") or 0,
+        "updated_at": _parse_github_ts(repo.get("updated_at")),
+        "synced_at": synced_at,
+    }
+
+
+async def sync_installation_repositories(installation_id: int) -> int:
+    """Pull every repository of the installation from GitHub into `repositories`."""
+    token = await get_installation_token(installation_id)
+    data = await fetch_all_repos(installation_id, token)
+    synced_at = datetime.utcnow()
+    rows = [_row(installation_id, repo, synced_at) for repo in data["repositories"]]
+
+    async with SessionLocal() as db:
+        table = Repository.__table__
+        for i in range(0, len(rows), UPSERT_BATCH):
+            stmt = dialect_insert(table).values(rows[i : i + UPSERT_BATCH])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["installation_id", "github_id"],
+                set_={
+                    col: stmt.excluded[col]
+                    for col in rows[0]
+                    if col not in ("installation_id", "github_id")
+                },
+            )
+            await db.execute(stmt)
+
+        # Anything not touched by this sync was removed from the installation.
+        await db.execute(
+            delete(Repository).where(
+                Repository.installation_id == installation_id,
+                Repository.synced_at < synced_at,
+            )
+        )
+
+        stmt = dialect_insert(InstallationSync.__table__).values(
+            installation_id=installation_id, synced_at=synced_at, repo_count=len(rows)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["installation_id"],
+            set_={"synced_at": stmt.excluded.synced_at, "repo_count": stmt.excluded.repo_count},
+        )
+        await db.execute(stmt)
+        await db.commit()
+
+    return len(rows)
+
+
+def schedule_sync(installation_id: int) -> asyncio.Task:
+    """Start a background sync unless one is already running for this installation."""
+    task = _running.get(installation_id)
+    if task is not None and not task.done():
+        return task
+
+    async def run() -> int:
+        try:
+            with priority(BACKGROUND):
+                return await sync_installation_repositories(installation_id)
+        except Exception:
+            logger.exception("Repository sync failed for installation %s", installation_id)
+            raise
+        finally:
+            _running.pop(installation_id, None)
+
+    task = background_task(run())
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    _running[installation_id] = task
+    return task
+
+
+async def ensure_synced(db: AsyncSession, installation_id: int) -> None:
+    """
+    Never-synced installations are synced inline (the caller has nothing to
+    show yet); stale ones are refreshed in the background while the caller
+    serves what's already stored.
+    """
+    synced_at = (
+        await db.execute(
+            select(InstallationSync.synced_at).where(InstallationSync.installation_id == installation_id)
+        )
+    ).scalar_one_or_none()
+
+    if synced_at is None:
+        await asyncio.shield(schedule_sync(installation_id))
+    elif datetime.utcnow() - synced_at > timedelta(seconds=settings.REPO_SYNC_MAX_AGE_SECONDS):
+        if settings.JOBS_ENABLED:
+            # One refresh job per installation per staleness window, however many requests notice.
+            window = int(time.time() // settings.REPO_SYNC_MAX_AGE_SECONDS)
+            await enqueue(
+                "sync_installation",
+                {"installation_id": installation_id},
+                idempotency_key=f"sync_installation:{installation_id}:{window}",
+            )
+        else:
+            schedule_sync(installation_id)
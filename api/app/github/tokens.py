@@ -0,0 +1,135 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.github.app_jwt import app_jwt_signer
+from app.github.scheduler import scheduler
+
+
+@dataclass(frozen=True, slots=True)
+class InstallationToken:
+    token: str
+    expires_at: float  # unix seconds, as reported by GitHub
+
+
+Minter = Callable[[int], Awaitable[InstallationToken]]
+
+
+def parse_expires_at(value: str | None, default_ttl: int = 3600) -> float:
+    """GitHub returns expires_at as ISO-8601 with a trailing Z."""
+    if not value:
+        return time.time() + default_ttl
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class InstallationTokenCache:
+    """
+    In-process cache of installation access tokens, keyed by installation id.
+
+    Tokens are reused until `refresh_margin` seconds before GitHub's expires_at.
+    Concurrent misses for the same installation share a single mint call.
+    """
+
+    def __init__(self, maxsize: int = 1024, refresh_margin: int = 300):
+        self.maxsize = maxsize
+        self.refresh_margin = refresh_margin
+        self._entries: OrderedDict[int, InstallationToken] = OrderedDict()
+        self._inflight: dict[int, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _fresh(self, entry: InstallationToken) -> bool:
+        return entry.expires_at - self.refresh_margin > time.time()
+
+    async def get(self, installation_id: int, mint: Minter) -> str:
+        entry = self._entries.get(installation_id)
+        if entry is not None and self._fresh(entry):
+            self._entries.move_to_end(installation_id)
+            self.hits += 1
+            return entry.token
+
+        task = self._inflight.get(installation_id)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fill(installation_id, mint))
+            # Keep "exception never retrieved" quiet if every waiter was cancelled.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[installation_id] = task
+
+        # shield: one caller disconnecting must not cancel the mint for the others
+        return (await asyncio.shield(task)).token
+
+    async def _fill(self, installation_id: int, mint: Minter) -> InstallationToken:
+        try:
+            entry = await mint(installation_id)
+            self._entries[installation_id] = entry
+            self._entries.move_to_end(installation_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return entry
+        finally:
+            self._inflight.pop(installation_id, None)
+
+    def invalidate(self, installation_id: int) -> None:
+        self._entries.pop(installation_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+installation_tokens = InstallationTokenCache(
+    maxsize=settings.GITHUB_TOKEN_CACHE_SIZE,
+    refresh_margin=settings.GITHUB_TOKEN_REFRESH_MARGIN_SECONDS,
+)
+
+
+async def mint_installation_token(installation_id: int) -> InstallationToken:
+    app_jwt = app_jwt_signer.get()
+    url = f"{settings.GITHUB_API_URL}/app/installations/{installation_id}/access_tokens"
+
+    # App-JWT calls have their own quota, separate from any installation's.
+    r = await scheduler.request(
+        "POST",
+        url,
+        bucket="app",
+        headers={
+            "Authorization": f"Bearer {app_jwt}",
+            "Accept": "application/vnd.github+json",
+        },
+    )
+
+    if r.status_code >= 400:
+        raise HTTPException(r.status_code, f"Failed to mint installation token: {r.text}")
+
+    data = r.json()
+    return InstallationToken(
+        token=data["token"],
+        expires_at=parse_expires_at(data.get("expires_at")),
+    )
+
+
+async def get_installation_token(installation_id: int) -> str:
+    return await installation_tokens.get(installation_id, mint_installation_token)
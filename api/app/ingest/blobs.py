@@ -0,0 +1,118 @@
+"""
+Content-addressed file store keyed by git blob SHA.
+
+A file's key is what git itself would call it (sha1 of "blob <size>\\0" +
+content), so the SHAs in a GitHub tree tell us which files we already
+have without downloading them. Identical files across forks, branches and
+installations are stored, and later indexed, once. Snapshots hardlink
+into the store, so blobs are written read-only.
+"""
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
+
+from app.core.config import settings
+
+CHUNK_BYTES = 64 * 1024
+
+
+def git_blob_sha(data: bytes) -> str:
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def git_blob_sha_stream(src: BinaryIO, size: int, head: bytes = b"") -> str:
+    """`git_blob_sha` of `head` plus the rest of `src`, hashed in chunks and not kept."""
+    digest = hashlib.sha1(b"blob %d\0" % size)
+    digest.update(head)
+    while chunk := src.read(CHUNK_BYTES):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.writes = 0
+        self.reused = 0
+        self.bytes_written = 0
+
+    def path(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha[2:]
+
+    def has(self, sha: str) -> bool:
+        return self.path(sha).exists()
+
+    def _publish(self, tmp_path: str, sha: str, size: int) -> Path:
+        final = self.path(sha)
+        os.chmod(tmp_path, 0o444)
+        try:
+            # link() fails if another writer got there first, unlike rename().
+            os.link(tmp_path, final)
+        except FileExistsError:
+            self.reused += 1
+        else:
+            self.writes += 1
+            self.bytes_written += size
+        finally:
+            os.unlink(tmp_path)
+        return final
+
+    def put(self, data: bytes, sha: str | None = None) -> str:
+        """Store `data`; if `sha` is given it must match (e.g. a blob fetched from GitHub)."""
+        actual = git_blob_sha(data)
+        if sha is not None and sha != actual:
+            raise ValueError(f"blob content does not match {sha}")
+        if self.has(actual):
+            self.reused += 1
+            return actual
+        self.path(actual).parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self._publish(tmp_path, actual, len(data))
+        return actual
+
+    def put_stream(self, src: BinaryIO, size: int, head: bytes = b"") -> str:
+        """
+        Store `size` bytes (`head` already read, the rest from `src`) without
+        holding them in memory; the SHA is computed while copying.
+        """
+        digest = hashlib.sha1(b"blob %d\0" % size)
+        digest.update(head)
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(head)
+                while chunk := src.read(CHUNK_BYTES):
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        sha = digest.hexdigest()
+        self.path(sha).parent.mkdir(parents=True, exist_ok=True)
+        self._publish(tmp_path, sha, size)
+        return sha
+
+    def link_into(self, sha: str, target: Path) -> None:
+        """Materialise blob `sha` at `target` (hardlink; copy if the store is on another filesystem)."""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(self.path(sha), target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.copyfile(self.path(sha), target)
+
+    def stats(self) -> dict:
+        return {"writes": self.writes, "reused": self.reused, "bytes_written": self.bytes_written}
+
+
+blob_store = BlobStore(settings.BLOB_DIR)
@@ -0,0 +1,292 @@
+"""
+Repository snapshot ingestion: tarball -> filtered files on disk.
+
+The archive is streamed from GitHub into a temp file, then extracted one
+member at a time (tarfile stream mode) in a worker thread, so memory stays
+at a few chunk buffers however large the repository is. Vendored
+directories, binaries, symlinks and oversized files are skipped. File
+contents go to the blob store and the snapshot directory hardlinks them;
+it replaces the previous snapshot only once it is complete (see
+swap_into_place).
+
+This is the full download; app/ingest/sync.py decides when an
+incremental tree diff is enough instead.
+"""
+import asyncio
+import json
+import os
+import secrets
+import shutil
+import tarfile
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path, PurePosixPath
+
+from app.core.config import settings
+from app.core.metrics import ingest_bytes, ingest_files, ingest_stages
+from app.github.client import get_client
+from app.github.scheduler import scheduler
+from app.github.tokens import get_installation_token, installation_tokens
+from app.ingest.blobs import BlobStore, blob_store, git_blob_sha_stream
+
+CHUNK_BYTES = 64 * 1024
+SNIFF_BYTES = 8 * 1024  # a NUL byte in here means binary, like git's heuristic
+
+VENDORED_DIRS = frozenset({
+    ".git", ".hg", ".svn", "node_modules", "bower_components", "vendor", "third_party",
+    "__pycache__", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache",
+    "dist", "build", "target", ".next", ".nuxt", "coverage", "Pods",
+})
+BINARY_SUFFIXES = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".bmp", ".tiff", ".psd",
+    ".pdf", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".jar", ".war",
+    ".so", ".dll", ".dylib", ".exe", ".bin", ".o", ".a", ".class", ".pyc", ".wasm",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp3", ".mp4", ".mov", ".avi", ".webm",
+    ".sqlite", ".db", ".parquet", ".pickle", ".pkl", ".npy", ".h5",
+})
+LOCKFILES = frozenset({"package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Cargo.lock"})
+
+# {"commit_sha", "ref", "files": {path: blob sha}, "skipped": {path: blob sha}}. "skipped" has the
+# files found to be binary only once read, so re-syncs don't fetch them again to find out.
+MANIFEST = ".snapshot.json"
+
+
+class IngestError(Exception):
+    pass
+
+
+@dataclass
+class IngestResult:
+    installation_id: int
+    full_name: str
+    mode: str = "full"  # full | incremental | unchanged
+    commit_sha: str | None = None
+    path: str | None = None
+    manifest: dict = field(default_factory=dict)  # path -> blob sha of every kept file
+    skipped: dict = field(default_factory=dict)  # path -> blob sha of files sniffed as binary
+    files: Counter = field(default_factory=Counter)  # outcome -> count
+    bytes: Counter = field(default_factory=Counter)  # stage -> bytes
+    seconds: dict = field(default_factory=dict)  # stage -> seconds
+
+    def as_dict(self) -> dict:
+        out = {**asdict(self), "files": dict(self.files), "bytes": dict(self.bytes)}
+        # server-side details, not for API responses
+        del out["path"], out["manifest"], out["skipped"]
+        return out
+
+
+def snapshot_dir(installation_id: int, full_name: str) -> Path:
+    owner, _, repo = full_name.partition("/")
+    return Path(settings.INGEST_DIR) / str(installation_id) / owner / repo
+
+
+def read_manifest(snapshot: Path) -> dict | None:
+    for _ in range(3):
+        try:
+            return json.loads((snapshot / MANIFEST).read_text())
+        except FileNotFoundError:
+            # Resolved to a version two swaps old (see swap_into_place); the link has moved on.
+            if not snapshot.is_symlink():
+                return None
+        except (OSError, ValueError):
+            return None
+    return None
+
+
+def classify(path: PurePosixPath, size: int) -> str | None:
+    """Why a regular file should be skipped, or None to keep it."""
+    if str(path) == MANIFEST:
+        return "unsafe"
+    if any(part in VENDORED_DIRS for part in path.parts[:-1]):
+        return "vendored"
+    if path.name in LOCKFILES or path.name.endswith((".min.js", ".min.css", ".map")):
+        return "vendored"
+    if path.suffix.lower() in BINARY_SUFFIXES:
+        return "binary"
+    if size > settings.INGEST_MAX_FILE_BYTES:
+        return "oversized"
+    return None
+
+
+def safe_path(name: str) -> PurePosixPath | None:
+    """`name` as a path inside the snapshot; None if it is absolute or climbs out."""
+    parts = PurePosixPath(name).parts
+    if not parts or any(p in ("", ".", "..") for p in parts) or name.startswith("/"):
+        return None
+    return PurePosixPath(*parts)
+
+
+def _member_path(name: str) -> PurePosixPath | None:
+    """Archive path minus GitHub's `<owner>-<repo>-<sha>/` prefix; None if unsafe."""
+    if name.startswith("/"):
+        return None
+    return safe_path(name.partition("/")[2])
+
+
+# -- stages -------------------------------------------------------------------
+
+
+async def download_tarball(installation_id: int, full_name: str, ref: str | None, dest) -> int:
+    """Stream the repository tarball into the open binary file `dest`; returns bytes written."""
+    token = await get_installation_token(installation_id)
+    url = f"{settings.GITHUB_API_URL}/repos/{full_name}/tarball"
+    if ref:
+        url += f"/{ref}"
+
+    # The API call (which spends quota) only answers with a redirect to codeload.
+    r = await scheduler.request(
+        "GET",
+        url,
+        bucket=installation_id,
+        headers={"Authorization": f"Bearer {token}", "Accept": "application/vnd.github+json"},
+    )
+    if r.status_code == 401:
+        installation_tokens.invalidate(installation_id)
+    if r.status_code not in (301, 302, 307):
+        raise IngestError(f"GitHub tarball request for {full_name} failed: {r.status_code}")
+    location = r.url.join(r.headers["location"])
+
+    written = 0
+    async with get_client().stream("GET", location) as resp:
+        if resp.status_code != 200:
+            raise IngestError(f"Archive download for {full_name} failed: {resp.status_code}")
+        async for chunk in resp.aiter_bytes(CHUNK_BYTES):
+            written += len(chunk)
+            if written > settings.INGEST_MAX_ARCHIVE_BYTES:
+                raise IngestError(f"{full_name} archive exceeds INGEST_MAX_ARCHIVE_BYTES")
+            dest.write(chunk)
+    return written
+
+
+def extract_tarball(archive: str, dest: Path, result: IngestResult, blobs: BlobStore = blob_store) -> None:
+    """
+    Extract kept files from `archive` into `blobs` and link them under
+    `dest`, one member at a time. Runs in a worker thread; besides the
+    (append-only) blob store it only touches `result`.
+    """
+    kept_bytes = 0
+    with tarfile.open(archive, mode="r|gz") as tar:
+        for member in tar:
+            if result.commit_sha is None:
+                result.commit_sha = tar.pax_headers.get("comment")
+            if member.isdir() or member.type in (tarfile.XGLTYPE, tarfile.XHDTYPE):
+                continue
+            if not member.isfile():
+                result.files["link"] += 1  # symlinks/hardlinks could point outside the snapshot
+                continue
+
+            path = _member_path(member.name)
+            reason = "unsafe" if path is None else classify(path, member.size)
+            if reason is None and kept_bytes + member.size > settings.INGEST_MAX_EXTRACTED_BYTES:
+                reason = "over_budget"
+            if reason is not None:
+                result.files[reason] += 1
+                result.bytes["skipped"] += member.size
+                continue
+
+            src = tar.extractfile(member)
+            head = src.read(SNIFF_BYTES)
+            if b"\0" in head:
+                result.files["binary"] += 1
+                result.bytes["skipped"] += member.size
+                result.skipped[str(path)] = git_blob_sha_stream(src, member.size, head)
+                continue
+
+            sha = blobs.put_stream(src, member.size, head)
+            blobs.link_into(sha, dest / path)
+            result.manifest[str(path)] = sha
+            kept_bytes += member.size
+            result.files["kept"] += 1
+
+    result.bytes["extracted"] = kept_bytes
+
+
+def swap_into_place(staging: Path, final: Path) -> None:
+    """
+    Make `final` show `staging`, atomically. `final` is a symlink to the
+    current version (a sibling directory); the new link is made under a
+    temporary name and renamed over it, so a reader resolving `final` gets
+    the old version or the new one, never nothing. The version it replaced
+    is kept (linked from `.<name>.prev`) until the next swap, so a reader
+    that resolved the link just before still finds its files.
+    """
+    prev_link = final.with_name(f".{final.name}.prev")
+    retired = prev_link.parent / os.readlink(prev_link) if prev_link.is_symlink() else None
+    legacy = None
+    if final.is_dir() and not final.is_symlink():
+        # A real directory, from before snapshots were versioned: replaced once, not atomically.
+        legacy = final.with_name(final.name + ".old")
+        shutil.rmtree(legacy, ignore_errors=True)
+        final.rename(legacy)
+    previous = os.readlink(final) if final.is_symlink() else None
+
+    _replace_link(final, staging.name)
+    if previous is not None:
+        _replace_link(prev_link, previous)
+    for path in (retired, legacy):
+        if path is not None and path.name not in (staging.name, previous):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _replace_link(link: Path, target: str) -> None:
+    tmp = link.with_name(f".{link.name}.tmp-{secrets.token_hex(4)}")
+    os.symlink(target, tmp)
+    try:
+        os.replace(tmp, link)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def new_staging_dir(final: Path) -> Path:
+    final.parent.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(prefix=f".{final.name}.", dir=final.parent))
+
+
+async def publish(staging: Path, final: Path, result: IngestResult, ref: str | None) -> None:
+    """Write the manifest into `staging` and swap it in as the snapshot."""
+    manifest = {"commit_sha": result.commit_sha, "ref": ref, "files": result.manifest, "skipped": result.skipped}
+    (staging / MANIFEST).write_text(json.dumps(manifest, separators=(",", ":")))
+    start = time.perf_counter()
+    await asyncio.to_thread(swap_into_place, staging, final)
+    result.seconds["publish"] = time.perf_counter() - start
+    result.path = str(final)
+
+
+def record_metrics(result: IngestResult) -> None:
+    # Called on the event loop, never from the extraction thread.
+    for stage, seconds in result.seconds.items():
+        ingest_stages.observe(seconds, stage)
+    for stage, n in result.bytes.items():
+        ingest_bytes.inc(stage, amount=n)
+    for outcome, n in result.files.items():
+        ingest_files.inc(outcome, amount=n)
+
+
+async def ingest_repository(installation_id: int, full_name: str, ref: str | None = None) -> IngestResult:
+    """Download and extract a full repository snapshot. Call through `ingestor` to respect the concurrency limit."""
+    result = IngestResult(installation_id, full_name)
+    final = snapshot_dir(installation_id, full_name)
+    staging = new_staging_dir(final)
+
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".tar.gz", dir=final.parent) as archive:
+            start = time.perf_counter()
+            result.bytes["download"] = await download_tarball(installation_id, full_name, ref, archive)
+            archive.flush()
+            result.seconds["download"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await asyncio.to_thread(extract_tarball, archive.name, staging, result)
+            result.seconds["extract"] = time.perf_counter() - start
+
+        await publish(staging, final, result, ref)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    finally:
+        record_metrics(result)
+
+    return result
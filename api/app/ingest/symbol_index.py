@@ -0,0 +1,422 @@
+"""
+Per-repository symbol index: a compact columnar file, memory-mapped to query.
+
+Layout (little endian; every section 8-byte aligned):
+
+    header   magic, version, counts, commit sha, per-kind totals
+    files    path_off u32 | path_len u32 | lines u32 | first u32 | count u32 | language u8 | sha 20B
+             sorted by path; `first`/`count` index into `by_file`
+    symbols  key_off u32 | key_len u16 | name_off u32 | name_len u16 | kind u8 | file u32 | start u32 | end u32
+             sorted by lower-cased short name (the lookup key)
+    by_file  u32 permutation of symbols ordered by (path, start line)
+    strings  utf-8 paths, names and keys
+
+Columns are read through memoryview casts of the mmap, so a query touches
+only the pages it needs and an idle index costs no resident memory. A
+binary search over `key` answers name lookups in microseconds.
+"""
+import asyncio
+import mmap
+import os
+import struct
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+from app.core.config import settings
+from app.core.metrics import ingest_stages
+from app.ingest.blobs import BlobStore, blob_store
+from app.ingest.snapshot import IngestResult, read_manifest, snapshot_dir
+from app.ingest.symbols import KINDS, KIND_IDS, LANGUAGES, LANGUAGE_IDS, extract
+
+MAGIC = b"SYMIDX\0\0"
+VERSION = 1
+_HEADER = struct.Struct(f"<8sIIII40s{len(KINDS)}I")  # magic, version, files, symbols, strings, sha, kind totals
+
+FILE_COLUMNS = (("path_off", "I"), ("path_len", "I"), ("lines", "I"), ("first", "I"), ("count", "I"), ("language", "B"))
+SYMBOL_COLUMNS = (
+    ("key_off", "I"), ("key_len", "H"), ("name_off", "I"), ("name_len", "H"),
+    ("kind", "B"), ("file", "I"), ("start", "I"), ("end", "I"),
+)
+MAX_NAME_BYTES = 0xFFFF
+
+
+def index_path(installation_id: int, full_name: str) -> Path:
+    snapshot = snapshot_dir(installation_id, full_name)
+    return snapshot.with_name(snapshot.name + ".symbols")
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _layout(n_files: int, n_symbols: int) -> tuple[dict, int]:
+    """Column name -> (offset, typecode, count), and where the strings start."""
+    offset = _align(_HEADER.size)
+    layout = {}
+    for columns, n in ((FILE_COLUMNS, n_files), (SYMBOL_COLUMNS, n_symbols), ((("by_file", "I"),), n_symbols)):
+        for name, code in columns:
+            layout[name] = (offset, code, n)
+            offset = _align(offset + array(code).itemsize * n)
+    layout["sha"] = (offset, "B", n_files * 20)
+    offset = _align(offset + n_files * 20)
+    return layout, offset
+
+
+# -- building -------------------------------------------------------------------
+
+
+def build_index(
+    files: dict[str, str],
+    commit_sha: str,
+    out: Path,
+    blobs: BlobStore = blob_store,
+    previous: "SymbolIndex | None" = None,
+) -> dict:
+    """
+    Index `files` (path -> blob sha) into `out`. Blobs already parsed in
+    `previous` (the last index of this repository) are reused, and each
+    distinct blob is parsed once even if it appears at several paths.
+    """
+    parsed: dict[str, tuple[int, int, list]] = {}  # sha -> (language id, lines, [(name, kind id, start, end)])
+    reused = 0
+    if previous is not None:
+        parsed = previous.parsed_blobs(set(files.values()))
+        reused = len(parsed)
+
+    path_for = {sha: path for path, sha in files.items()}
+    for sha in path_for.keys() - parsed.keys():
+        try:
+            data = blobs.path(sha).read_bytes()
+        except FileNotFoundError:
+            continue
+        language, symbols = extract(path_for[sha], data)
+        parsed[sha] = (
+            LANGUAGE_IDS[language],
+            data.count(b"\n") + (0 if data.endswith(b"\n") or not data else 1),
+            [(s.name, KIND_IDS[s.kind], s.start_line, s.end_line) for s in symbols],
+        )
+
+    strings = bytearray()
+
+    def intern(value: str) -> tuple[int, int]:
+        raw = value.encode()
+        if len(raw) > MAX_NAME_BYTES:
+            # Cut on a character boundary, so every stored string decodes.
+            raw = raw[:MAX_NAME_BYTES].decode("utf-8", "ignore").encode()
+        off = len(strings)
+        strings.extend(raw)
+        return off, len(raw)
+
+    paths = sorted(p for p, sha in files.items() if sha in parsed)
+    cols = {name: array(code) for name, code in FILE_COLUMNS + SYMBOL_COLUMNS + (("by_file", "I"),)}
+    sha_bytes = bytearray()
+    rows = []  # (key, file idx, start, end, kind, name off, name len)
+    kind_totals = [0] * len(KINDS)
+
+    for file_idx, path in enumerate(paths):
+        language, lines, symbols = parsed[files[path]]
+        off, length = intern(path)
+        cols["path_off"].append(off)
+        cols["path_len"].append(length)
+        cols["lines"].append(lines)
+        cols["first"].append(len(rows))
+        cols["count"].append(len(symbols))
+        cols["language"].append(language)
+        sha_bytes.extend(bytes.fromhex(files[path]))
+        for name, kind, start, end in sorted(symbols, key=lambda s: s[2]):
+            key = name.rsplit(".", 1)[-1].lower()
+            rows.append((key, file_idx, start, end, kind, *intern(name)))
+            kind_totals[kind] += 1
+
+    # Rows were appended in (path, line) order; the symbol columns are in key
+    # order, so by_file[row] is where that row ended up.
+    order = sorted(range(len(rows)), key=lambda i: (rows[i][0], i))
+    position = [0] * len(rows)
+    for pos, i in enumerate(order):
+        position[i] = pos
+    key_offsets: dict[str, tuple[int, int]] = {}
+    for i in order:
+        key, file_idx, start, end, kind, name_off, name_len = rows[i]
+        if key not in key_offsets:
+            key_offsets[key] = intern(key)
+        key_off, key_len = key_offsets[key]
+        cols["key_off"].append(key_off)
+        cols["key_len"].append(key_len)
+        cols["name_off"].append(name_off)
+        cols["name_len"].append(name_len)
+        cols["kind"].append(kind)
+        cols["file"].append(file_idx)
+        cols["start"].append(start)
+        cols["end"].append(end)
+    cols["by_file"].extend(position)
+
+    layout, strings_at = _layout(len(paths), len(rows))
+    out.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=out.parent, prefix=f".{out.name}.")
+    with os.fdopen(fd, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(paths), len(rows), len(strings), commit_sha.encode().ljust(40), *kind_totals))
+        for name, (offset, _, _) in sorted(layout.items(), key=lambda item: item[1][0]):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(sha_bytes if name == "sha" else cols[name].tobytes())
+        f.write(b"\0" * (strings_at - f.tell()))
+        f.write(strings)
+    os.replace(tmp, out)
+    return {"files": len(paths), "symbols": len(rows), "parsed": len(parsed) - reused, "reused": reused}
+
+
+# -- reading --------------------------------------------------------------------
+
+
+class _StringColumn:
+    """Sequence view over an (offset, length) column pair, for bisect."""
+
+    def __init__(self, strings: memoryview, offsets: memoryview, lengths: memoryview):
+        self.strings, self.offsets, self.lengths = strings, offsets, lengths
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, i: int) -> bytes:
+        off = self.offsets[i]
+        return bytes(self.strings[off : off + self.lengths[i]])
+
+
+class SymbolIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mmap, "MADV_RANDOM"):
+            # Lookups are a handful of scattered reads; readahead would pull in
+            # (and keep resident) far more of the file than they touch.
+            self._mm.madvise(mmap.MADV_RANDOM)
+        self._views: list[memoryview] = []
+        magic, version, n_files, n_symbols, strings_len, sha, *kind_totals = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a symbol index (version {VERSION})")
+        self.file_count, self.symbol_count = n_files, n_symbols
+        self.commit_sha = sha.decode().strip()
+        self.kind_totals = {KINDS[i]: n for i, n in enumerate(kind_totals) if n}
+
+        layout, strings_at = _layout(n_files, n_symbols)
+        for name, (offset, code, count) in layout.items():
+            column = self._view(offset, array(code).itemsize * count).cast(code)
+            self._views.append(column)
+            setattr(self, name, column)
+        self._strings = self._view(strings_at, strings_len)
+        self._keys = _StringColumn(self._strings, self.key_off, self.key_len)
+        self._paths = _StringColumn(self._strings, self.path_off, self.path_len)
+
+    def _view(self, offset: int, length: int) -> memoryview:
+        view = memoryview(self._mm)[offset : offset + length]
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        for view in reversed(self._views):  # casts before the slices they came from
+            view.release()
+        self._views.clear()
+        self._mm.close()
+
+    def _string(self, off: int, length: int) -> bytes:
+        # Decoded with errors="replace": indexes built before intern() cut on
+        # character boundaries can end a long name mid-character.
+        return bytes(self._strings[off : off + length])
+
+    def file_path(self, file_idx: int) -> str:
+        return self._paths[file_idx].decode(errors="replace")
+
+    def _row(self, i: int) -> dict:
+        file_idx, start, end = self.file[i], self.start[i], self.end[i]
+        return {
+            "name": self._string(self.name_off[i], self.name_len[i]).decode(errors="replace"),
+            "kind": KINDS[self.kind[i]],
+            "path": self.file_path(file_idx),
+            "language": LANGUAGES[self.language[file_idx]],
+            "start_line": start,
+            "end_line": end,
+            "lines": end - start + 1,
+        }
+
+    def lookup(self, name: str, prefix: bool = False, kind: str | None = None, limit: int = 50) -> list[dict]:
+        """Symbols whose short name equals (or starts with) `name`, case-insensitively."""
+        key = name.lower().encode()
+        i = bisect_left(self._keys, key)
+        kind_id = KIND_IDS.get(kind) if kind else None
+        out = []
+        while i < self.symbol_count and len(out) < limit:
+            current = self._keys[i]
+            if not (current.startswith(key) if prefix else current == key):
+                break
+            if kind_id is None or self.kind[i] == kind_id:
+                out.append(self._row(i))
+            i += 1
+        return out
+
+    def _file_range(self, path_prefix: str | None) -> tuple[int, int]:
+        if not path_prefix:
+            return 0, self.file_count
+        prefix = path_prefix.encode()
+        lo = bisect_left(self._paths, prefix)
+        hi = lo
+        while hi < self.file_count and self._paths[hi].startswith(prefix):
+            hi += 1
+        return lo, hi
+
+    def listing(self, path_prefix: str | None = None, kind: str | None = None, offset: int = 0, limit: int = 100) -> list[dict]:
+        """Symbols in (path, line) order, optionally under `path_prefix` and of one kind."""
+        lo, hi = self._file_range(path_prefix)
+        if lo >= hi:
+            return []
+        start, stop = self.first[lo], self.first[hi - 1] + self.count[hi - 1]
+        kind_id = KIND_IDS.get(kind) if kind else None
+        out, skipped = [], 0
+        for pos in range(start, stop):
+            i = self.by_file[pos]
+            if kind_id is not None and self.kind[i] != kind_id:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            out.append(self._row(i))
+            if len(out) >= limit:
+                break
+        return out
+
+    def parsed_blobs(self, wanted: set[str]) -> dict[str, tuple[int, int, list]]:
+        """sha -> (language id, lines, symbols) for blobs in `wanted` this index already covers."""
+        out = {}
+        for file_idx in range(self.file_count):
+            sha = bytes(self.sha[file_idx * 20 : file_idx * 20 + 20]).hex()
+            if sha not in wanted or sha in out:
+                continue
+            first, count = self.first[file_idx], self.count[file_idx]
+            symbols = []
+            for pos in range(first, first + count):
+                i = self.by_file[pos]
+                name = self._string(self.name_off[i], self.name_len[i]).decode(errors="replace")
+                symbols.append((name, self.kind[i], self.start[i], self.end[i]))
+            out[sha] = (self.language[file_idx], self.lines[file_idx], symbols)
+        return out
+
+    def summary(self) -> dict:
+        return {
+            "commit_sha": self.commit_sha,
+            "files": self.file_count,
+            "symbols": self.symbol_count,
+            "kinds": self.kind_totals,
+            "bytes": len(self._mm),
+        }
+
+
+class IndexCache:
+    """
+    Open indexes, LRU-bounded. Each entry is an mmap plus a handful of
+    memoryviews, so idle repositories cost (almost) nothing resident.
+    A rebuilt file (new inode/mtime) is reopened on next access.
+
+    Work handed to a thread takes a `lease` instead of `get`: an index
+    evicted or replaced while leased stays open until the last lease ends,
+    so the thread never reads from a closed mmap.
+
+    `opener(path)` must return an object with `identity` (inode, mtime_ns
+    of `path` when opened) and `close()`.
+    """
+
+    def __init__(self, max_open: int, opener: Callable = SymbolIndex):
+        self.max_open = max_open
+        self.opener = opener
+        self._open: OrderedDict[Path, Any] = OrderedDict()
+        self._leases: dict[int, int] = {}  # id(index) -> leases held
+        self._retired: dict[int, Any] = {}  # evicted while leased; closed on the last release
+        self.opens = 0
+
+    def get(self, path: Path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._drop(path)
+            return None
+        index = self._open.get(path)
+        if index is not None and index.identity == (stat.st_ino, stat.st_mtime_ns):
+            self._open.move_to_end(path)
+            return index
+        self._drop(path)
+        index = self.opener(path)
+        self.opens += 1
+        self._open[path] = index
+        while len(self._open) > self.max_open:
+            _, evicted = self._open.popitem(last=False)
+            self._close(evicted)
+        return index
+
+    @contextmanager
+    def lease(self, path: Path):
+        """`get`, with the index kept open until the block exits."""
+        index = self.get(path)
+        if index is None:
+            yield None
+            return
+        key = id(index)
+        self._leases[key] = self._leases.get(key, 0) + 1
+        try:
+            yield index
+        finally:
+            self._leases[key] -= 1
+            if not self._leases[key]:
+                del self._leases[key]
+                retired = self._retired.pop(key, None)
+                if retired is not None:
+                    retired.close()
+
+    def _drop(self, path: Path) -> None:
+        index = self._open.pop(path, None)
+        if index is not None:
+            self._close(index)
+
+    def _close(self, index) -> None:
+        if id(index) in self._leases:
+            self._retired[id(index)] = index
+        else:
+            index.close()
+
+    def stats(self) -> dict:
+        return {
+            "open": len(self._open),
+            "max_open": self.max_open,
+            "opens": self.opens,
+            "leased": len(self._leases),
+            "retired": len(self._retired),
+        }
+
+
+symbol_indexes = IndexCache(settings.SYMBOL_INDEX_MAX_OPEN)
+
+
+async def index_snapshot(result: IngestResult) -> dict | None:
+    """(Re)build the symbol index after a sync, reusing the previous index for unchanged blobs."""
+    out = index_path(result.installation_id, result.full_name)
+    with symbol_indexes.lease(out) as previous:
+        if previous is not None and previous.commit_sha == result.commit_sha:
+            return None
+
+        files = result.manifest
+        if not files:
+            manifest = read_manifest(snapshot_dir(result.installation_id, result.full_name))
+            files = manifest["files"] if manifest else {}
+
+        start = time.perf_counter()
+        built = await asyncio.to_thread(build_index, files, result.commit_sha or "", out, blob_store, previous)
+    elapsed = time.perf_counter() - start
+    result.seconds["index"] = elapsed
+    ingest_stages.observe(elapsed, "index")
+    return built
@@ -0,0 +1,218 @@
+"""
+Symbol extraction: which functions, classes, etc. a source file defines.
+
+Python goes through `ast`, so nesting and end lines are exact. Other
+languages use per-line regexes plus brace matching for the end line;
+good enough to say "what exists, where, and how big" without pulling in
+a parser per language.
+"""
+import ast
+import re
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+
+# Stored as one byte in the index; append only.
+KINDS = ("function", "method", "class", "interface", "type", "enum", "struct", "trait", "constant", "module")
+KIND_IDS = {kind: i for i, kind in enumerate(KINDS)}
+
+LANGUAGES = ("other", "python", "javascript", "typescript", "go", "rust", "java", "kotlin", "csharp", "ruby", "php")
+LANGUAGE_IDS = {lang: i for i, lang in enumerate(LANGUAGES)}
+_SUFFIX_LANGUAGE = {
+    ".py": "python", ".pyi": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript", ".mts": "typescript", ".cts": "typescript",
+    ".go": "go", ".rs": "rust", ".java": "java", ".kt": "kotlin", ".kts": "kotlin",
+    ".cs": "csharp", ".rb": "ruby", ".php": "php",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Symbol:
+    name: str  # qualified within the file, e.g. "Service.handle"
+    kind: str
+    start_line: int  # 1-based, inclusive
+    end_line: int
+
+
+def language_for(path: str) -> str:
+    return _SUFFIX_LANGUAGE.get(PurePosixPath(path).suffix.lower(), "other")
+
+
+def extract(path: str, source: bytes) -> tuple[str, list[Symbol]]:
+    """(language, symbols) for one file; unknown languages and unparsable files yield no symbols."""
+    language = language_for(path)
+    if language == "other":
+        return language, []
+    text = source.decode("utf-8", errors="replace")
+    if language == "python":
+        return language, _python(text)
+    return language, _regex(language, text)
+
+
+# -- Python ---------------------------------------------------------------------
+
+
+def _python(text: str) -> list[Symbol]:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+    out: list[Symbol] = []
+
+    def visit(body: list, prefix: str, in_class: bool) -> None:
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                name = prefix + node.name
+                out.append(Symbol(name, "class", node.lineno, node.end_lineno or node.lineno))
+                visit(node.body, name + ".", True)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                name = prefix + node.name
+                kind = "method" if in_class else "function"
+                out.append(Symbol(name, kind, node.lineno, node.end_lineno or node.lineno))
+                visit(node.body, name + ".", False)
+            elif not prefix and isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name) and target.id.isupper():
+                        out.append(Symbol(target.id, "constant", node.lineno, node.end_lineno or node.lineno))
+
+    visit(tree.body, "", False)
+    return out
+
+
+# -- brace languages (and Ruby) ----------------------------------------------------
+
+_JS = [
+    (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"), "function"),
+    (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)"), "class"),
+    (re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[A-Za-z_$][\w$]*\s*=>)"), "function"),
+    (re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?interface\s+([A-Za-z_$][\w$]*)"), "interface"),
+    (re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?type\s+([A-Za-z_$][\w$]*)\s*(?:<[^>]*>)?\s*="), "type"),
+    (re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?(?:const\s+)?enum\s+([A-Za-z_$][\w$]*)"), "enum"),
+    (re.compile(r"^\s*(?:export\s+)?const\s+([A-Z][A-Z0-9_]*)\s*(?::[^=]+)?="), "constant"),
+]
+_JS_METHOD = re.compile(
+    r"^\s+(?:(?:public|private|protected|static|async|readonly|override|get|set)\s+)*"
+    r"([A-Za-z_$][\w$]*)\s*(?:<[^>]*>)?\([^;]*\)\s*(?::\s*[^{;]+)?\{\s*$"
+)
+_JS_NOT_METHODS = frozenset({"if", "for", "while", "switch", "catch", "function", "return", "with"})
+
+_PATTERNS: dict[str, list] = {
+    "javascript": _JS,
+    "typescript": _JS,
+    "go": [
+        (re.compile(r"^func\s+\(\s*\w+\s+\*?(\w+)[^)]*\)\s*(\w+)"), "method"),
+        (re.compile(r"^func\s+(\w+)"), "function"),
+        (re.compile(r"^type\s+(\w+)\s+struct\b"), "struct"),
+        (re.compile(r"^type\s+(\w+)\s+interface\b"), "interface"),
+        (re.compile(r"^type\s+(\w+)\s"), "type"),
+    ],
+    "rust": [
+        (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?(?:const\s+)?fn\s+(\w+)"), "function"),
+        (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?struct\s+(\w+)"), "struct"),
+        (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?enum\s+(\w+)"), "enum"),
+        (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?trait\s+(\w+)"), "trait"),
+        (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?type\s+(\w+)"), "type"),
+        (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?mod\s+(\w+)\s*\{"), "module"),
+    ],
+    "java": [
+        (re.compile(r"^\s*(?:(?:public|protected|private|abstract|static|final|sealed)\s+)*class\s+(\w+)"), "class"),
+        (re.compile(r"^\s*(?:(?:public|protected|private|abstract|static|sealed)\s+)*interface\s+(\w+)"), "interface"),
+        (re.compile(r"^\s*(?:(?:public|protected|private|static)\s+)*enum\s+(\w+)"), "enum"),
+        (re.compile(r"^\s*(?:(?:public|protected|private|static)\s+)*record\s+(\w+)"), "class"),
+        (re.compile(r"^\s+(?:(?:public|protected|private|abstract|static|final|synchronized|native)\s+)+[\w<>\[\],.? ]+\s+(\w+)\s*\("), "method"),
+    ],
+    "kotlin": [
+        (re.compile(r"^\s*(?:(?:public|internal|private|protected|open|abstract|data|sealed|inline|enum)\s+)*class\s+(\w+)"), "class"),
+        (re.compile(r"^\s*(?:(?:public|internal|private)\s+)*(?:fun\s+)?interface\s+(\w+)"), "interface"),
+        (re.compile(r"^\s*(?:(?:public|internal|private)\s+)*object\s+(\w+)"), "class"),
+        (re.compile(r"^\s*(?:(?:public|internal|private|protected|override|open|suspend|inline)\s+)*fun\s+(?:<[^>]*>\s*)?(?:[\w.]+\.)?(\w+)"), "function"),
+    ],
+    "csharp": [
+        (re.compile(r"^\s*(?:(?:public|internal|private|protected|abstract|static|sealed|partial)\s+)*class\s+(\w+)"), "class"),
+        (re.compile(r"^\s*(?:(?:public|internal|private|protected|partial)\s+)*interface\s+(\w+)"), "interface"),
+        (re.compile(r"^\s*(?:(?:public|internal|private|protected)\s+)*(?:readonly\s+)?struct\s+(\w+)"), "struct"),
+        (re.compile(r"^\s*(?:(?:public|internal|private|protected)\s+)*enum\s+(\w+)"), "enum"),
+        (re.compile(r"^\s+(?:(?:public|internal|private|protected|static|virtual|override|abstract|async|sealed)\s+)+[\w<>\[\],.? ]+\s+(\w+)\s*\("), "method"),
+    ],
+    "php": [
+        (re.compile(r"^\s*(?:(?:abstract|final)\s+)?class\s+(\w+)"), "class"),
+        (re.compile(r"^\s*interface\s+(\w+)"), "interface"),
+        (re.compile(r"^\s*trait\s+(\w+)"), "trait"),
+        (re.compile(r"^\s*(?:(?:public|private|protected|static|abstract|final)\s+)*function\s+&?\s*(\w+)"), "function"),
+    ],
+    "ruby": [
+        (re.compile(r"^\s*class\s+([A-Z][\w:]*)"), "class"),
+        (re.compile(r"^\s*module\s+([A-Z][\w:]*)"), "module"),
+        (re.compile(r"^\s*def\s+(?:self\.)?([\w?!=]+)"), "method"),
+    ],
+}
+_CONTAINERS = frozenset({"class", "interface", "struct", "trait", "module", "enum"})
+_STRINGS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`|//.*$')
+
+
+def _brace_end(lines: list[str], start: int) -> int:
+    """Index of the line closing the block opened at or after `start` (strings/comments ignored)."""
+    depth, opened = 0, False
+    for i in range(start, min(len(lines), start + 20_000)):
+        code = _STRINGS.sub("", lines[i])
+        depth += code.count("{") - code.count("}")
+        opened = opened or "{" in code
+        if opened and depth <= 0:
+            return i
+        if not opened and i > start + 3:
+            break  # declaration without a body (e.g. `type X = ...;`)
+        if not opened and code.rstrip().endswith(";"):
+            break
+    return start
+
+
+def _indent_end(lines: list[str], start: int) -> int:
+    """Ruby: the `end` at the same indentation as the opening line."""
+    indent = len(lines[start]) - len(lines[start].lstrip())
+    for i in range(start + 1, len(lines)):
+        stripped = lines[i].lstrip()
+        if stripped.startswith("end") and len(lines[i]) - len(stripped) == indent:
+            return i
+    return start
+
+
+def _regex(language: str, text: str) -> list[Symbol]:
+    lines = text.splitlines()
+    patterns = _PATTERNS[language]
+    out: list[Symbol] = []
+    containers: list[tuple[str, int]] = []  # (qualified name, end index)
+
+    for i, line in enumerate(lines):
+        while containers and i > containers[-1][1]:
+            containers.pop()
+
+        match, kind = None, None
+        for pattern, candidate in patterns:
+            match = pattern.match(line)
+            if match:
+                kind = candidate
+                break
+        if match is None and containers and language in ("javascript", "typescript"):
+            match = _JS_METHOD.match(line)
+            if match and match.group(1) not in _JS_NOT_METHODS:
+                kind = "method"
+            else:
+                match = None
+        if match is None:
+            continue
+
+        name = match.group(match.lastindex or 1)
+        if language == "go" and kind == "method":
+            name = f"{match.group(1)}.{match.group(2)}"
+        elif containers:
+            name = f"{containers[-1][0]}.{name}"
+            if kind == "function":
+                kind = "method"
+
+        end = _indent_end(lines, i) if language == "ruby" else _brace_end(lines, i)
+        out.append(Symbol(name, kind, i + 1, end + 1))
+        if kind in _CONTAINERS and end > i:
+            containers.append((name, end))
+
+    return out
@@ -0,0 +1,339 @@
+"""
+Keeping repository snapshots current without re-downloading them.
+
+A re-sync asks GitHub for the head commit (a conditional GET, free when
+nothing changed). If it moved, the new recursive tree is diffed against
+the previous snapshot's manifest and only blobs missing from the blob
+store are fetched; everything else is relinked from the store. First
+syncs, truncated trees and large changes fall back to one tarball.
+"""
+import asyncio
+import logging
+import shutil
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Awaitable, Callable
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.db import SessionLocal, dialect_insert
+from app.core.profiling import background_task
+from app.github.etag_cache import github_get_cache
+from app.github.scheduler import BACKGROUND, priority, scheduler
+from app.github.tokens import get_installation_token, installation_tokens
+from app.ingest.blobs import blob_store
+from app.ingest.snapshot import (
+    SNIFF_BYTES,
+    IngestError,
+    IngestResult,
+    classify,
+    ingest_repository,
+    new_staging_dir,
+    publish,
+    read_manifest,
+    record_metrics,
+    safe_path,
+    snapshot_dir,
+)
+from app.ingest.symbol_index import index_snapshot
+from app.ingest.vectors import index_vectors
+from app.models.repository import RepositorySnapshot
+
+logger = logging.getLogger(__name__)
+
+SYMLINK_MODE = "120000"
+
+
+def _headers(token: str, accept: str = "application/vnd.github+json") -> dict:
+    return {"Authorization": f"Bearer {token}", "Accept": accept}
+
+
+async def _github_get(installation_id: int, token: str, url: str, accept: str | None = None, cached: bool = False):
+    headers = _headers(token, accept) if accept else _headers(token)
+    if cached:
+        r = await github_get_cache.get(installation_id, url, headers=headers)
+    else:
+        r = await scheduler.request("GET", url, bucket=installation_id, headers=headers)
+    if r.status_code == 401:
+        installation_tokens.invalidate(installation_id)
+    if r.status_code >= 400:
+        raise IngestError(f"GET {url} failed: {r.status_code}")
+    return r
+
+
+async def head_commit(installation_id: int, full_name: str, ref: str | None) -> str:
+    token = await get_installation_token(installation_id)
+    url = f"{settings.GITHUB_API_URL}/repos/{full_name}/commits/{ref or 'HEAD'}"
+    # The sha media type returns just the 40 hex chars; the ETag makes repeats free.
+    r = await _github_get(installation_id, token, url, accept="application/vnd.github.sha", cached=True)
+    return r.text.strip()
+
+
+async def fetch_tree(installation_id: int, full_name: str, commit_sha: str) -> dict:
+    token = await get_installation_token(installation_id)
+    url = f"{settings.GITHUB_API_URL}/repos/{full_name}/git/trees/{commit_sha}?recursive=1"
+    return (await _github_get(installation_id, token, url)).json()
+
+
+async def fetch_blob(installation_id: int, full_name: str, sha: str) -> bytes:
+    token = await get_installation_token(installation_id)
+    url = f"{settings.GITHUB_API_URL}/repos/{full_name}/git/blobs/{sha}"
+    return (await _github_get(installation_id, token, url, accept="application/vnd.github.raw+json")).content
+
+
+def wanted_files(tree: dict, result: IngestResult, binary: set[str] = frozenset()) -> dict[str, str]:
+    """
+    path -> blob sha for the tree entries a snapshot should contain, by the
+    same rules (and byte budget) as extract_tarball. `binary` holds SHAs an
+    earlier sync already sniffed as binary; they are skipped unfetched.
+    """
+    wanted = {}
+    kept_bytes = 0
+    for entry in tree.get("tree", []):
+        if entry.get("type") != "blob":
+            continue  # directories; "commit" entries are submodules
+        if entry.get("mode") == SYMLINK_MODE:
+            result.files["link"] += 1
+            continue
+        path, size = safe_path(entry["path"]), entry.get("size", 0)
+        reason = "unsafe" if path is None else classify(path, size)
+        if reason is None and entry["sha"] in binary:
+            reason = "binary"
+            result.skipped[str(path)] = entry["sha"]
+        if reason is None and kept_bytes + size > settings.INGEST_MAX_EXTRACTED_BYTES:
+            reason = "over_budget"
+        if reason is not None:
+            result.files[reason] += 1
+            result.bytes["skipped"] += size
+            continue
+        wanted[str(path)] = entry["sha"]
+        kept_bytes += size
+    return wanted
+
+
+async def _fetch_missing(installation_id: int, full_name: str, shas: set[str], result: IngestResult) -> set[str]:
+    """Fetch blobs into the store; returns the SHAs that turned out to be binary."""
+    sem = asyncio.Semaphore(settings.INGEST_BLOB_CONCURRENCY)
+    binary: set[str] = set()
+
+    async def one(sha: str) -> None:
+        async with sem:
+            data = await fetch_blob(installation_id, full_name, sha)
+        result.bytes["download"] += len(data)
+        if b"\0" in data[:SNIFF_BYTES]:
+            binary.add(sha)
+            return
+        await asyncio.to_thread(blob_store.put, data, sha)
+
+    await asyncio.gather(*[one(sha) for sha in shas])
+    return binary
+
+
+def _link_snapshot(staging: Path, files: dict[str, str]) -> None:
+    for path, sha in files.items():
+        blob_store.link_into(sha, staging / path)
+
+
+async def _incremental(
+    installation_id: int, full_name: str, ref: str | None, commit_sha: str, previous: dict
+) -> IngestResult | None:
+    """Build the new snapshot from a tree diff; None means use a tarball instead."""
+    result = IngestResult(installation_id, full_name, mode="incremental", commit_sha=commit_sha)
+
+    start = time.perf_counter()
+    tree = await fetch_tree(installation_id, full_name, commit_sha)
+    result.seconds["tree"] = time.perf_counter() - start
+    if tree.get("truncated"):
+        return None  # too big for the trees API to list in one response
+
+    wanted = wanted_files(tree, result, set(previous.get("skipped", {}).values()))
+    old = previous.get("files", {})
+    changed = {path for path, sha in wanted.items() if old.get(path) != sha}
+    missing = {wanted[path] for path in changed if not blob_store.has(wanted[path])}
+    if len(missing) > settings.INGEST_INCREMENTAL_MAX_BLOBS:
+        return None
+
+    start = time.perf_counter()
+    binary = await _fetch_missing(installation_id, full_name, missing, result)
+    result.seconds["download"] = time.perf_counter() - start
+    if binary:
+        result.files["binary"] += sum(1 for sha in wanted.values() if sha in binary)
+        result.skipped.update((path, sha) for path, sha in wanted.items() if sha in binary)
+        wanted = {path: sha for path, sha in wanted.items() if sha not in binary}
+
+    result.manifest = wanted
+    result.files["kept"] = len(wanted)
+    result.files["changed"] = len(changed)
+    result.files["removed"] = sum(1 for path in old if path not in wanted)
+    result.files["fetched"] = len(missing) - len(binary)
+    result.files["reused"] = len(changed) - len(missing)
+
+    final = snapshot_dir(installation_id, full_name)
+    staging = new_staging_dir(final)
+    try:
+        start = time.perf_counter()
+        await asyncio.to_thread(_link_snapshot, staging, wanted)
+        result.seconds["link"] = time.perf_counter() - start
+        await publish(staging, final, result, ref)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return result
+
+
+async def _record_snapshot(result: IngestResult) -> None:
+    async with SessionLocal() as db:
+        stmt = dialect_insert(RepositorySnapshot.__table__).values(
+            installation_id=result.installation_id,
+            full_name=result.full_name,
+            commit_sha=result.commit_sha,
+            file_count=len(result.manifest),
+            ingested_at=datetime.utcnow(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["installation_id", "full_name"],
+            set_={col: stmt.excluded[col] for col in ("commit_sha", "file_count", "ingested_at")},
+        )
+        await db.execute(stmt)
+        await db.commit()
+
+
+async def last_ingested_sha(installation_id: int, full_name: str) -> str | None:
+    async with SessionLocal() as db:
+        return (
+            await db.execute(
+                select(RepositorySnapshot.commit_sha).where(
+                    RepositorySnapshot.installation_id == installation_id,
+                    RepositorySnapshot.full_name == full_name,
+                )
+            )
+        ).scalar_one_or_none()
+
+
+async def sync_repository(installation_id: int, full_name: str, ref: str | None = None) -> IngestResult:
+    """Bring the repository's snapshot up to `ref` (default branch if None), as cheaply as possible."""
+    start = time.perf_counter()
+    commit_sha = await head_commit(installation_id, full_name, ref)
+    head_seconds = time.perf_counter() - start
+
+    previous = read_manifest(snapshot_dir(installation_id, full_name))
+    if previous is not None and previous.get("commit_sha") == commit_sha:
+        if await last_ingested_sha(installation_id, full_name) != commit_sha:
+            await _record_snapshot(
+                IngestResult(installation_id, full_name, commit_sha=commit_sha, manifest=previous["files"])
+            )
+        result = IngestResult(installation_id, full_name, mode="unchanged", commit_sha=commit_sha)
+        result.files["kept"] = len(previous.get("files", {}))
+    else:
+        result = None
+        if previous is not None:
+            result = await _incremental(installation_id, full_name, ref, commit_sha, previous)
+        if result is not None:
+            record_metrics(result)
+        else:
+            # Pin the archive to the commit we diffed against, not whatever HEAD is by now.
+            result = await ingest_repository(installation_id, full_name, commit_sha)
+            result.commit_sha = result.commit_sha or commit_sha
+        await _record_snapshot(result)
+
+    result.seconds["head"] = head_seconds
+    return result
+
+
+_LAST_MAX = 4096
+
+
+class Ingestor:
+    """
+    Runs syncs with at most `max_concurrency` at a time (each may hold a
+    download stream and an extraction thread). One run per repository at a
+    time; asking again while it runs joins the existing run.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._running: dict[tuple[int, str], asyncio.Task] = {}
+        # Latest outcome per repository, least recently finished first.
+        self.last: OrderedDict[tuple[int, str], dict] = OrderedDict()
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+
+    def schedule(
+        self,
+        installation_id: int,
+        full_name: str,
+        ref: str | None = None,
+        progress: Callable[..., Awaitable[None]] | None = None,
+    ) -> asyncio.Task:
+        """`progress(stage=...)` is called as a new run moves through its stages (not when joining one)."""
+        key = (installation_id, full_name)
+        task = self._running.get(key)
+        if task is not None and not task.done():
+            return task
+
+        async def run() -> IngestResult:
+            self.waiting += 1
+            try:
+                await self._slots.acquire()
+            finally:
+                self.waiting -= 1
+            async def stage(name: str) -> None:
+                if progress is not None:
+                    await progress(stage=name)
+
+            try:
+                await stage("sync")
+                with priority(BACKGROUND):
+                    result = await sync_repository(installation_id, full_name, ref)
+                await stage("symbols")
+                symbols = await index_snapshot(result)
+                await stage("vectors")
+                vectors = await index_vectors(result)
+                self.completed += 1
+                self._remember(key, {"status": "done", **result.as_dict(), "symbols": symbols, "vectors": vectors})
+                return result
+            except Exception as e:
+                self.failed += 1
+                self._remember(key, {"status": "failed", "error": str(e)})
+                logger.exception("Ingestion failed for %s (installation %s)", full_name, installation_id)
+                raise
+            finally:
+                self._slots.release()
+                self._running.pop(key, None)
+
+        task = background_task(run())
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._running[key] = task
+        return task
+
+    def _remember(self, key: tuple[int, str], outcome: dict) -> None:
+        # Evicted repositories fall back to their last_ingested_sha row.
+        self.last[key] = outcome
+        self.last.move_to_end(key)
+        while len(self.last) > _LAST_MAX:
+            self.last.popitem(last=False)
+
+    def status(self, installation_id: int, full_name: str) -> dict | None:
+        key = (installation_id, full_name)
+        task = self._running.get(key)
+        if task is not None and not task.done():
+            return {"status": "running"}
+        return self.last.get(key)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": len(self._running) - self.waiting,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            **{f"blobs_{k}": v for k, v in blob_store.stats().items()},
+        }
+
+
+ingestor = Ingestor(max_concurrency=settings.INGEST_MAX_CONCURRENCY)
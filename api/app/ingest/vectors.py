@@ -0,0 +1,370 @@
+"""
+Local code search: hashed TF-IDF vectors over repository chunks.
+
+Chunks are functions/methods (spans from the symbol index) or fixed line
+windows for files without any. Identifiers are split on snake_case and
+camelCase, hashed into DIM buckets (no vocabulary to maintain) and
+weighted 1 + log(tf). Per repository we persist, as .npy files loaded
+with mmap_mode="r":
+
+    CSR rows     indptr, indices, tf          -- raw term frequencies per chunk
+    postings     post_terms, post_ptr, post_docs, post_w
+                 term -> chunks, weights already tf * idf / |chunk|
+    chunks       chunk_file, chunk_start, chunk_end, name_off, names
+    df           document frequency per hash bucket
+
+A query is a few postings slices and one np.bincount, so scoring is
+vectorised over every chunk at once (and over several queries in a batch).
+Re-syncs keep the CSR rows of unchanged files and only tokenise new ones;
+idf, norms and postings are then recomputed with array operations.
+"""
+import asyncio
+import json
+import os
+import re
+import shutil
+import time
+import zlib
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import ingest_stages
+from app.ingest.blobs import BlobStore, blob_store
+from app.ingest.snapshot import IngestResult, new_staging_dir, read_manifest, snapshot_dir, swap_into_place
+from app.ingest.symbol_index import IndexCache, index_path, symbol_indexes
+from app.ingest.symbols import KIND_IDS, extract
+
+HASH_BITS = 18
+DIM = 1 << HASH_BITS
+WINDOW_LINES = 60
+MAX_CHUNK_LINES = 400
+CHUNK_KINDS = frozenset({KIND_IDS["function"], KIND_IDS["method"]})
+SCORE_CELLS = 1 << 16  # queries * chunks per batched bincount; past L2 size batching stops paying
+
+META = "meta.json"
+ARRAYS = (
+    "indptr", "indices", "tf", "df", "post_terms", "post_ptr", "post_docs", "post_w",
+    "chunk_file", "chunk_start", "chunk_end", "name_off", "names",
+)
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]+")
+_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+")
+STOPWORDS = frozenset({
+    "self", "def", "return", "the", "and", "for", "if", "else", "elif", "import", "from", "const",
+    "let", "var", "function", "class", "this", "new", "true", "false", "none", "null", "in", "of",
+    "to", "is", "not", "or", "with", "as", "async", "await", "export", "public", "private", "static",
+    "void", "int", "str", "string", "bool", "an", "be", "it", "on", "at", "by", "we",
+})
+
+
+def vectors_path(installation_id: int, full_name: str) -> Path:
+    snapshot = snapshot_dir(installation_id, full_name)
+    return snapshot.with_name(snapshot.name + ".vectors")
+
+
+@lru_cache(maxsize=1 << 16)
+def _term_id(token: str) -> int:
+    return zlib.crc32(token.encode()) & (DIM - 1)
+
+
+def tokens(text: str) -> list[str]:
+    """Lower-cased identifier parts plus whole identifiers, minus keywords."""
+    out = []
+    for word in _WORD.findall(text):
+        lowered = word.lower()
+        if lowered not in STOPWORDS:
+            out.append(lowered)
+        for part in _PART.findall(word):
+            part = part.lower()
+            if len(part) > 1 and part not in STOPWORDS and part != lowered:
+                out.append(part)
+    return out
+
+
+def chunk_terms(text: str, name: str, path: str) -> Counter:
+    counts = Counter(_term_id(t) for t in tokens(text))
+    # What a chunk is called and where it lives say a lot about its topic.
+    for t in tokens(name) + tokens(path.replace("/", " ")):
+        counts[_term_id(t)] += 2
+    return counts
+
+
+def file_chunks(path: str, data: bytes, symbols: list | None) -> list[tuple[str, int, int, str]]:
+    """(name, start line, end line, text) per chunk of one file."""
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if symbols is None:
+        _, parsed = extract(path, data)
+        symbols = [(s.name, KIND_IDS[s.kind], s.start_line, s.end_line) for s in parsed]
+    spans = [
+        (name, start, min(end, start + MAX_CHUNK_LINES - 1))
+        for name, kind, start, end in symbols
+        if kind in CHUNK_KINDS
+    ]
+    if not spans:
+        spans = [
+            ("", start + 1, min(start + WINDOW_LINES, len(lines)))
+            for start in range(0, len(lines), WINDOW_LINES)
+        ]
+    return [(name, start, end, "\n".join(lines[start - 1 : end])) for name, start, end in spans]
+
+
+# -- building -------------------------------------------------------------------
+
+
+def _gather_rows(indptr: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """New indptr and the flat positions selecting CSR `rows` (vectorised, no Python loop)."""
+    lengths = (indptr[rows + 1] - indptr[rows]).astype(np.int64)
+    new_ptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_ptr[1:])
+    positions = np.repeat(indptr[rows] - new_ptr[:-1], lengths) + np.arange(new_ptr[-1], dtype=np.int64)
+    return new_ptr, positions
+
+
+def finish_arrays(indptr: np.ndarray, indices: np.ndarray, tf: np.ndarray) -> dict[str, np.ndarray]:
+    """df, idf-weighted normalised postings from CSR rows of raw tf weights."""
+    n = len(indptr) - 1
+    doc_of = np.repeat(np.arange(n, dtype=np.int32), np.diff(indptr))
+    df = np.bincount(indices, minlength=DIM).astype(np.int32)
+    idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+
+    w = tf * idf[indices]
+    norms = np.sqrt(np.bincount(doc_of, weights=w.astype(np.float64) ** 2, minlength=n)).astype(np.float32)
+    norms[norms == 0] = 1.0
+
+    order = np.argsort(indices, kind="stable")
+    sorted_terms = indices[order]
+    post_terms, starts = np.unique(sorted_terms, return_index=True)
+    return {
+        "df": df,
+        "post_terms": post_terms.astype(np.int32),
+        "post_ptr": np.append(starts, len(sorted_terms)).astype(np.int64),
+        "post_docs": doc_of[order],
+        "post_w": (w / norms[doc_of])[order].astype(np.float32),
+    }
+
+
+def build_vectors(
+    files: dict[str, str],
+    commit_sha: str,
+    out: Path,
+    blobs: BlobStore = blob_store,
+    symbols: dict[str, tuple] | None = None,
+    previous: "VectorIndex | None" = None,
+) -> dict:
+    """
+    Write the vector index for `files` (path -> blob sha) to the directory
+    `out`. Chunks of files whose blob is unchanged since `previous` are
+    carried over as-is; `symbols` (sha -> (language, lines, spans), from
+    the symbol index) saves re-parsing files for chunk boundaries.
+    """
+    symbols = symbols or {}
+    paths = sorted(files)
+    file_ids = {path: i for i, path in enumerate(paths)}
+
+    parts_ptr, parts_indices, parts_tf = [], [], []
+    chunk_file, chunk_start, chunk_end, names = [], [], [], []
+    carried = set()
+
+    if previous is not None:
+        keep = np.array(
+            [i for i, (path, sha) in enumerate(previous.files) if files.get(path) == sha], dtype=np.int32
+        )
+        rows = np.flatnonzero(np.isin(previous.chunk_file, keep))
+        new_ptr, positions = _gather_rows(previous.indptr, rows)
+        parts_ptr.append(new_ptr)
+        parts_indices.append(np.asarray(previous.indices)[positions])
+        parts_tf.append(np.asarray(previous.tf)[positions])
+        remap = np.full(len(previous.files), -1, dtype=np.int32)
+        for i in keep:
+            remap[i] = file_ids[previous.files[i][0]]
+            carried.add(previous.files[i][0])
+        chunk_file.append(remap[previous.chunk_file[rows]])
+        chunk_start.append(np.asarray(previous.chunk_start)[rows])
+        chunk_end.append(np.asarray(previous.chunk_end)[rows])
+        name_ptr, name_positions = _gather_rows(previous.name_off, rows)
+        names.append((name_ptr, np.asarray(previous.names)[name_positions]))
+
+    # Tokenise everything that wasn't carried over.
+    row_terms: list[Counter] = []
+    new_file, new_start, new_end, new_names = [], [], [], []
+    for path in paths:
+        if path in carried:
+            continue
+        try:
+            data = blobs.path(files[path]).read_bytes()
+        except FileNotFoundError:
+            continue
+        spans = symbols.get(files[path])
+        for name, start, end, text in file_chunks(path, data, spans[2] if spans else None):
+            row_terms.append(chunk_terms(text, name, path))
+            new_file.append(file_ids[path])
+            new_start.append(start)
+            new_end.append(end)
+            new_names.append(name.encode())
+
+    lengths = np.array([len(c) for c in row_terms], dtype=np.int64)
+    ptr = np.zeros(len(row_terms) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=ptr[1:])
+    parts_ptr.append(ptr)
+    parts_indices.append(np.fromiter((t for c in row_terms for t in c), dtype=np.int32, count=int(ptr[-1])))
+    parts_tf.append(
+        (1.0 + np.log(np.fromiter((v for c in row_terms for v in c.values()), dtype=np.float32, count=int(ptr[-1]))))
+    )
+    chunk_file.append(np.array(new_file, dtype=np.int32))
+    chunk_start.append(np.array(new_start, dtype=np.int32))
+    chunk_end.append(np.array(new_end, dtype=np.int32))
+    name_lengths = np.array([len(n) for n in new_names], dtype=np.int64)
+    name_ptr = np.zeros(len(new_names) + 1, dtype=np.int64)
+    np.cumsum(name_lengths, out=name_ptr[1:])
+    names.append((name_ptr, np.frombuffer(b"".join(new_names), dtype=np.uint8)))
+
+    arrays = {
+        "indptr": _concat_ptr(parts_ptr),
+        "indices": np.concatenate(parts_indices).astype(np.int32),
+        "tf": np.concatenate(parts_tf).astype(np.float32),
+        "chunk_file": np.concatenate(chunk_file),
+        "chunk_start": np.concatenate(chunk_start),
+        "chunk_end": np.concatenate(chunk_end),
+        "name_off": _concat_ptr([ptr for ptr, _ in names]),
+        "names": np.concatenate([blob for _, blob in names]),
+    }
+    arrays.update(finish_arrays(arrays["indptr"], arrays["indices"], arrays["tf"]))
+
+    meta = {"commit_sha": commit_sha, "dim": DIM, "chunks": len(arrays["chunk_file"]), "files": [[p, files[p]] for p in paths]}
+    write_index(out, meta, arrays)
+    return {"chunks": meta["chunks"], "tokenized": len(row_terms), "carried": meta["chunks"] - len(row_terms)}
+
+
+def _concat_ptr(parts: list[np.ndarray]) -> np.ndarray:
+    out, base = [np.zeros(1, dtype=np.int64)], 0
+    for ptr in parts:
+        out.append(ptr[1:] + base)
+        base += int(ptr[-1])
+    return np.concatenate(out)
+
+
+def write_index(out: Path, meta: dict, arrays: dict[str, np.ndarray]) -> None:
+    staging = new_staging_dir(out)
+    try:
+        for name in ARRAYS:
+            np.save(staging / f"{name}.npy", arrays[name])
+        (staging / META).write_text(json.dumps(meta, separators=(",", ":")))
+        swap_into_place(staging, out)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+# -- querying -------------------------------------------------------------------
+
+
+class VectorIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        # Resolved once: `path` is a symlink a rebuild may swap while the arrays are loading.
+        version = path.resolve()
+        stat = os.stat(version)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        meta = json.loads((version / META).read_text())
+        self.commit_sha = meta["commit_sha"]
+        self.files = [tuple(f) for f in meta["files"]]
+        self.chunk_count = meta["chunks"]
+        for name in ARRAYS:
+            setattr(self, name, np.load(version / f"{name}.npy", mmap_mode="r"))
+        n = self.chunk_count
+        self._idf = None if n == 0 else (np.log((1.0 + n) / (1.0 + np.asarray(self.df))) + 1.0).astype(np.float32)
+
+    def close(self) -> None:
+        for name in ARRAYS:
+            setattr(self, name, None)  # drops the memmaps
+
+    def _query_postings(self, query: str) -> tuple[np.ndarray, np.ndarray]:
+        counts = Counter(_term_id(t) for t in tokens(query) or [query.lower()])
+        terms = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        q = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self._idf[terms]
+        q /= np.linalg.norm(q)
+        found = np.searchsorted(self.post_terms, terms)
+        docs, weights = [], []
+        for term, i, weight in zip(terms, found, q):
+            if i == len(self.post_terms) or self.post_terms[i] != term:
+                continue
+            lo, hi = self.post_ptr[i], self.post_ptr[i + 1]
+            docs.append(self.post_docs[lo:hi])
+            weights.append(self.post_w[lo:hi] * weight)
+        if not docs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(docs).astype(np.int64), np.concatenate(weights)
+
+    def search(self, queries: list[str], k: int = 10) -> list[list[dict]]:
+        """Top-k chunks per query by cosine similarity; queries are scored in batches."""
+        n = self.chunk_count
+        if n == 0:
+            return [[] for _ in queries]
+        results = []
+        batch = max(1, SCORE_CELLS // n)
+        for b in range(0, len(queries), batch):
+            group = queries[b : b + batch]
+            postings = [self._query_postings(q) for q in group]
+            docs = np.concatenate([d + row * n for row, (d, _) in enumerate(postings)])
+            weights = np.concatenate([w for _, w in postings])
+            scores = np.bincount(docs, weights=weights, minlength=len(group) * n).reshape(len(group), n)
+            results.extend(self._top(scores, k))
+        return results
+
+    def _top(self, scores: np.ndarray, k: int) -> list[list[dict]]:
+        """Row-wise top-k of a (queries, chunks) score matrix, one argpartition for the lot."""
+        k = min(k, scores.shape[1])
+        np.negative(scores, out=scores)
+        top = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(top_scores, axis=1, kind="stable")
+        top, top_scores = np.take_along_axis(top, order, axis=1), -np.take_along_axis(top_scores, order, axis=1)
+        return [
+            [self.chunk(int(i), float(score)) for i, score in zip(row, row_scores) if score > 0]
+            for row, row_scores in zip(top, top_scores)
+        ]
+
+    def chunk(self, i: int, score: float) -> dict:
+        lo, hi = self.name_off[i], self.name_off[i + 1]
+        return {
+            "path": self.files[self.chunk_file[i]][0],
+            "name": bytes(self.names[lo:hi]).decode() or None,
+            "start_line": int(self.chunk_start[i]),
+            "end_line": int(self.chunk_end[i]),
+            "score": round(score, 4),
+        }
+
+    def summary(self) -> dict:
+        return {"commit_sha": self.commit_sha, "files": len(self.files), "chunks": self.chunk_count, "dim": DIM}
+
+
+vector_indexes = IndexCache(settings.VECTOR_INDEX_MAX_OPEN, opener=VectorIndex)
+
+
+async def index_vectors(result: IngestResult) -> dict | None:
+    """(Re)build the search vectors after a sync; unchanged files keep their rows."""
+    out = vectors_path(result.installation_id, result.full_name)
+    with vector_indexes.lease(out) as previous:
+        if previous is not None and previous.commit_sha == result.commit_sha:
+            return None
+
+        files = result.manifest
+        if not files:
+            manifest = read_manifest(snapshot_dir(result.installation_id, result.full_name))
+            files = manifest["files"] if manifest else {}
+
+        symbol_index = symbol_indexes.get(index_path(result.installation_id, result.full_name))
+        spans = symbol_index.parsed_blobs(set(files.values())) if symbol_index is not None else None
+
+        start = time.perf_counter()
+        built = await asyncio.to_thread(
+            build_vectors, files, result.commit_sha or "", out, blob_store, spans, previous
+        )
+    elapsed = time.perf_counter() - start
+    result.seconds["vectors"] = elapsed
+    ingest_stages.observe(elapsed, "vectors")
+    return built
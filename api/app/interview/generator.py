@@ -0,0 +1,72 @@
+"""
+Where interview questions and feedback come from.
+
+A generator yields text token by token; the session streams each token as
+soon as it arrives, so time-to-first-token is whatever the generator's is.
+INTERVIEW_GENERATOR names the implementation ("module:attr", called with
+no arguments); the default is a deterministic local stub so the transport
+can be developed and load-tested without a model behind it.
+"""
+import asyncio
+import importlib
+import random
+import re
+from typing import AsyncIterator, Protocol
+
+from app.core.config import settings
+
+
+class Generator(Protocol):
+    def question(self, topic: str, seed: str, index: int) -> AsyncIterator[str]: ...
+
+    def feedback(self, topic: str, seed: str, index: int, question: str, answer: str) -> AsyncIterator[str]: ...
+
+
+_QUESTIONS = (
+    "Walk me through how you would design {topic} so it keeps working when traffic grows tenfold.",
+    "What is the hardest bug you have hit in {topic}, and how did you narrow it down?",
+    "How would you test {topic} without depending on the network or a real database?",
+    "Where would you expect {topic} to be slow, and what would you measure first?",
+    "If {topic} had to be rewritten tomorrow, what would you keep and what would you change?",
+    "Explain the trade-offs between caching and recomputing in {topic}.",
+    "How would you roll out a breaking change to {topic} without downtime?",
+)
+_KEY_TERMS = ("latency", "cache", "test", "measure", "index", "queue", "retry", "trade-off", "rollback", "profile")
+_WORD = re.compile(r"\S+\s*")
+
+
+class StubGenerator:
+    """Canned questions and rule-based feedback; identical output for identical (seed, index, answer)."""
+
+    def __init__(self, token_delay: float | None = None):
+        self.token_delay = settings.INTERVIEW_STUB_TOKEN_DELAY_MS / 1000 if token_delay is None else token_delay
+
+    async def _tokens(self, text: str) -> AsyncIterator[str]:
+        for token in _WORD.findall(text):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token
+
+    def question(self, topic: str, seed: str, index: int) -> AsyncIterator[str]:
+        rng = random.Random(f"{seed}:{index}")
+        return self._tokens(rng.choice(_QUESTIONS).format(topic=topic))
+
+    def feedback(self, topic: str, seed: str, index: int, question: str, answer: str) -> AsyncIterator[str]:
+        words = len(answer.split())
+        covered = [term for term in _KEY_TERMS if term in answer.lower()]
+        missing = [term for term in _KEY_TERMS if term not in covered][:3]
+        parts = []
+        if words < 30:
+            parts.append(f"That answer was short ({words} words); interviewers expect you to reason out loud.")
+        else:
+            parts.append(f"Good level of detail ({words} words).")
+        if covered:
+            parts.append("You touched on " + ", ".join(covered) + ".")
+        if missing:
+            parts.append("Consider also discussing " + ", ".join(missing) + ".")
+        return self._tokens(" ".join(parts))
+
+
+def load_generator() -> Generator:
+    module, _, attr = settings.INTERVIEW_GENERATOR.partition(":")
+    return getattr(importlib.import_module(module), attr)()
@@ -0,0 +1,370 @@
+"""
+Interview sessions streamed over a WebSocket.
+
+Client -> server (JSON text frames):
+    {"type": "start", "topic": "..."}                      new session
+    {"type": "resume", "session_id": "...", "last_seq": N}  after a reconnect
+    {"type": "answer", "text": "..."}                      more of the answer, as typed
+    {"type": "answer_end"}                                 answer done; feedback follows
+    {"type": "ack", "seq": N}                              got every frame up to N
+    {"type": "ping"} / {"type": "pong"}
+
+Server -> client: content frames carry a "seq" (1, 2, ...): session,
+question_start, token {"stream": "question"|"feedback", "text"},
+question_end, feedback_start, feedback_end, end. Control frames (ping,
+pong, resumed, error) are unsequenced.
+
+Flow control: at most INTERVIEW_WINDOW_FRAMES sequenced frames may be
+unacknowledged; clients ack at least every half window. While the window
+is full the generator keeps going and its tokens are coalesced into the
+pending token frame, so a slow reader gets fewer, larger frames instead
+of an ever-growing queue. Past INTERVIEW_MAX_PENDING_BYTES the generator
+itself is paused.
+
+Limits: INTERVIEW_MAX_SESSIONS per process and
+INTERVIEW_MAX_SESSIONS_PER_USER. A user at their limit who starts another
+session gets it in place of their oldest detached one; with all of them
+attached, the new one is refused.
+
+Resume: unacknowledged frames are kept, so a client that reconnects with
+its last seq gets exactly what it missed and the interview carries on
+(it also keeps generating while nobody is attached). Sessions live in
+this process; with several API processes, reconnects must be routed back
+to the same one (sticky on the session id).
+
+Cost per idle session is three parked coroutines (the socket reader, the
+sender and the interview script) and a few small objects; heartbeats and
+dead-peer detection are one sweeper task for the whole process.
+"""
+import asyncio
+import json
+import logging
+import secrets
+import time
+from collections import deque
+
+from app.core.config import settings
+from app.core.metrics import interview_first_token
+from app.core.profiling import background_task
+from app.interview.generator import Generator, load_generator
+
+logger = logging.getLogger(__name__)
+
+QUESTION, ANSWER, FEEDBACK, DONE, FAILED = "question", "answer", "feedback", "done", "failed"
+
+
+def _dumps(frame: dict) -> str:
+    return json.dumps(frame, separators=(",", ":"))
+
+
+class SessionLimit(Exception):
+    pass
+
+
+class UserSessionLimit(SessionLimit):
+    pass
+
+
+class InterviewSession:
+    def __init__(self, manager: "SessionManager", user_id: int, topic: str, generator: Generator):
+        self.manager = manager
+        self.id = secrets.token_urlsafe(16)
+        self.user_id = user_id
+        self.topic = topic
+        self.generator = generator
+        self.index = 0
+        self.phase = QUESTION
+        self.transcript: list[dict] = []
+        self._answer: list[str] = []
+        self._answer_bytes = 0
+        self._answered = asyncio.Event()
+
+        # Outbound: pending (no seq yet) -> sent and unacked (kept for replay) -> acked (dropped).
+        self.seq = 0
+        self.acked = 0
+        self._unacked: deque[tuple[int, str]] = deque()
+        self._pending: deque[dict] = deque()
+        self._pending_bytes = 0
+        self._control: deque[dict] = deque()
+        self._wake = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._first_token: tuple[str, float] | None = None
+
+        self.ws = None
+        self._sender: asyncio.Task | None = None
+        self.last_recv = self.last_sent = time.monotonic()
+        self.detached_at: float | None = None
+
+        self.emit({"type": "session", "session_id": self.id, "topic": topic, "questions": settings.INTERVIEW_QUESTIONS})
+        self._script = background_task(self._run())
+
+    # -- the interview -------------------------------------------------------------
+
+    async def _run(self) -> None:
+        try:
+            for index in range(settings.INTERVIEW_QUESTIONS):
+                self.index, self.phase = index, QUESTION
+                self.emit({"type": "question_start", "index": index})
+                question = await self._stream(QUESTION, self.generator.question(self.topic, self.id, index))
+                self.emit({"type": "question_end", "index": index})
+
+                self.phase = ANSWER
+                await self._answered.wait()
+                self._answered.clear()
+                answer = "".join(self._answer)
+                self._answer, self._answer_bytes = [], 0
+
+                self.phase = FEEDBACK
+                self.emit({"type": "feedback_start", "index": index})
+                feedback = await self._stream(
+                    FEEDBACK, self.generator.feedback(self.topic, self.id, index, question, answer)
+                )
+                self.emit({"type": "feedback_end", "index": index})
+                self.transcript.append({"question": question, "answer": answer, "feedback": feedback})
+            self.phase = DONE
+            self.emit({"type": "end", "questions": len(self.transcript)})
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Interview generator failed (session %s)", self.id)
+            self.phase = FAILED
+            self.control({"type": "error", "message": "The interview could not continue."})
+
+    async def _stream(self, stream: str, tokens) -> str:
+        if stream == QUESTION or self._first_token is None:
+            # (Feedback is timed from answer_end, when the client starts waiting.)
+            self._first_token = (stream, time.perf_counter())
+        text = []
+        async for token in tokens:
+            text.append(token)
+            await self._emit_token(stream, token)
+        return "".join(text)
+
+    # -- inbound -------------------------------------------------------------------
+
+    def answer(self, text: str) -> None:
+        if self.phase != ANSWER:
+            self.control({"type": "error", "message": "Not expecting an answer right now."})
+            return
+        if self._answer_bytes + len(text) > settings.INTERVIEW_MAX_ANSWER_BYTES:
+            self.control({"type": "error", "message": "Answer too long; the rest was dropped."})
+            text = text[: max(settings.INTERVIEW_MAX_ANSWER_BYTES - self._answer_bytes, 0)]
+        self._answer.append(text)
+        self._answer_bytes += len(text)
+
+    def answer_end(self) -> None:
+        if self.phase != ANSWER:
+            self.control({"type": "error", "message": "Not expecting an answer right now."})
+            return
+        self._first_token = (FEEDBACK, time.perf_counter())
+        self._answered.set()
+
+    def ack(self, seq: int) -> None:
+        seq = min(seq, self.seq)
+        if seq <= self.acked:
+            return
+        self.acked = seq
+        while self._unacked and self._unacked[0][0] <= seq:
+            self._unacked.popleft()
+        self._wake.set()
+
+    # -- outbound ------------------------------------------------------------------
+
+    def emit(self, frame: dict) -> None:
+        self._pending.append(frame)
+        self._wake.set()
+
+    def control(self, frame: dict) -> None:
+        self._control.append(frame)
+        self._wake.set()
+
+    async def _emit_token(self, stream: str, text: str) -> None:
+        last = self._pending[-1] if self._pending else None
+        if last is not None and last["type"] == "token" and last["stream"] == stream:
+            last["text"] += text
+            self.manager.coalesced += 1
+        else:
+            self._pending.append({"type": "token", "stream": stream, "text": text})
+        self._pending_bytes += len(text)
+        self._wake.set()
+        if self._pending_bytes > settings.INTERVIEW_MAX_PENDING_BYTES:
+            self._drained.clear()
+            self.manager.paused += 1
+            await self._drained.wait()
+
+    async def _send_loop(self, ws, replay: list[str]) -> None:
+        try:
+            for text in replay:
+                await ws.send_text(text)
+            self.manager.replayed += len(replay)
+            while True:
+                self._wake.clear()
+                while self._control:
+                    await ws.send_text(_dumps(self._control.popleft()))
+                    self.last_sent = time.monotonic()
+                while self._pending and self.seq - self.acked < settings.INTERVIEW_WINDOW_FRAMES:
+                    frame = self._pending.popleft()
+                    if frame["type"] == "token":
+                        self._pending_bytes -= len(frame["text"])
+                        self._observe_first_token(frame["stream"])
+                    self.seq += 1
+                    frame["seq"] = self.seq
+                    text = _dumps(frame)
+                    self._unacked.append((self.seq, text))
+                    await ws.send_text(text)
+                    self.last_sent = time.monotonic()
+                    self.manager.frames_sent += 1
+                if self._pending_bytes <= settings.INTERVIEW_MAX_PENDING_BYTES:
+                    self._drained.set()
+                await self._wake.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The socket went away; the reader sees it too and detaches. Unacked frames stay for a resume.
+            pass
+
+    def _observe_first_token(self, stream: str) -> None:
+        if self._first_token is not None and self._first_token[0] == stream:
+            interview_first_token.observe(time.perf_counter() - self._first_token[1], stream)
+            self._first_token = None
+
+    # -- connection ----------------------------------------------------------------
+
+    def attach(self, ws, last_seq: int | None = None) -> None:
+        """Make `ws` this session's connection; with `last_seq`, replay what came after it."""
+        self.detach(self.ws)
+        if last_seq is not None:
+            self.ack(last_seq)
+        self.ws = ws
+        self.detached_at = None
+        self.last_recv = time.monotonic()
+        replay = [text for seq, text in self._unacked]
+        self._sender = asyncio.create_task(self._send_loop(ws, replay))
+
+    def detach(self, ws) -> None:
+        if ws is None or ws is not self.ws:
+            return
+        if self._sender is not None:
+            self._sender.cancel()
+            self._sender = None
+        self.ws = None
+        self.detached_at = time.monotonic()
+
+    def close(self) -> None:
+        self.detach(self.ws)
+        self._script.cancel()
+        self._drained.set()
+
+    def state(self) -> dict:
+        return {"session_id": self.id, "phase": self.phase, "index": self.index, "seq": self.seq, "acked": self.acked}
+
+
+class SessionManager:
+    def __init__(self):
+        self.sessions: dict[str, InterviewSession] = {}
+        self._by_user: dict[int, dict[str, InterviewSession]] = {}  # oldest first
+        self._generator: Generator | None = None
+        self._sweeper: asyncio.Task | None = None
+        self.created = 0
+        self.resumed = 0
+        self.expired = 0
+        self.dead_peers = 0
+        self.frames_sent = 0
+        self.coalesced = 0
+        self.replayed = 0
+        self.paused = 0
+        self.replaced = 0
+        self.user_limited = 0
+
+    def create(self, user_id: int, topic: str) -> InterviewSession:
+        mine = self._by_user.get(user_id, {})
+        if len(mine) >= settings.INTERVIEW_MAX_SESSIONS_PER_USER:
+            # Abandoned tabs wait INTERVIEW_RESUME_SECONDS for a reconnect; a new start wins over them.
+            oldest = next((s for s in mine.values() if s.ws is None), None)
+            if oldest is None:
+                self.user_limited += 1
+                raise UserSessionLimit()
+            self.drop(oldest)
+            self.replaced += 1
+        if len(self.sessions) >= settings.INTERVIEW_MAX_SESSIONS:
+            raise SessionLimit()
+        if self._generator is None:
+            self._generator = load_generator()
+        self._ensure_sweeper()
+        session = InterviewSession(self, user_id, topic, self._generator)
+        self.sessions[session.id] = session
+        self._by_user.setdefault(user_id, {})[session.id] = session
+        self.created += 1
+        return session
+
+    def get(self, session_id: str, user_id: int) -> InterviewSession | None:
+        session = self.sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+        return session
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = background_task(self._sweep())
+            self._sweeper.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _sweep(self) -> None:
+        interval = min(settings.INTERVIEW_HEARTBEAT_SECONDS, settings.INTERVIEW_IDLE_TIMEOUT_SECONDS) / 2
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            dead = []
+            for session in list(self.sessions.values()):
+                if session.ws is not None:
+                    if now - session.last_recv > settings.INTERVIEW_IDLE_TIMEOUT_SECONDS:
+                        dead.append(session.ws)
+                        session.detach(session.ws)
+                    elif now - session.last_sent > settings.INTERVIEW_HEARTBEAT_SECONDS:
+                        session.control({"type": "ping"})
+                elif now - session.detached_at > settings.INTERVIEW_RESUME_SECONDS:
+                    self.drop(session)
+                    self.expired += 1
+            if dead:
+                self.dead_peers += len(dead)
+                closing = asyncio.gather(*(ws.close(code=1001) for ws in dead), return_exceptions=True)
+                try:
+                    await asyncio.wait_for(closing, timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def drop(self, session: InterviewSession) -> None:
+        session.close()
+        self.sessions.pop(session.id, None)
+        mine = self._by_user.get(session.user_id)
+        if mine is not None:
+            mine.pop(session.id, None)
+            if not mine:
+                del self._by_user[session.user_id]
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        for session in list(self.sessions.values()):
+            self.drop(session)
+
+    def stats(self) -> dict:
+        attached = sum(1 for s in self.sessions.values() if s.ws is not None)
+        return {
+            "sessions": len(self.sessions),
+            "attached": attached,
+            "detached": len(self.sessions) - attached,
+            "created": self.created,
+            "resumed": self.resumed,
+            "expired": self.expired,
+            "dead_peers": self.dead_peers,
+            "frames_sent": self.frames_sent,
+            "tokens_coalesced": self.coalesced,
+            "replayed_frames": self.replayed,
+            "generator_paused": self.paused,
+            "replaced": self.replaced,
+            "user_limited": self.user_limited,
+        }
+
+
+interview_sessions = SessionManager()
@@ -0,0 +1,126 @@
+"""
+Postgres LISTEN/NOTIFY, fanned out in-process.
+
+One dedicated asyncpg connection per process listens on a channel and wakes
+whoever is waiting for a given payload (a job id for progress, anything for
+"a job was enqueued"). NOTIFY is sent inside the writer's transaction, so
+waiters wake only once the change is committed and visible.
+
+Where LISTEN isn't available (SQLite, or Postgres behind transaction-pooling
+pgbouncer, which can't hold a session-level LISTEN) waiters simply time out
+after the poll interval and re-read; callers never need to know which.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import engine
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_CHANNEL = "job_progress"
+ENQUEUED_CHANNEL = "job_enqueued"
+
+
+def listen_supported() -> bool:
+    return engine.dialect.name == "postgresql" and not settings.DB_PGBOUNCER
+
+
+async def notify(db: AsyncSession, channel: str, payload: str) -> None:
+    """Queue a NOTIFY on the caller's transaction (no-op without Postgres)."""
+    if engine.dialect.name == "postgresql":
+        await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+
+class Listener:
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._waiters: dict[str | None, set[asyncio.Event]] = {}
+        self.notifications = 0
+        self.reconnects = 0
+
+    @property
+    def listening(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def start(self) -> None:
+        if not listen_supported() or self.listening:
+            return
+        async with self._lock:
+            if self.listening:
+                return
+            import asyncpg
+
+            url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+            try:
+                conn = await asyncpg.connect(url.render_as_string(hide_password=False))
+                await conn.add_listener(self.channel, self._on_notify)
+            except Exception:
+                logger.warning("LISTEN %s unavailable; falling back to polling", self.channel, exc_info=True)
+                return
+            conn.add_termination_listener(self._on_terminate)
+            self.reconnects += self._conn is not None
+            self._conn = conn
+
+    async def stop(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None and not conn.is_closed():
+            await conn.close()
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        self.notifications += 1
+        for key in (payload, None):
+            for event in self._waiters.get(key, ()):
+                event.set()
+
+    def _on_terminate(self, conn) -> None:
+        # Wake everyone so they re-read, and let the next start() reconnect.
+        for events in self._waiters.values():
+            for event in events:
+                event.set()
+
+    @contextmanager
+    def subscribe(self, key: str | None = None):
+        """An Event set on each notification for `key` (None: any payload)."""
+        event = asyncio.Event()
+        self._waiters.setdefault(key, set()).add(event)
+        try:
+            yield event
+        finally:
+            waiters = self._waiters.get(key)
+            waiters.discard(event)
+            if not waiters:
+                del self._waiters[key]
+
+    async def wait(self, event: asyncio.Event, timeout: float) -> bool:
+        """True if notified, False on timeout. Without LISTEN this is a plain sleep."""
+        if not self.listening:
+            await self.start()
+        if not self.listening:
+            timeout = min(timeout, settings.JOBS_POLL_SECONDS)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            event.clear()
+
+    def stats(self) -> dict:
+        return {
+            "listening": self.listening,
+            "waiters": sum(len(w) for w in self._waiters.values()),
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+        }
+
+
+progress_events = Listener(PROGRESS_CHANNEL)
+enqueued_events = Listener(ENQUEUED_CHANNEL)
@@ -0,0 +1,39 @@
+"""
+Job kinds and what runs them. A handler is `async def (ctx, **payload)`;
+its return value (plain JSON) becomes the job's result. Raise to fail the
+attempt (retried with backoff); raise PermanentError to fail for good.
+"""
+from typing import Awaitable, Callable
+
+from app.github.scheduler import BACKGROUND, priority
+from app.github.sync import sync_installation_repositories
+from app.ingest.sync import ingestor
+from app.jobs.queue import JobContext
+
+Handler = Callable[..., Awaitable[object]]
+HANDLERS: dict[str, Handler] = {}
+
+
+class PermanentError(Exception):
+    """Retrying won't help (bad payload, repository gone, ...)."""
+
+
+def handler(kind: str):
+    def register(fn: Handler) -> Handler:
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+@handler("ingest_repository")
+async def ingest_repository(ctx: JobContext, installation_id: int, full_name: str, ref: str | None = None) -> dict:
+    await ingestor.schedule(installation_id, full_name, ref, progress=ctx.progress)
+    return ingestor.status(installation_id, full_name)
+
+
+@handler("sync_installation")
+async def sync_installation(ctx: JobContext, installation_id: int) -> dict:
+    await ctx.progress(stage="fetching repositories", force=True)
+    with priority(BACKGROUND):
+        count = await sync_installation_repositories(installation_id)
+    return {"repositories": count}
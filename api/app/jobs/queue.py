@@ -0,0 +1,276 @@
+"""
+The job queue: a `jobs` table, claimed with FOR UPDATE SKIP LOCKED.
+
+    enqueue()  insert (or return the existing row for an idempotency key)
+    claim()    atomically take the next runnable job, lowest priority first
+    complete() / fail()  finish it, or schedule a retry with backoff
+    progress() store progress and NOTIFY anyone streaming it
+
+Ownership is a lease: the claiming worker heartbeats its jobs, and a job
+whose heartbeat is older than JOBS_LEASE_SECONDS (the worker died) goes
+back to the queue. Every write made on behalf of a claimed job checks
+`locked_by`, so a worker that lost its lease can't clobber the new owner.
+"""
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import and_, delete, select, update
+
+from app.core.config import settings
+from app.core.db import SessionLocal, dialect_insert
+from app.jobs.events import ENQUEUED_CHANNEL, PROGRESS_CHANNEL, notify
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+INTERACTIVE = 0  # a user is watching
+BACKGROUND = 10
+
+
+def job_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() + "Z",
+        "updated_at": job.updated_at.isoformat() + "Z",
+        "started_at": job.started_at.isoformat() + "Z" if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() + "Z" if job.finished_at else None,
+    }
+
+
+async def enqueue(
+    kind: str,
+    payload: dict[str, Any] | None = None,
+    *,
+    priority: int = BACKGROUND,
+    idempotency_key: str | None = None,
+    user_id: int | None = None,
+    max_attempts: int | None = None,
+    run_at: datetime | None = None,
+) -> tuple[Job, bool]:
+    """(job, created). With an idempotency key already used, the existing job and False."""
+    now = datetime.utcnow()
+    values = {
+        "kind": kind,
+        "payload": payload or {},
+        "status": QUEUED,
+        "priority": priority,
+        "idempotency_key": idempotency_key,
+        "user_id": user_id,
+        "attempts": 0,
+        "max_attempts": max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        "run_at": run_at or now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    async with SessionLocal() as db:
+        stmt = dialect_insert(Job.__table__).values(**values)
+        if idempotency_key is not None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["idempotency_key"])
+        job_id = (await db.execute(stmt.returning(Job.id))).scalar_one_or_none()
+        if job_id is not None:
+            await notify(db, ENQUEUED_CHANNEL, kind)
+        await db.commit()
+
+        if job_id is None:
+            job = (await db.execute(select(Job).where(Job.idempotency_key == idempotency_key))).scalar_one()
+            return job, False
+        return await db.get(Job, job_id), True
+
+
+async def get_job(job_id: int) -> Job | None:
+    async with SessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+async def claim(worker: str, kinds: list[str] | None = None) -> Job | None:
+    """Take the next runnable job. Concurrent claimers skip each other's locked rows instead of queueing on them."""
+    now = datetime.utcnow()
+    candidate = (
+        select(Job.id)
+        .where(Job.status == QUEUED, Job.run_at <= now)
+        .order_by(Job.priority, Job.run_at, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if kinds:
+        candidate = candidate.where(Job.kind.in_(kinds))
+
+    stmt = (
+        update(Job)
+        .where(Job.id == candidate.scalar_subquery(), Job.status == QUEUED)
+        .values(
+            status=RUNNING,
+            locked_by=worker,
+            heartbeat_at=now,
+            attempts=Job.attempts + 1,
+            started_at=now,
+            updated_at=now,
+            progress=None,
+        )
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    async with SessionLocal() as db:
+        job = (await db.execute(stmt)).scalar_one_or_none()
+        if job is not None:
+            await notify(db, PROGRESS_CHANNEL, str(job.id))
+        await db.commit()
+        return job
+
+
+async def _finish(job: Job, worker: str, values: dict) -> bool:
+    values["updated_at"] = datetime.utcnow()
+    async with SessionLocal() as db:
+        updated = await db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == RUNNING, Job.locked_by == worker)
+            .values(**values)
+        )
+        if updated.rowcount:
+            await notify(db, PROGRESS_CHANNEL, str(job.id))
+        await db.commit()
+        return bool(updated.rowcount)
+
+
+async def complete(job: Job, worker: str, result: Any = None) -> bool:
+    """False if the lease was lost meanwhile (another worker owns the job now)."""
+    now = datetime.utcnow()
+    return await _finish(job, worker, {
+        "status": SUCCEEDED,
+        "result": _jsonable(result),
+        "error": None,
+        "locked_by": None,
+        "finished_at": now,
+    })
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, so a failing dependency isn't hammered in lockstep."""
+    delay = min(settings.JOBS_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def fail(job: Job, worker: str, error: str, retry: bool = True) -> bool:
+    """Requeue with backoff while attempts remain, else mark failed."""
+    now = datetime.utcnow()
+    if retry and job.attempts < job.max_attempts:
+        values = {
+            "status": QUEUED,
+            "run_at": now + timedelta(seconds=retry_delay(job.attempts)),
+            "locked_by": None,
+            "heartbeat_at": None,
+            "error": error,
+        }
+    else:
+        values = {"status": FAILED, "error": error, "locked_by": None, "finished_at": now}
+    return await _finish(job, worker, values)
+
+
+async def release(job: Job, worker: str) -> bool:
+    """Hand a job back untouched (worker shutting down); the attempt isn't counted."""
+    return await _finish(job, worker, {
+        "status": QUEUED,
+        "attempts": Job.attempts - 1,
+        "locked_by": None,
+        "heartbeat_at": None,
+    })
+
+
+async def progress(job: Job, worker: str, values: dict) -> bool:
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        updated = await db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == RUNNING, Job.locked_by == worker)
+            .values(progress=_jsonable(values), heartbeat_at=now, updated_at=now)
+        )
+        if updated.rowcount:
+            await notify(db, PROGRESS_CHANNEL, str(job.id))
+        await db.commit()
+        return bool(updated.rowcount)
+
+
+async def heartbeat(worker: str, job_ids: list[int]) -> None:
+    if not job_ids:
+        return
+    async with SessionLocal() as db:
+        await db.execute(
+            update(Job)
+            .where(Job.id.in_(job_ids), Job.status == RUNNING, Job.locked_by == worker)
+            .values(heartbeat_at=datetime.utcnow())
+        )
+        await db.commit()
+
+
+async def requeue_expired() -> int:
+    """Jobs whose worker stopped heartbeating go back to the queue (or fail, out of attempts)."""
+    now = datetime.utcnow()
+    expired = and_(Job.status == RUNNING, Job.heartbeat_at < now - timedelta(seconds=settings.JOBS_LEASE_SECONDS))
+    async with SessionLocal() as db:
+        failed = await db.execute(
+            update(Job)
+            .where(expired, Job.attempts >= Job.max_attempts)
+            .values(status=FAILED, error="worker lease expired", locked_by=None, finished_at=now, updated_at=now)
+        )
+        requeued = await db.execute(
+            update(Job)
+            .where(expired)
+            .values(status=QUEUED, run_at=now, locked_by=None, heartbeat_at=None, updated_at=now)
+        )
+        await db.commit()
+        return failed.rowcount + requeued.rowcount
+
+
+async def prune_finished() -> int:
+    cutoff = datetime.utcnow() - timedelta(days=settings.JOBS_RETENTION_DAYS)
+    async with SessionLocal() as db:
+        deleted = await db.execute(delete(Job).where(Job.status.in_(FINISHED), Job.finished_at < cutoff))
+        await db.commit()
+        return deleted.rowcount
+
+
+def _jsonable(value: Any) -> Any:
+    # Handlers return whatever they have (Counters, dataclass dicts...); the column takes plain JSON.
+    return None if value is None else json.loads(json.dumps(value, default=str))
+
+
+class JobContext:
+    """What a handler gets: its job, and a throttled way to report progress."""
+
+    def __init__(self, job: Job, worker: str):
+        self.job = job
+        self.worker = worker
+        self._last_progress = 0.0
+        self._stage = None
+
+    @property
+    def payload(self) -> dict:
+        return self.job.payload
+
+    async def progress(self, force: bool = False, **values: Any) -> None:
+        # Throttled, except that moving to a new stage is always recorded.
+        now = time.monotonic()
+        stage = values.get("stage", self._stage)
+        if not force and stage == self._stage and now - self._last_progress < settings.JOBS_PROGRESS_MIN_INTERVAL:
+            return
+        self._last_progress, self._stage = now, stage
+        try:
+            await progress(self.job, self.worker, values)
+        except Exception:
+            # Progress is for watchers; failing to record it mustn't fail the job.
+            logger.warning("Could not record progress for job %s", self.job.id, exc_info=True)
@@ -0,0 +1,225 @@
+"""
+Job worker.
+
+    python -m app.jobs.worker [--concurrency N] [--processes P] [--kinds a,b]
+
+Workers coordinate only through the jobs table (claims skip rows another
+worker holds), so scaling out is starting more of them: more processes
+here, more containers, or both. Each process runs up to --concurrency jobs
+at once. SIGTERM stops claiming, lets running jobs finish for --grace
+seconds and hands back whatever is still running.
+"""
+import argparse
+import asyncio
+import inspect
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import uuid
+
+from app.core.config import settings
+from app.github import client as github_client
+from app.jobs.events import enqueued_events
+from app.jobs.handlers import HANDLERS, PermanentError
+from app.jobs.queue import JobContext, claim, complete, fail, heartbeat, prune_finished, release, requeue_expired
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY_SECONDS = 3600
+
+
+class Worker:
+    def __init__(self, concurrency: int, kinds: list[str] | None = None, grace: float = 30.0):
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.concurrency = concurrency
+        self.kinds = kinds
+        self.grace = grace
+        self._running: dict[int, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+        self._changed = asyncio.Event()  # a slot freed up, or we're stopping
+        self.claimed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.lost = 0
+
+    def stop(self) -> None:
+        if not self._stopping.is_set():
+            logger.info("Worker %s stopping; %d job(s) running", self.name, len(self._running))
+        self._stopping.set()
+        self._changed.set()
+
+    async def run(self) -> None:
+        logger.info("Worker %s started (concurrency %d, kinds %s)", self.name, self.concurrency, self.kinds or "all")
+        maintenance = asyncio.create_task(self._maintain())
+        try:
+            with enqueued_events.subscribe() as enqueued:
+                while not self._stopping.is_set():
+                    if len(self._running) >= self.concurrency:
+                        await self._wait(self._changed, settings.JOBS_LEASE_SECONDS)
+                        continue
+                    try:
+                        job = await claim(self.name, self.kinds)
+                    except Exception:
+                        logger.exception("Claiming a job failed")
+                        job = None
+                    if job is None:
+                        # Retries come due without a NOTIFY, so wake up now and then regardless.
+                        await self._wait_any(enqueued, settings.JOBS_POLL_SECONDS * 5)
+                        continue
+                    self._start(job)
+        finally:
+            await self._drain()
+            maintenance.cancel()
+
+    async def _wait(self, event: asyncio.Event, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        event.clear()
+
+    async def _wait_any(self, enqueued: asyncio.Event, timeout: float) -> None:
+        waits = [
+            asyncio.ensure_future(enqueued_events.wait(enqueued, timeout)),
+            asyncio.ensure_future(self._stopping.wait()),
+        ]
+        _, pending = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+
+    def _start(self, job: Job) -> None:
+        self.claimed += 1
+        task = asyncio.create_task(self._execute(job))
+        self._running[job.id] = task
+
+        def done(_: asyncio.Task) -> None:
+            self._running.pop(job.id, None)
+            self._changed.set()
+
+        task.add_done_callback(done)
+
+    async def _execute(self, job: Job) -> None:
+        ctx = JobContext(job, self.name)
+        start = time.perf_counter()
+        try:
+            handler = HANDLERS.get(job.kind)
+            if handler is None:
+                raise PermanentError(f"unknown job kind {job.kind!r}")
+            try:
+                inspect.signature(handler).bind(ctx, **job.payload)
+            except TypeError as e:
+                raise PermanentError(f"bad payload: {e}") from None
+            result = await handler(ctx, **job.payload)
+        except asyncio.CancelledError:
+            await asyncio.shield(release(job, self.name))
+            raise
+        except PermanentError as e:
+            self.failed += 1
+            logger.warning("Job %s (%s) failed permanently: %s", job.id, job.kind, e)
+            owned = await fail(job, self.name, str(e), retry=False)
+        except Exception as e:
+            self.failed += 1
+            logger.exception("Job %s (%s) attempt %d/%d failed", job.id, job.kind, job.attempts, job.max_attempts)
+            owned = await fail(job, self.name, f"{type(e).__name__}: {e}")
+        else:
+            self.succeeded += 1
+            owned = await complete(job, self.name, result)
+            logger.info("Job %s (%s) done in %.2fs", job.id, job.kind, time.perf_counter() - start)
+        if not owned:
+            self.lost += 1
+            logger.warning("Job %s lost its lease before finishing; its outcome was dropped", job.id)
+
+    async def _maintain(self) -> None:
+        """Heartbeat our jobs, requeue jobs of workers that died, prune old ones."""
+        last_prune = 0.0
+        while True:
+            await asyncio.sleep(settings.JOBS_LEASE_SECONDS / 3)
+            try:
+                await heartbeat(self.name, list(self._running))
+                requeued = await requeue_expired()
+                if requeued:
+                    logger.warning("Requeued %d job(s) with expired leases", requeued)
+                if time.monotonic() - last_prune > PRUNE_EVERY_SECONDS:
+                    last_prune = time.monotonic()
+                    await prune_finished()
+            except Exception:
+                logger.exception("Job maintenance failed")
+
+    async def _drain(self) -> None:
+        if not self._running:
+            return
+        tasks = list(self._running.values())
+        _, pending = await asyncio.wait(tasks, timeout=self.grace)
+        for task in pending:
+            task.cancel()  # released back to the queue in _execute
+        if pending:
+            await asyncio.wait(pending)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "running": len(self._running),
+            "claimed": self.claimed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "lost": self.lost,
+        }
+
+
+async def serve(concurrency: int, kinds: list[str] | None, grace: float) -> None:
+    worker = Worker(concurrency, kinds, grace)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    await github_client.start()
+    try:
+        await worker.run()
+    finally:
+        await enqueued_events.stop()
+        await github_client.stop()
+        logger.info("Worker %s exited: %s", worker.name, worker.stats())
+
+
+def _process(concurrency: int, kinds: list[str] | None, grace: float) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s")
+    asyncio.run(serve(concurrency, kinds, grace))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background jobs from the jobs table.")
+    parser.add_argument("--concurrency", type=int, default=settings.JOBS_WORKER_CONCURRENCY)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--kinds", default="", help="comma-separated job kinds to take (default: all)")
+    parser.add_argument("--grace", type=float, default=30.0, help="seconds running jobs get to finish on shutdown")
+    args = parser.parse_args()
+    kinds = [k for k in args.kinds.split(",") if k] or None
+
+    if args.processes <= 1:
+        _process(args.concurrency, kinds, args.grace)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    children = [
+        ctx.Process(target=_process, args=(args.concurrency, kinds, args.grace), daemon=False)
+        for _ in range(args.processes)
+    ]
+    for child in children:
+        child.start()
+
+    def forward(signum, _frame):
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        child.join()
+
+
+if __name__ == "__main__":
+    main()
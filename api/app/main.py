@@ -1,13 +1,37 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.api.routes import health, auth, me
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.sessions import SessionCookieMiddleware
+from app.core.warmup import warmup
+from app.api.routes import health, auth, me, session, metrics, jobs, interview, profiles
 from app.api.routes.github_app import router as github_app_router
 from app.api.routes.oauth_github import router as oauth_github_router
+from app.github import client as github_client
+from app.interview.session import interview_sessions
+from app.jobs.events import progress_events
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await github_client.start()
+    await warmup.run()
+    try:
+        yield
+    finally:
+        await interview_sessions.close()
+        await progress_events.stop()
+        await github_client.stop()
 
-app = FastAPI(title="Interview Simulator API")
 
+app = FastAPI(title="Interview Simulator API", lifespan=lifespan)
+
+# Sets the cookies of sessions renewed in-band by get_current_user.
+app.add_middleware(SessionCookieMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[settings.FRONTEND_URL],
@@ -15,12 +39,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+# Added last so it wraps everything, CORS included.
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # API routes
 app.include_router(health.router, prefix="/api/v1")
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(me.router, prefix="/api/v1")
+app.include_router(session.router, prefix="/api/v1")
 app.include_router(github_app_router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
+app.include_router(interview.router, prefix="/api/v1")
+app.include_router(profiles.router, prefix="/api/v1")
+
+# Prometheus scrape endpoint (no /api/v1 prefix)
+app.include_router(metrics.router)
 
 # OAuth routes (no /api/v1 prefix)
 app.include_router(oauth_github_router)
@@ -0,0 +1,45 @@
+from datetime import datetime
+from sqlalchemy import JSON, BigInteger, DateTime, Index, Integer, SmallInteger, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.db import Base
+
+
+class Job(Base):
+    """Durable background work, claimed by `python -m app.jobs.worker` processes (see app/jobs)."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # The claim query: next runnable job by priority. Partial, so finished
+        # rows don't bloat the index workers scan on every claim.
+        Index(
+            "ix_jobs_claim", "priority", "run_at", "id",
+            postgresql_where=text("status = 'queued'"), sqlite_where=text("status = 'queued'"),
+        ),
+        # Expired leases (crashed workers) and pruning finished jobs.
+        Index("ix_jobs_status_heartbeat", "status", "heartbeat_at"),
+        Index("ix_jobs_user_created", "user_id", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[dict] = mapped_column(JSON, default=dict)
+    status: Mapped[str] = mapped_column(String(16), default="queued")  # queued|running|succeeded|failed
+    priority: Mapped[int] = mapped_column(SmallInteger, default=0)  # lower runs first
+    # Same key, same job: enqueueing again returns the existing row.
+    idempotency_key: Mapped[str | None] = mapped_column(String(255), unique=True, nullable=True)
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)  # who may watch it
+
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=5)
+    run_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)  # not before (retry backoff)
+    locked_by: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    progress: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    result: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,63 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Boolean, DateTime, Index, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.db import Base
+
+
+class Repository(Base):
+    """Trimmed copy of the repositories visible to a GitHub App installation."""
+
+    __tablename__ = "repositories"
+    __table_args__ = (
+        UniqueConstraint("installation_id", "github_id", name="uq_repositories_installation_github_id"),
+        # keyset pagination for the two supported sort orders
+        Index("ix_repositories_installation_name", "installation_id", func.lower("full_name"), "id"),
+        Index("ix_repositories_installation_updated", "installation_id", "updated_at", "id"),
+        Index("ix_repositories_installation_language", "installation_id", func.lower("language")),
+        # substring search (ILIKE '%q%'); needs the pg_trgm extension
+        Index(
+            "ix_repositories_full_name_trgm", "full_name",
+            postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_repositories_description_trgm", "description",
+            postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    installation_id: Mapped[int] = mapped_column(BigInteger, index=True)
+    github_id: Mapped[int] = mapped_column(BigInteger)
+    name: Mapped[str] = mapped_column(String(256))
+    full_name: Mapped[str] = mapped_column(String(512))
+    description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    language: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    private: Mapped[bool] = mapped_column(Boolean, default=False)
+    visibility: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    html_url: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    stargazers_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    forks_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+    synced_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class InstallationSync(Base):
+    """When an installation's repositories were last pulled from GitHub."""
+
+    __tablename__ = "installation_syncs"
+
+    installation_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    synced_at: Mapped[datetime] = mapped_column(DateTime)
+    repo_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class RepositorySnapshot(Base):
+    """The commit last ingested to disk for a repository (see app/ingest)."""
+
+    __tablename__ = "repository_snapshots"
+
+    installation_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    full_name: Mapped[str] = mapped_column(String(512), primary_key=True)
+    commit_sha: Mapped[str] = mapped_column(String(40))
+    file_count: Mapped[int] = mapped_column(Integer, default=0)
+    ingested_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,17 @@
+import os
+
+# Benchmarks run without a real .env; give the required settings harmless defaults.
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+os.environ.setdefault("GITHUB_APP_ID", "1")
+os.environ.setdefault("GITHUB_APP_SLUG", "bench-app")
+os.environ.setdefault("GITHUB_APP_PRIVATE_KEY_PATH", "./bench.pem")
+os.environ.setdefault("GITHUB_CLIENT_ID", "bench-client")
+os.environ.setdefault("GITHUB_CLIENT_SECRET", "bench-secret")
+os.environ.setdefault("GITHUB_APP_CLIENT_ID", "Iv1.bench-app-client")
+os.environ.setdefault("GITHUB_APP_CLIENT_SECRET", "bench-app-secret")
+os.environ.setdefault("GITHUB_REDIRECT_URI", "http://bench/auth/github/callback")
+# Benchmarks swap in a fake GitHub after startup; don't pre-connect to the real one.
+os.environ.setdefault("WARMUP_HTTP_CONNECTIONS", "0")
+# Benchmarks drive many requests from one client; bench.admission turns the limits back on.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
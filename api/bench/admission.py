@@ -0,0 +1,162 @@
+"""
+Admission control under abuse and overload.
+
+    python -m bench.admission [--seconds S] [--overload X]
+
+- looping client: one user requests /github/app/repos back to back (a
+  frontend stuck re-rendering ProtectedRoute) while another user browses
+  normally. Only the looping user is limited.
+- GitHub overload: the fake GitHub serves --capacity calls at once at
+  --latency-ms each, and many users together offer --overload times that
+  rate, open loop, for --seconds. Run with shedding off and then on.
+- DB pool stall: both pool connections are held (a slow query, a lock)
+  while dev-logins arrive; once a checkout has waited
+  SHED_DB_POOL_WAIT_MS, the rest get 503 at once instead of queueing.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("DB_POOL_SIZE", "2")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+os.environ.setdefault("SHED_DB_POOL_WAIT_MS", "200")
+
+from bench.harness import create_user, running_app  # noqa: E402
+from app.core.admission import admission_control  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.db import engine  # noqa: E402
+from app.github import client as github_client  # noqa: E402
+from app.github.scheduler import scheduler  # noqa: E402
+from app.github.tokens import get_installation_token  # noqa: E402
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(int(len(values) * q), len(values) - 1)] * 1000, 1)
+
+
+def _summary(results: list[tuple[int, float]]) -> dict:
+    ok = [t for status, t in results if status == 200]
+    rejected = [t for status, t in results if status != 200]
+    counts: dict[str, int] = {}
+    for status, _ in results:
+        counts[str(status)] = counts.get(str(status), 0) + 1
+    return {
+        "status_counts": counts,
+        "ok_ms": {"p50": _pct(ok, 0.5), "p99": _pct(ok, 0.99), "max": _pct(ok, 1.0)},
+        "rejected_ms_p99": _pct(rejected, 0.99),
+    }
+
+
+async def _get(client, results: list, url: str, cookie: str, **kwargs) -> None:
+    start = time.perf_counter()
+    r = await client.get(url, cookies={"session": cookie}, **kwargs)
+    results.append((r.status_code, time.perf_counter() - start))
+
+
+async def _looping_client(client, cookies: list[str]) -> dict:
+    looping, normal = [], []
+    retry_after = None
+    for i in range(100):
+        start = time.perf_counter()
+        r = await client.get("/api/v1/github/app/repos", cookies={"session": cookies[0]})
+        looping.append((r.status_code, time.perf_counter() - start))
+        retry_after = r.headers.get("retry-after", retry_after)
+        if i % 10 == 0:
+            await _get(client, normal, "/api/v1/github/app/repos", cookies[1])
+    return {
+        "looping_user": {**_summary(looping), "retry_after": retry_after},
+        "other_user": _summary(normal)["status_counts"],
+    }
+
+
+async def _overload(client, cookies: list[str], rate: float, seconds: float) -> dict:
+    results: list[tuple[int, float]] = []
+    tasks, peak = [], 0
+    start = time.perf_counter()
+    for i in range(int(rate * seconds)):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(_get(client, results, "/api/v1/github/app/repos", cookies[i % len(cookies)])))
+        peak = max(peak, github_client.in_flight() + scheduler.waiting)
+    await asyncio.gather(*tasks)
+    return {"offered": len(tasks), "peak_github_outbound": peak, **_summary(results)}
+
+
+async def _db_stall(client, logins: int) -> dict:
+    results: list[tuple[int, float]] = []
+
+    async def login(i: int) -> None:
+        start = time.perf_counter()
+        r = await client.post("/api/v1/auth/dev-login", json={"github_id": f"db-{i}", "username": f"db-{i}"})
+        results.append((r.status_code, time.perf_counter() - start))
+
+    held = [await engine.connect() for _ in range(settings.DB_POOL_SIZE)]
+    tasks = []
+    for i in range(logins):
+        tasks.append(asyncio.ensure_future(login(i)))
+        await asyncio.sleep(0.02)
+    for conn in held:
+        await conn.close()
+    await asyncio.gather(*tasks)
+    after = []
+    for i in range(5):
+        start = time.perf_counter()
+        r = await client.post("/api/v1/auth/dev-login", json={"github_id": f"db-after-{i}", "username": "x"})
+        after.append((r.status_code, time.perf_counter() - start))
+    return {
+        "stall_ms": round(logins * 20),
+        "during": _summary(results),
+        "after_release": _summary(after)["status_counts"],
+    }
+
+
+async def run(seconds: float, overload: float, capacity: int, latency_ms: float, users: int) -> dict:
+    out = {
+        "benchmark": "admission",
+        "github_capacity_calls_per_s": round(capacity / (latency_ms / 1000)),
+        "offered_per_s": round(capacity / (latency_ms / 1000) * overload),
+    }
+    async with running_app(repo_count=50, latency=latency_ms / 1000, max_concurrency=capacity) as (client, _):
+        settings.RATE_LIMIT_ENABLED = True  # off by default for benchmarks (bench/__init__.py)
+        shed_db, shed_github = settings.SHED_DB_POOL_WAIT_MS, settings.SHED_GITHUB_OUTBOUND
+        settings.SHED_DB_POOL_WAIT_MS = settings.SHED_GITHUB_OUTBOUND = 0
+        cookies = [await create_user(github_id=str(i), installation_id=1000 + i) for i in range(users)]
+        await asyncio.gather(*(get_installation_token(1000 + i) for i in range(users)))
+        # User cache and ETag cache, so the overload runs differ only in shedding.
+        await asyncio.gather(*(client.get("/api/v1/github/app/repos", cookies={"session": c}) for c in cookies))
+
+        out["looping_client"] = await _looping_client(client, cookies)
+
+        settings.RATE_LIMIT_ENABLED = False  # isolate shedding (users here stay under their limits anyway)
+        rate = capacity / (latency_ms / 1000) * overload
+        out["overload_no_shedding"] = await _overload(client, cookies, rate, seconds)
+        settings.SHED_DB_POOL_WAIT_MS, settings.SHED_GITHUB_OUTBOUND = shed_db, shed_github
+        out["overload_shedding"] = {"shed_github_outbound": shed_github, **await _overload(client, cookies, rate, seconds)}
+
+        out["db_pool_stall"] = {"shed_db_pool_wait_ms": settings.SHED_DB_POOL_WAIT_MS, **await _db_stall(client, 30)}
+        out["stats"] = admission_control.stats()
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--overload", type=float, default=2.0, help="offered load as a multiple of capacity")
+    parser.add_argument("--capacity", type=int, default=5, help="GitHub calls served at once")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    # Enough that no user has two /repos calls in flight, which the scheduler would collapse into one.
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--shed-outbound", type=int, default=20)
+    args = parser.parse_args()
+    settings.SHED_GITHUB_OUTBOUND = args.shed_outbound
+    print(json.dumps(asyncio.run(run(args.seconds, args.overload, args.capacity, args.latency_ms, args.users))))
+
+
+if __name__ == "__main__":
+    main()
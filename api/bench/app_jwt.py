@@ -0,0 +1,74 @@
+"""
+Micro-benchmark: per-call cost of producing a GitHub App JWT.
+
+    python -m bench.app_jwt [--iterations N]
+
+"before" reproduces the old path (read PEM from disk + parse + RS256 sign on
+every call); "after" goes through AppJwtSigner.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def _write_key(directory: str) -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    path = os.path.join(directory, "app.pem")
+    with open(path, "wb") as f:
+        f.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            )
+        )
+    return path
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    fn()  # warm
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        key_path = _write_key(tmp)
+
+        import jwt
+
+        from app.github.app_jwt import AppJwtSigner
+
+        def before() -> str:
+            with open(key_path, "r", encoding="utf-8") as f:
+                private_key = f.read()
+            now = int(time.time())
+            payload = {"iat": now - 30, "exp": now + 9 * 60, "iss": "1"}
+            return jwt.encode(payload, private_key, algorithm="RS256")
+
+        signer = AppJwtSigner(1, key_path)
+
+        before_us = _per_call_us(before, args.iterations)
+        after_us = _per_call_us(signer.get, args.iterations * 100)
+
+    print(json.dumps({
+        "benchmark": "app_jwt",
+        "before_us_per_call": round(before_us, 2),
+        "after_us_per_call": round(after_us, 2),
+        "speedup": round(before_us / after_us, 1) if after_us else None,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cold start with and without the startup warmup.
+
+    python -m bench.coldstart [--runs N]
+
+Starts the API under uvicorn in a fresh process (against the harness
+database and the in-process fake GitHub) and measures, from spawn: when
+it accepts connections (/healthz), when /readyz first returns 200, and
+the latency of the first and second /me and GitHub-backed /repos calls
+afterwards. The difference between the first and the second call is
+what the first user after a deploy pays for lazy setup.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+import bench.harness  # noqa: F401 (env, key, database)
+from bench.harness import create_user, reset_db
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _poll(http: httpx.AsyncClient, path: str, spawned: float) -> tuple[float, dict | None]:
+    while True:
+        try:
+            r = await http.get(path)
+            if r.status_code == 200:
+                return time.perf_counter() - spawned, r.json()
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.005)
+
+
+async def _timed(http: httpx.AsyncClient, path: str) -> float:
+    start = time.perf_counter()
+    r = await http.get(path)
+    assert r.status_code == 200, r.text
+    return (time.perf_counter() - start) * 1000
+
+
+async def _one(warm: bool, token: str) -> dict:
+    port = _free_port()
+    env = {**os.environ, "WARMUP_ENABLED": str(warm), "GITHUB_FAKE": "true"}
+    spawned = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"], env=env
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", cookies={"session": token}) as http:
+            listening, _ = await _poll(http, "/api/v1/healthz", spawned)
+            ready, body = await _poll(http, "/api/v1/readyz", spawned)
+            return {
+                "listening_ms": listening * 1000,
+                "ready_ms": ready * 1000,
+                "warmup_ms": body["warmup"]["warmup_ms"],
+                "me_first_ms": await _timed(http, "/api/v1/me"),
+                "me_second_ms": await _timed(http, "/api/v1/me"),
+                "repos_first_ms": await _timed(http, "/api/v1/github/app/repos"),
+                "repos_second_ms": await _timed(http, "/api/v1/github/app/repos"),
+                "steps": body["warmup"]["steps"],
+            }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def run(runs: int) -> dict:
+    await reset_db()
+    token = await create_user()
+    out = {"benchmark": "coldstart", "runs": runs}
+    for warm in (False, True):
+        results = [await _one(warm, token) for _ in range(runs)]
+        summary = {
+            key: round(statistics.median(r[key] for r in results), 1)
+            for key in results[0]
+            if key != "steps"
+        }
+        summary["steps"] = results[-1]["steps"]
+        out["warmup" if warm else "no_warmup"] = summary
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.runs))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Boots the API in-process for benchmarks: SQLite (or DATABASE_URL), a
+throwaway GitHub App key and the fake GitHub, all without network access.
+
+Import this before anything under `app`, so settings pick up the bench env.
+"""
+import os
+import tempfile
+from contextlib import asynccontextmanager
+
+import bench  # noqa: F401 (env defaults)
+
+_workdir = tempfile.mkdtemp(prefix="bench-")
+if not os.environ.get("BENCH_KEEP_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_workdir}/bench.db"
+os.environ.setdefault("INGEST_DIR", f"{_workdir}/snapshots")
+os.environ.setdefault("BLOB_DIR", f"{_workdir}/blobs")
+if not os.path.exists(os.environ["GITHUB_APP_PRIVATE_KEY_PATH"]):
+    from bench.app_jwt import _write_key
+
+    os.environ["GITHUB_APP_PRIVATE_KEY_PATH"] = _write_key(_workdir)
+
+import httpx  # noqa: E402
+
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.github import client as github_client  # noqa: E402
+from app.github.fake import create_fake_github, fake_github_transport  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+async def reset_db() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def create_user(github_id: str = "1", installation_id: int | None = 1) -> str:
+    """Insert a user and return a session JWT for them."""
+    async with SessionLocal() as db:
+        user = User(github_id=github_id, username=f"user-{github_id}", github_installation_id=installation_id)
+        db.add(user)
+        await db.commit()
+        return create_access_token(subject=str(user.id))
+
+
+@asynccontextmanager
+async def running_app(repo_count: int = 30, **fake_kwargs):
+    """Yield (api client, fake GitHub app) with the app lifespan running."""
+    fake = create_fake_github(repo_count, **fake_kwargs)
+    await reset_db()
+    async with app.router.lifespan_context(app):
+        await github_client.use_transport(fake_github_transport(fake))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client, fake
+        await github_client.use_transport(None)
@@ -0,0 +1,96 @@
+"""
+Repository snapshot ingestion.
+
+    python -m bench.ingest [--repos N] [--files F] [--big-mb M]
+
+1. End to end: N repositories ingested at once through the ingestor (so
+   INGEST_MAX_CONCURRENCY applies) from the fake GitHub; per-stage times
+   and file outcomes.
+2. Memory: extract a synthetic archive of M MiB and report the peak
+   Python allocation, which should stay flat as M grows.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import bench.harness  # noqa: F401 (env, key, database)
+from bench.harness import running_app
+from app.core.config import settings
+from app.ingest.snapshot import IngestResult, extract_tarball
+from app.ingest.sync import ingestor
+
+
+async def _end_to_end(repos: int, files: int, latency_ms: float) -> dict:
+    async with running_app(files_per_repo=files, latency=latency_ms / 1000) as (_, fake):
+        start = time.perf_counter()
+        tasks = [ingestor.schedule(1, f"octo/repo-{i}") for i in range(repos)]
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    stages = {stage: sorted(r.seconds[stage] for r in results) for stage in results[0].seconds}
+    return {
+        "repos": repos,
+        "max_concurrency": settings.INGEST_MAX_CONCURRENCY,
+        "elapsed_s": round(elapsed, 3),
+        "repos_per_s": round(repos / elapsed, 2),
+        "stage_p50_ms": {s: round(v[len(v) // 2] * 1000, 2) for s, v in stages.items()},
+        "files": dict(sum((r.files for r in results), start=results[0].files.__class__())),
+        "download_bytes": sum(r.bytes["download"] for r in results),
+        "extracted_bytes": sum(r.bytes["extracted"] for r in results),
+    }
+
+
+def _write_big_archive(path: str, total_mb: int) -> None:
+    blob = (b"def f(x):\n    return x + 1\n" * 4096)[: 100 * 1024]  # 100 KiB, kept
+    count = total_mb * 1024 * 1024 // len(blob)
+    with tarfile.open(path, "w:gz", compresslevel=1) as tar:
+        for i in range(count):
+            info = tarfile.TarInfo(f"octo-big-0000000/src/m{i}.py")
+            info.size = len(blob)
+            tar.addfile(info, io.BytesIO(blob))
+
+
+def _memory(total_mb: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = os.path.join(tmp, "big.tar.gz")
+        _write_big_archive(archive, total_mb)
+        result = IngestResult(1, "octo/big")
+        tracemalloc.start()
+        start = time.perf_counter()
+        extract_tarball(archive, Path(tmp) / "out", result)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "archive_mb": total_mb,
+        "files_kept": result.files["kept"],
+        "extract_s": round(elapsed, 3),
+        "mb_per_s": round(total_mb / elapsed, 1),
+        "peak_python_kib": round(peak / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=8)
+    parser.add_argument("--files", type=int, default=200, help="source files per fake repository")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--big-mb", type=int, nargs="+", default=[16, 64])
+    args = parser.parse_args()
+    out = {
+        "benchmark": "ingest",
+        "end_to_end": asyncio.run(_end_to_end(args.repos, args.files, args.latency_ms)),
+        "memory": [_memory(mb) for mb in args.big_mb],
+    }
+    print(json.dumps(out))
+
+
+if __name__ == "__main__":
+    main()
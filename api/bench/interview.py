@@ -0,0 +1,268 @@
+"""
+WebSocket interview sessions: time to first token, flow control, resume
+and the memory cost of idle sessions.
+
+    python -m bench.interview [--sessions N] [--idle K] [--token-ms MS]
+
+Runs the API under uvicorn in a subprocess (WebSockets need a real
+server) against the harness database, with the stub generator paced at
+--token-ms per token, then:
+
+- drives N interviews at once end to end (questions, streamed answers,
+  feedback) and reports client-side time to first question/feedback token;
+- leaves one client not acking for a while, to show the window holding
+  sends back and tokens being coalesced instead of queued;
+- drops a connection mid-question and resumes it, checking the replayed
+  frames continue the sequence with no gaps or duplicates;
+- parks K sessions waiting for an answer and reports server RSS per session.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+import websockets
+
+import bench.harness  # noqa: F401 (env, key, database)
+from bench.harness import create_user, reset_db
+from app.core.profiling import PROFILE_HEADER, create_profile_token
+
+LONG_TOPIC = " ".join(["a sharded, replicated, multi-region rate limiter"] * 6)
+ANSWER = "I would measure latency first, add a cache in front of the index and a queue with retry for the slow path."
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return round(values[min(int(len(values) * p), len(values) - 1)] * 1000, 1)
+
+
+class Client:
+    """Minimal protocol client: acks every half window, records token timings."""
+
+    def __init__(self, ws, window: int):
+        self.ws = ws
+        self.window = window
+        self.last_seq = 0
+        self.acked = 0
+        self.seqs: list[int] = []
+
+    async def recv(self) -> dict:
+        while True:
+            frame = json.loads(await self.ws.recv())
+            if frame["type"] == "ping":
+                await self.ws.send('{"type":"pong"}')
+                continue
+            if "seq" in frame:
+                self.seqs.append(frame["seq"])
+                self.last_seq = frame["seq"]
+                if self.last_seq - self.acked >= self.window // 2:
+                    await self.ack()
+            return frame
+
+    async def ack(self) -> None:
+        await self.ws.send(json.dumps({"type": "ack", "seq": self.last_seq}))
+        self.acked = self.last_seq
+
+    async def until(self, kind: str) -> dict:
+        while True:
+            frame = await self.recv()
+            if frame["type"] == kind:
+                return frame
+
+
+async def _interview(url: str, headers: dict, window: int, ttft: dict) -> int:
+    async with websockets.connect(url, additional_headers=headers, max_queue=None) as ws:
+        client = Client(ws, window)
+        await ws.send(json.dumps({"type": "start", "topic": "a rate limiter"}))
+        questions = (await client.until("session"))["questions"]
+        for _ in range(questions):
+            await client.until("question_start")
+            start = time.perf_counter()
+            await client.until("token")
+            ttft["question"].append(time.perf_counter() - start)
+            await client.until("question_end")
+            for word in ANSWER.split(" "):
+                await ws.send(json.dumps({"type": "answer", "text": word + " "}))
+            await ws.send('{"type":"answer_end"}')
+            start = time.perf_counter()
+            await client.until("token")
+            ttft["feedback"].append(time.perf_counter() - start)
+            await client.until("feedback_end")
+        await client.until("end")
+        return len(client.seqs)
+
+
+async def run(sessions: int, idle: int, token_ms: float) -> dict:
+    window = 16
+    await reset_db()
+    token = await create_user()
+    headers = {"Cookie": f"session={token}"}
+    port = _free_port()
+    env = {
+        **os.environ,
+        "INTERVIEW_STUB_TOKEN_DELAY_MS": str(token_ms),
+        "INTERVIEW_QUESTIONS": "3",
+        "INTERVIEW_WINDOW_FRAMES": str(window),
+        "INTERVIEW_MAX_SESSIONS": str(sessions + idle + 10),
+        "INTERVIEW_MAX_SESSIONS_PER_USER": str(sessions + idle + 10),  # every session is the same user
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         "--ws", "websockets-sansio"],
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    url = f"ws://127.0.0.1:{port}/api/v1/interview/ws"
+    out = {"benchmark": "interview", "token_ms": token_ms, "window": window}
+    try:
+        async with httpx.AsyncClient(base_url=base, headers={PROFILE_HEADER: create_profile_token()}) as http:
+            for _ in range(100):
+                try:
+                    await http.get("/api/v1/healthz")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+
+            # Unauthenticated handshakes are refused with 4401.
+            async with websockets.connect(url) as ws:
+                try:
+                    await ws.recv()
+                except websockets.ConnectionClosed as e:
+                    out["no_cookie_close_code"] = e.rcvd.code
+
+            # N concurrent interviews, end to end.
+            ttft = {"question": [], "feedback": []}
+            start = time.perf_counter()
+            frames = await asyncio.gather(*(_interview(url, headers, window, ttft) for _ in range(sessions)))
+            elapsed = time.perf_counter() - start
+            out["concurrent"] = {
+                "sessions": sessions,
+                "seconds": round(elapsed, 2),
+                "frames_per_session": round(statistics.mean(frames)),
+                "ttft_question_ms": {"p50": _pct(ttft["question"], 0.5), "p99": _pct(ttft["question"], 0.99)},
+                "ttft_feedback_ms": {"p50": _pct(ttft["feedback"], 0.5), "p99": _pct(ttft["feedback"], 0.99)},
+            }
+
+            # Slow reader: no acks for a second, so sends stop at the window and tokens coalesce.
+            before = (await http.get("/api/v1/stats")).json()["interview_sessions"]
+            async with websockets.connect(url, additional_headers=headers) as ws:
+                await ws.send(json.dumps({"type": "start", "topic": LONG_TOPIC}))
+                await asyncio.sleep(1.0)
+                client = Client(ws, window)
+                held = []
+                while True:
+                    try:
+                        held.append(json.loads(await asyncio.wait_for(ws.recv(), 0.2)))
+                    except asyncio.TimeoutError:
+                        break
+                client.last_seq = max(f["seq"] for f in held if "seq" in f)
+                await client.ack()
+                await client.until("question_end")
+            after = (await http.get("/api/v1/stats")).json()["interview_sessions"]
+            out["slow_reader"] = {
+                "frames_before_first_ack": len(held),
+                "tokens_coalesced": after["tokens_coalesced"] - before["tokens_coalesced"],
+                "generator_paused": after["generator_paused"] - before["generator_paused"],
+            }
+
+            # Resume: drop the socket mid-question with frames unacked, then reconnect.
+            ws = await websockets.connect(url, additional_headers=headers)
+            client = Client(ws, 10**9)  # acks only when told to
+            await ws.send(json.dumps({"type": "start", "topic": "a rate limiter"}))
+            session_id = (await client.until("session"))["session_id"]
+            await client.until("token")
+            await client.ack()
+            acked = client.acked
+            for _ in range(2):
+                await client.recv()
+            ws.transport.abort()
+            await asyncio.sleep(0.3)
+            async with websockets.connect(url, additional_headers=headers) as ws:
+                client = Client(ws, window)
+                await ws.send(json.dumps({"type": "resume", "session_id": session_id, "last_seq": acked}))
+                resumed = None
+                while resumed is None:
+                    frame = json.loads(await ws.recv())
+                    if frame["type"] == "resumed":
+                        resumed = frame
+                    elif "seq" in frame:
+                        client.seqs.append(frame["seq"])
+                        client.last_seq = frame["seq"]
+                await client.until("question_end")
+            seqs = client.seqs
+            out["resume"] = {
+                "acked_before_drop": acked,
+                "first_seq_after_resume": seqs[0],
+                "no_gaps_or_duplicates": seqs == list(range(acked + 1, seqs[-1] + 1)),
+                "state": resumed,
+            }
+
+            # K idle sessions parked waiting for an answer.
+            stats = (await http.get("/api/v1/stats")).json()["interview_sessions"]
+            rss_before = _rss_kb(server.pid)
+            sockets = []
+
+            async def park() -> None:
+                ws = await websockets.connect(url, additional_headers=headers, max_queue=None)
+                sockets.append(ws)
+                client = Client(ws, window)
+                await ws.send(json.dumps({"type": "start", "topic": "a rate limiter"}))
+                await client.until("question_end")
+                await client.ack()
+
+            start = time.perf_counter()
+            for i in range(0, idle, 500):
+                await asyncio.gather(*(park() for _ in range(min(500, idle - i))))
+            opened = time.perf_counter() - start
+            await asyncio.sleep(0.5)
+            rss_after = _rss_kb(server.pid)
+            stats = (await http.get("/api/v1/stats")).json()["interview_sessions"]
+            out["idle"] = {
+                "sessions": idle,
+                "open_seconds": round(opened, 2),
+                "server_rss_mb": round(rss_after / 1024, 1),
+                "kb_per_session": round((rss_after - rss_before) / idle, 1),
+                "attached": stats["attached"],
+            }
+            await asyncio.gather(*(ws.close() for ws in sockets))
+            out["stats"] = (await http.get("/api/v1/stats")).json()["interview_sessions"]
+    finally:
+        server.terminate()
+        server.wait()
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--idle", type=int, default=2000)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * (args.sessions + args.idle))), hard))
+    print(json.dumps(asyncio.run(run(args.sessions, args.idle, args.token_ms))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Job queue throughput, exactly-once claiming, retries and SSE progress.
+
+    python -m bench.jobs [--jobs N] [--workers W] [--concurrency C] [--work-ms MS]
+
+Enqueues N jobs and drains them with W workers of C slots each (in one
+process here; they only share the database, exactly as separate worker
+processes would). Checks every job ran exactly once, that a flaky kind
+succeeds after retries, that idempotency keys dedupe, and follows an
+ingest job through the API's SSE stream.
+
+Against SQLite (the default) claims are serialised by the database lock;
+with BENCH_KEEP_DATABASE_URL and a Postgres DATABASE_URL the same run
+exercises FOR UPDATE SKIP LOCKED and LISTEN/NOTIFY.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from datetime import datetime
+
+import bench.harness  # noqa: F401 (env, key, database)
+from bench.harness import create_user, running_app
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.jobs.handlers import handler
+from app.jobs.queue import SUCCEEDED, enqueue, get_job
+from app.jobs.worker import Worker
+from app.models.repository import Repository
+
+runs: Counter = Counter()
+flaky_attempts: Counter = Counter()
+
+
+@handler("bench_work")
+async def bench_work(ctx, n: int, work_ms: float) -> dict:
+    runs[n] += 1
+    await ctx.progress(stage="working", n=n)
+    await asyncio.sleep(work_ms / 1000)
+    return {"n": n}
+
+
+@handler("bench_flaky")
+async def bench_flaky(ctx, n: int, fail_times: int) -> dict:
+    flaky_attempts[n] += 1
+    if flaky_attempts[n] <= fail_times:
+        raise RuntimeError(f"transient failure {flaky_attempts[n]}")
+    return {"attempts": flaky_attempts[n]}
+
+
+async def _drain(workers: list[Worker], until) -> None:
+    tasks = [asyncio.create_task(w.run()) for w in workers]
+    while not await until():
+        await asyncio.sleep(0.02)
+    for w in workers:
+        w.stop()
+    await asyncio.gather(*tasks)
+
+
+async def run(jobs: int, workers: int, concurrency: int, work_ms: float) -> dict:
+    settings.JOBS_RETRY_BASE_SECONDS = 0.05
+    settings.JOBS_POLL_SECONDS = 0.05
+    out = {"benchmark": "jobs", "jobs": jobs, "workers": workers, "concurrency": concurrency, "work_ms": work_ms}
+
+    async with running_app(repo_count=1) as (client, _):
+        out["database"] = settings.DATABASE_URL.split(":", 1)[0]
+
+        start = time.perf_counter()
+        ids = [(await enqueue("bench_work", {"n": n, "work_ms": work_ms}))[0].id for n in range(jobs)]
+        out["enqueue_per_s"] = round(jobs / (time.perf_counter() - start))
+
+        pool = [Worker(concurrency) for _ in range(workers)]
+
+        async def all_done() -> bool:
+            return sum(w.succeeded for w in pool) >= jobs
+
+        start = time.perf_counter()
+        await _drain(pool, all_done)
+        elapsed = time.perf_counter() - start
+        statuses = Counter([(await get_job(i)).status for i in ids])
+        out["drain"] = {
+            "seconds": round(elapsed, 2),
+            "jobs_per_s": round(jobs / elapsed),
+            "ideal_jobs_per_s": round(workers * concurrency / (work_ms / 1000)),
+            "statuses": dict(statuses),
+            "ran_twice": sum(1 for c in runs.values() if c > 1),
+            "never_ran": jobs - len(runs),
+            "per_worker": [w.claimed for w in pool],
+        }
+
+        # Retries: fails twice, succeeds on the third attempt.
+        flaky, _ = await enqueue("bench_flaky", {"n": 1, "fail_times": 2})
+        pool = [Worker(1)]
+
+        async def flaky_done() -> bool:
+            return (await get_job(flaky.id)).status == SUCCEEDED
+
+        await _drain(pool, flaky_done)
+        job = await get_job(flaky.id)
+        out["retry"] = {"status": job.status, "attempts": job.attempts, "result": job.result}
+
+        # Idempotency: the second enqueue returns the first job.
+        first, created = await enqueue("bench_work", {"n": -1, "work_ms": 0}, idempotency_key="same")
+        second, created_again = await enqueue("bench_work", {"n": -1, "work_ms": 0}, idempotency_key="same")
+        out["idempotent"] = {"same_job": first.id == second.id, "created": [created, created_again]}
+
+        # An ingest through the API, followed over SSE.
+        settings.JOBS_ENABLED = True
+        async with SessionLocal() as db:
+            db.add(Repository(
+                installation_id=1, github_id=1000, name="repo-0", full_name="octo/repo-0", updated_at=datetime.utcnow()
+            ))
+            await db.commit()
+        client.cookies.set("session", await create_user())
+        r = await client.post("/api/v1/github/app/repositories/1000/ingest", headers={"Idempotency-Key": "k1"})
+        assert r.status_code == 202, r.text
+        body = r.json()
+        again = await client.post("/api/v1/github/app/repositories/1000/ingest", headers={"Idempotency-Key": "k1"})
+
+        events = []
+        pool = [Worker(1)]
+        worker_task = asyncio.create_task(pool[0].run())
+        # (httpx's ASGI transport buffers the body, so this shows the sequence, not timing.)
+        async with client.stream("GET", body["events"]) as stream:
+            async for line in stream.aiter_lines():
+                if line.startswith("event:"):
+                    events.append([line.split(":", 1)[1].strip()])
+                elif line.startswith("data:") and events:
+                    data = json.loads(line[5:])
+                    events[-1] += [data["status"], (data.get("progress") or {}).get("stage")]
+        pool[0].stop()
+        await worker_task
+        settings.JOBS_ENABLED = False
+        out["sse"] = {
+            "same_job_for_same_key": again.json()["id"] == body["id"],
+            "events": events,
+        }
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--work-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.jobs, args.workers, args.concurrency, args.work_ms))))
+
+
+if __name__ == "__main__":
+    main()
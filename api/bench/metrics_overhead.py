@@ -0,0 +1,71 @@
+"""
+Per-request cost of MetricsMiddleware, measured by driving a trivial ASGI
+app directly (no HTTP client in the loop) with and without the middleware.
+
+    python -m bench.metrics_overhead [--requests N]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import bench  # noqa: F401 (env defaults)
+from app.core.metrics import Histogram, MetricsMiddleware
+
+
+class _Route:
+    path = "/api/v1/bench"
+
+
+async def _plain_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _drive(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/bench"}
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def run(requests: int) -> dict:
+    wrapped = MetricsMiddleware(_plain_app)
+    await _drive(_plain_app, 1000)
+    await _drive(wrapped, 1000)
+    bare_us = await _drive(_plain_app, requests)
+    instrumented_us = await _drive(wrapped, requests)
+
+    h = Histogram("bench", "bench", ("a",))
+    start = time.perf_counter()
+    for i in range(requests):
+        h.observe(0.01, "x")
+    observe_us = (time.perf_counter() - start) / requests * 1e6
+
+    return {
+        "benchmark": "metrics_overhead",
+        "requests": requests,
+        "bare_us_per_request": round(bare_us, 3),
+        "instrumented_us_per_request": round(instrumented_us, 3),
+        "middleware_overhead_us": round(instrumented_us - bare_us, 3),
+        "histogram_observe_us": round(observe_us, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests))))
+
+
+if __name__ == "__main__":
+    main()
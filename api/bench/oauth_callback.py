@@ -0,0 +1,81 @@
+"""
+OAuth callback: stage breakdown, the concurrent /user + /user/installations
+fan-out, and installation auto-linking.
+
+    python -m bench.oauth_callback [--logins N] [--latency-ms MS]
+
+Every fake GitHub response takes --latency-ms, standing in for the round
+trip to github.com. "returning" users already have the app installed on
+their account, so the callback links it and they land on a connected
+dashboard; "new" users have no installation and still go through
+/github/app/start as before.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import parse_qs, urlparse
+
+import bench.harness  # noqa: F401 (env, key, database)
+from bench.harness import running_app
+from app.core.metrics import github_requests
+
+
+def _op_mean_ms(op: str) -> float:
+    count = total = 0.0
+    for (name, _status), series in github_requests._series.items():
+        if name == op:
+            count += sum(series[:-1])
+            total += series[-1]
+    return round(total / count * 1000, 1) if count else 0.0
+
+
+async def _login(client, account: str) -> tuple[float, dict[str, float]]:
+    r = await client.get("/auth/github/login")
+    state = parse_qs(urlparse(r.headers["location"]).query)["state"][0]
+    start = time.perf_counter()
+    r = await client.get("/auth/github/callback", params={"code": account, "state": state})
+    elapsed = time.perf_counter() - start
+    assert r.status_code == 302, r.text
+    stages = {}
+    for part in r.headers["server-timing"].split(","):
+        name, _, dur = part.strip().partition(";dur=")
+        stages[name] = float(dur)
+    return elapsed, stages
+
+
+async def run(logins: int, latency_ms: float) -> dict:
+    out = {"benchmark": "oauth_callback", "logins": logins, "github_latency_ms": latency_ms}
+    async with running_app(repo_count=5, latency=latency_ms / 1000) as (client, fake):
+        for kind in ("returning", "new"):
+            totals, stages, connected = [], {}, 0
+            for i in range(logins):
+                account = f"{kind}-{i}"
+                if kind == "returning":
+                    fake.state.user_installations[account] = [100 + i]
+                client.cookies.clear()
+                elapsed, timing = await _login(client, account)
+                totals.append(elapsed)
+                for name, dur in timing.items():
+                    stages.setdefault(name, []).append(dur)
+                connected += (await client.get("/api/v1/session")).json()["app_connected"]
+            out[kind] = {
+                "callback_ms_p50": round(statistics.median(totals) * 1000, 1),
+                "stage_ms_p50": {name: round(statistics.median(v), 1) for name, v in stages.items()},
+                "app_connected_after_login": f"{connected}/{logins}",
+            }
+        out["github_call_mean_ms"] = {op: _op_mean_ms(op) for op in ("oauth_exchange", "user", "user_installations")}
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.logins, args.latency_ms))))
+
+
+if __name__ == "__main__":
+    main()
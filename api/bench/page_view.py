@@ -0,0 +1,71 @@
+"""
+Backend and GitHub calls per page view: the old /me + /repos probe chain
+versus the single /session bootstrap.
+
+    python -m bench.page_view [--views N]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from bench.harness import create_user, running_app
+
+
+async def _old_page_view(client) -> int:
+    # ProtectedRoute(requiresApp) -> /me then /github/app/repos; Navbar -> /me
+    await client.get("/api/v1/me")
+    await client.get("/api/v1/github/app/repos")
+    await client.get("/api/v1/me")
+    return 3
+
+
+async def _new_page_view(client, etag: str | None) -> tuple[int, str | None, int]:
+    # ProtectedRoute + Navbar share one /session call; the browser revalidates via ETag
+    headers = {"If-None-Match": etag} if etag else {}
+    r = await client.get("/api/v1/session", headers=headers)
+    return 1, r.headers.get("etag"), r.status_code
+
+
+async def run(views: int) -> dict:
+    results = {}
+    async with running_app(repo_count=250) as (client, fake):
+        client.cookies.set("session", await create_user())
+
+        fake.state.calls.clear()
+        start = time.perf_counter()
+        backend = sum([await _old_page_view(client) for _ in range(views)])
+        results["before"] = {
+            "backend_calls_per_view": backend / views,
+            "github_calls_per_view": sum(fake.state.calls.values()) / views,
+            "ms_per_view": (time.perf_counter() - start) / views * 1000,
+        }
+
+        fake.state.calls.clear()
+        etag, backend, not_modified = None, 0, 0
+        start = time.perf_counter()
+        for _ in range(views):
+            calls, etag, status = await _new_page_view(client, etag)
+            backend += calls
+            not_modified += status == 304
+        results["after"] = {
+            "backend_calls_per_view": backend / views,
+            "github_calls_per_view": sum(fake.state.calls.values()) / views,
+            "ms_per_view": (time.perf_counter() - start) / views * 1000,
+            "not_modified_ratio": not_modified / views,
+        }
+
+    for side in results.values():
+        side["ms_per_view"] = round(side["ms_per_view"], 3)
+    return {"benchmark": "page_view", "views": views, **results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--views", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.views))))
+
+
+if __name__ == "__main__":
+    main()
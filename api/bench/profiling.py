@@ -0,0 +1,156 @@
+"""
+Opt-in request profiling: what it costs when off, what a profiled request
+pays, and what a capture of /github/app/repos contains.
+
+    python -m bench.profiling [--requests N] [--latency-ms MS]
+
+The middleware overhead is measured on a trivial ASGI app driven directly
+(as in bench.metrics_overhead). The capture comes from the in-process app
+with every fake GitHub response delayed by --latency-ms, and a cold
+installation token cache, so the request signs an app JWT, mints a token,
+lists repositories and touches the DB.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from bench.harness import create_user, running_app
+from app.core.config import settings
+from app.core.profiling import PROFILE_HEADER, ProfilingMiddleware, create_profile_token, profiler
+from app.github.app_jwt import app_jwt_signer
+from app.github.tokens import installation_tokens
+
+_HEADERS = [(b"host", b"bench"), (b"accept", b"*/*"), (b"accept-encoding", b"gzip, br"),
+            (b"user-agent", b"bench"), (b"cookie", b"session=x")]
+
+
+async def _plain_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _drive(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "GET", "path": "/api/v1/bench", "headers": _HEADERS}, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def _overhead(requests: int) -> dict:
+    wrapped = ProfilingMiddleware(_plain_app)
+    await _drive(_plain_app, 1000)
+    await _drive(wrapped, 1000)
+    bare = await _drive(_plain_app, requests)
+    off = await _drive(wrapped, requests)
+    profiler.configure(1_000_000_000, "/")  # sampling on, but never picking this request
+    sampling = await _drive(wrapped, requests)
+    profiler.configure(0, "/")
+    return {
+        "bare_us": round(bare, 3),
+        "middleware_off_overhead_us": round(off - bare, 3),
+        "middleware_sampling_overhead_us": round(sampling - bare, 3),
+    }
+
+
+async def _wait_for_captures(count: int) -> list[dict]:
+    for _ in range(200):
+        captures = profiler.captures()
+        if len(captures) >= count:
+            return captures
+        await asyncio.sleep(0.01)
+    return profiler.captures()
+
+
+def _timed(timings: list[float]):
+    start = time.perf_counter()
+    return lambda: timings.append(time.perf_counter() - start)
+
+
+async def run(requests: int, latency_ms: float) -> dict:
+    out = {"benchmark": "profiling", "overhead": await _overhead(requests)}
+    token = create_profile_token()
+    async with running_app(repo_count=300, latency=latency_ms / 1000) as (client, _):
+        client.cookies.set("session", await create_user())
+
+        # One cold, profiled request: app JWT, token mint, repo pages, DB.
+        installation_tokens.clear()
+        app_jwt_signer._jwt = None  # signed at warmup; make this request sign it
+        r = await client.get("/api/v1/github/app/repos", headers={PROFILE_HEADER: token, "Accept-Encoding": "identity"})
+        assert r.status_code == 200, r.text
+        capture_id = r.headers["x-profile-id"]
+        await _wait_for_captures(1)
+
+        listed = await client.get("/api/v1/profiles", headers={PROFILE_HEADER: token})
+        summary = next(c for c in listed.json()["captures"] if c["id"] == capture_id)
+        folded = (await client.get(f"/api/v1/profiles/{capture_id}", params={"format": "collapsed"},
+                                   headers={PROFILE_HEADER: token})).text
+        speedscope = await client.get(f"/api/v1/profiles/{capture_id}", headers={PROFILE_HEADER: token})
+        leaves: dict[str, float] = {}
+        for line in folded.splitlines():
+            stack, _, weight = line.rpartition(" ")
+            leaf = stack.rsplit(";", 1)[-1]
+            if leaf.startswith("["):
+                leaves[leaf] = leaves.get(leaf, 0) + int(weight) / 1000
+        out["capture"] = {
+            "summary": summary,
+            "await_leaves_ms": {k: round(v, 1) for k, v in sorted(leaves.items())},
+            "collapsed_lines": len(folded.splitlines()),
+            "speedscope_bytes": len(speedscope.content),
+            "unauthenticated_list_status": (await client.get("/api/v1/profiles")).status_code,
+            "access_token_as_profile_token_status": (
+                await client.get("/api/v1/profiles", headers={PROFILE_HEADER: client.cookies["session"]})
+            ).status_code,
+        }
+
+        # Warm requests: unprofiled vs profiled latency.
+        plain, profiled = [], []
+        for i in range(40):
+            done = _timed(plain)
+            await client.get("/api/v1/me")
+            done()
+            done = _timed(profiled)
+            await client.get("/api/v1/me", headers={PROFILE_HEADER: token})
+            done()
+        out["me_ms_p50"] = {
+            "unprofiled": round(statistics.median(plain) * 1000, 2),
+            "profiled": round(statistics.median(profiled) * 1000, 2),
+        }
+
+        # Admin sampling, with the capture directory bounded.
+        settings.PROFILING_MAX_CAPTURES = 10
+        profiler.configure(10, "/api/v1/me")
+        started = profiler.started
+        for _ in range(200):
+            await client.get("/api/v1/me")
+        await client.get("/api/v1/session")  # outside the prefix
+        profiler.configure(0, "/")
+        await asyncio.sleep(0.2)
+        out["sampling"] = {
+            "requests": 200,
+            "sample_one_in": 10,
+            "profiled": profiler.started - started,
+            "captures_kept": len(profiler.captures()),
+            "max_captures": settings.PROFILING_MAX_CAPTURES,
+        }
+        out["stats"] = profiler.stats()
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.latency_ms))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Scheduler behaviour against a fake GitHub that enforces a small rate limit.
+
+    python -m bench.ratelimit
+
+One installation gets `--limit` requests per `--window` seconds. A
+background sweep of many pages runs alongside interactive requests. We
+report how long interactive calls waited, whether any 403 leaked to a
+caller, and how many identical concurrent GETs were collapsed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("GITHUB_BACKGROUND_RESERVE", "10")
+os.environ.setdefault("GITHUB_INTERACTIVE_MAX_WAIT_SECONDS", "10")
+
+from bench.harness import running_app  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.github.scheduler import BACKGROUND, priority, scheduler  # noqa: E402
+from app.github.tokens import get_installation_token  # noqa: E402
+
+
+async def _timed_get(url: str, token: str, installation_id: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    r = await scheduler.request(
+        "GET", url, bucket=installation_id, headers={"Authorization": f"Bearer {token}"}
+    )
+    return time.perf_counter() - start, r.status_code
+
+
+async def run(limit: int, window: float, background_pages: int, interactive: int) -> dict:
+    async with running_app(repo_count=100 * background_pages, rate_limit=limit, rate_window=window) as (_, fake):
+        installation_id = 1
+        token = await get_installation_token(installation_id)
+        base = f"{settings.GITHUB_API_URL}/installation/repositories?per_page=100"
+
+        async def background() -> list:
+            with priority(BACKGROUND):
+                return await asyncio.gather(
+                    *[_timed_get(f"{base}&page={p}", token, installation_id) for p in range(1, background_pages + 1)]
+                )
+
+        async def foreground() -> list:
+            results = []
+            for i in range(interactive):
+                await asyncio.sleep(window / interactive)
+                results.append(await _timed_get(f"{base}&page=1&i={i}", token, installation_id))
+            return results
+
+        start = time.perf_counter()
+        bg, fg = await asyncio.gather(background(), foreground())
+        elapsed = time.perf_counter() - start
+
+        # Dedup: identical in-flight GETs share one upstream call.
+        before = scheduler.sent
+        await asyncio.gather(*[_timed_get(f"{base}&page=2", token, installation_id) for _ in range(50)])
+        dedup_sent = scheduler.sent - before
+
+        fg_waits = sorted(t for t, _ in fg)
+        return {
+            "benchmark": "ratelimit",
+            "limit": limit,
+            "window_s": window,
+            "elapsed_s": round(elapsed, 2),
+            "interactive_p50_ms": round(fg_waits[len(fg_waits) // 2] * 1000, 1),
+            "interactive_max_ms": round(fg_waits[-1] * 1000, 1),
+            "background_max_s": round(max(t for t, _ in bg), 2),
+            "non_200_to_callers": sum(1 for _, s in bg + fg if s != 200),
+            "upstream_403s": fake.state.rate_limited,
+            "dedup_50_identical_gets_sent": dedup_sent,
+            "scheduler": scheduler.stats(),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=40)
+    parser.add_argument("--window", type=float, default=3.0)
+    parser.add_argument("--background-pages", type=int, default=60)
+    parser.add_argument("--interactive", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.limit, args.window, args.background_pages, args.interactive))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+/github/app/repos payload size and serialization cost: GitHub's full
+repository objects passed through (before) versus the slim projection,
+orjson and compression (after), and the 304 on revalidation.
+
+    python -m bench.repos_payload [--repos N ...] [--rounds R]
+
+The fake GitHub serves full-shape repository objects (every URL template
+and the owner block), like api.github.com does.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import time
+
+import brotli
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from bench.harness import create_user, running_app
+from app.api.responses import json_bytes
+from app.core.config import settings
+from app.github.repos import DEFAULT_FIELDS, fetch_all_repos, project_repos
+from app.github.tokens import get_installation_token, installation_tokens
+
+
+def _best_ms(fn, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+async def _one(count: int, rounds: int) -> dict:
+    installation_tokens.clear()  # minted by the previous run's fake GitHub
+    async with running_app(repo_count=count, full_repo_objects=True) as (client, _):
+        client.cookies.set("session", await create_user())
+        r = await client.get("/api/v1/github/app/repos", params={"fields": ",".join(DEFAULT_FIELDS)},
+                             headers={"Accept-Encoding": "identity"})
+        assert r.status_code == 200, r.text
+
+        # What the old handler returned: fetch_all_repos() as-is, encoded by FastAPI.
+        full = await fetch_all_repos(1, await get_installation_token(1))
+        slim = {"total_count": full["total_count"], "repositories": project_repos(full["repositories"], DEFAULT_FIELDS)}
+        full_json = json.dumps(full).encode()
+        slim_json = json_bytes(slim)
+
+        out = {
+            "repos": count,
+            "bytes": {
+                "full_json": len(full_json),
+                "full_gzip": len(gzip.compress(full_json, settings.RESPONSE_GZIP_LEVEL)),
+                "slim_json": len(slim_json),
+                "slim_gzip": len(gzip.compress(slim_json, settings.RESPONSE_GZIP_LEVEL)),
+                "slim_br": len(brotli.compress(slim_json, quality=settings.RESPONSE_BROTLI_QUALITY)),
+            },
+            "serialize_ms": {
+                "full_fastapi": _best_ms(lambda: JSONResponse(jsonable_encoder(full)), rounds),
+                "full_json": _best_ms(lambda: json.dumps(full), rounds),
+                "full_orjson": _best_ms(lambda: orjson.dumps(full), rounds),
+                "project": _best_ms(lambda: project_repos(full["repositories"], DEFAULT_FIELDS), rounds),
+                "slim_orjson": _best_ms(lambda: json_bytes(slim), rounds),
+                "slim_gzip": _best_ms(lambda: gzip.compress(slim_json, settings.RESPONSE_GZIP_LEVEL), rounds),
+                "slim_br": _best_ms(
+                    lambda: brotli.compress(slim_json, quality=settings.RESPONSE_BROTLI_QUALITY), rounds
+                ),
+            },
+        }
+
+        # Through the API: first fetch, then revalidation.
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            r = await client.get("/api/v1/github/app/repos", headers={"Accept-Encoding": "br, gzip"})
+            timings.append(time.perf_counter() - start)
+            wire, etag, coding = r.num_bytes_downloaded, r.headers["etag"], r.headers.get("content-encoding")
+        revalidate = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            r = await client.get(
+                "/api/v1/github/app/repos", headers={"Accept-Encoding": "br, gzip", "If-None-Match": etag}
+            )
+            revalidate.append(time.perf_counter() - start)
+            assert r.status_code == 304, r.status_code
+        out["api"] = {
+            "content_encoding": coding,
+            "etag": etag,
+            "wire_bytes_200": wire,
+            "wire_bytes_304": r.num_bytes_downloaded,
+            "ms_200": round(min(timings) * 1000, 2),
+            "ms_304": round(min(revalidate) * 1000, 2),
+        }
+        return out
+
+
+async def run(counts: list[int], rounds: int) -> dict:
+    return {"benchmark": "repos_payload", "results": [await _one(n, rounds) for n in counts]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.repos, args.rounds))))
+
+
+if __name__ == "__main__":
+    main()
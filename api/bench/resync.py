@@ -0,0 +1,88 @@
+"""
+Re-syncing a large repository after a small change.
+
+    python -m bench.resync [--files N] [--file-kb K] [--changed C] [--latency-ms L]
+
+Ingests a synthetic repository of N files, edits C of them, then compares
+the incremental re-sync (tree diff + changed blobs) with downloading the
+whole tarball again. Also reports a no-op re-sync and a second copy of
+the same repository (a fork) reusing the blob store.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import bench.harness  # noqa: F401 (env, key, database)
+from bench.harness import running_app
+from app.ingest.blobs import blob_store
+from app.ingest.snapshot import ingest_repository, snapshot_dir
+from app.ingest.sync import sync_repository
+
+
+def _files(n: int, kb: int) -> dict[str, bytes]:
+    # Hex keeps it text but barely compressible, like real source in bulk.
+    return {f"src/pkg{i % 50}/module_{i}.py": os.urandom(kb * 512).hex().encode() for i in range(n)}
+
+
+async def _timed(fake, coro) -> dict:
+    fake.state.calls.clear()
+    writes = blob_store.writes
+    start = time.perf_counter()
+    result = await coro
+    return {
+        "mode": result.mode,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "github_calls": sum(fake.state.calls.values()),
+        "downloaded_kib": round(result.bytes["download"] / 1024, 1),
+        "blobs_written": blob_store.writes - writes,
+        "files": dict(result.files),
+    }
+
+
+async def run(files: int, file_kb: int, changed: int, latency_ms: float) -> dict:
+    async with running_app(latency=latency_ms / 1000) as (_, fake):
+        fake.state.repo_files["octo/big"] = _files(files, file_kb)
+        out = {"initial": await _timed(fake, sync_repository(1, "octo/big"))}
+        out["unchanged"] = await _timed(fake, sync_repository(1, "octo/big"))
+
+        repo = fake.state.repo_files["octo/big"]
+        for path in list(repo)[:changed]:
+            repo[path] = repo[path] + b"\n# edited\n"
+        repo["src/new_file.py"] = b"def added():\n    return 1\n"
+
+        out["incremental"] = await _timed(fake, sync_repository(1, "octo/big"))
+        out["full_redownload"] = await _timed(fake, ingest_repository(1, "octo/big"))
+
+        # Same contents under another name: nothing new to store.
+        fake.state.repo_files["fork/big"] = dict(repo)
+        out["fork"] = await _timed(fake, sync_repository(2, "fork/big"))
+
+        kept = json.loads((snapshot_dir(1, "octo/big") / ".snapshot.json").read_text())["files"]
+        out["snapshot_files"] = len(kept)
+
+    speedup = out["full_redownload"]["elapsed_ms"] / max(out["incremental"]["elapsed_ms"], 0.001)
+    return {
+        "benchmark": "resync",
+        "files": files,
+        "file_kb": file_kb,
+        "changed": changed,
+        "github_latency_ms": latency_ms,
+        **out,
+        "incremental_speedup": round(speedup, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--file-kb", type=int, default=8)
+    parser.add_argument("--changed", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.files, args.file_kb, args.changed, args.latency_ms))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Re-login rate and login-path latency, without and with refresh tokens.
+
+    python -m bench.sessions [--seconds S] [--access-seconds A] [--interval-ms MS]
+
+Shrinks the access token lifetime to A seconds (15 minutes in production)
+and has one user browse, one /me call every MS, for S seconds:
+
+- "before" drops the refresh cookie after each login, which is what the
+  old cookie set gave us: every access token expiry is a 401 and a full
+  /auth/github/login -> GitHub -> callback round trip (against the fake
+  GitHub here, so the GitHub part is a lower bound);
+- "after" keeps it, so get_current_user renews in-band as the token
+  nears expiry.
+
+Also checks parallel requests racing one renewal, that a replayed (already rotated) refresh token revokes its
+family, and that logout revokes the session.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import parse_qs, urlparse
+
+import bench.harness  # noqa: F401 (env, key, database)
+from bench.harness import running_app
+from app.core.config import settings
+from app.core.sessions import REFRESH_COOKIE, SESSION_COOKIE, session_stats
+
+
+async def _login(client, account: str) -> float:
+    start = time.perf_counter()
+    r = await client.get("/auth/github/login")
+    state = parse_qs(urlparse(r.headers["location"]).query)["state"][0]
+    r = await client.get("/auth/github/callback", params={"code": account, "state": state})
+    assert r.status_code == 302, r.text
+    return time.perf_counter() - start
+
+
+def _ms(values: list[float]) -> dict:
+    if not values:
+        return {"n": 0}
+    values = sorted(values)
+    return {
+        "n": len(values),
+        "p50": round(statistics.median(values) * 1000, 2),
+        "max": round(values[-1] * 1000, 2),
+    }
+
+
+async def _browse(client, seconds: float, interval: float, keep_refresh: bool) -> dict:
+    logins, renewals, plain = [], [], []
+    logins.append(await _login(client, "alice"))
+    if not keep_refresh:
+        client.cookies.delete(REFRESH_COOKIE)
+    renewed_before = session_stats.renewed
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        before = client.cookies.get(SESSION_COOKIE)
+        start = time.perf_counter()
+        r = await client.get("/api/v1/me")
+        elapsed = time.perf_counter() - start
+        if r.status_code == 401:
+            logins.append(await _login(client, "alice"))
+            if not keep_refresh:
+                client.cookies.delete(REFRESH_COOKIE)
+        elif client.cookies.get(SESSION_COOKIE) != before:
+            renewals.append(elapsed)
+        else:
+            plain.append(elapsed)
+        await asyncio.sleep(interval)
+    return {
+        "re_logins": len(logins) - 1,
+        # x4 is per hour of browsing with the production 15-minute tokens.
+        "re_logins_per_token_lifetime": round((len(logins) - 1) / (seconds / (settings.ACCESS_TOKEN_MINUTES * 60)), 2),
+        "oauth_login_ms": _ms(logins),
+        "in_band_renewal_ms": _ms(renewals),
+        "plain_request_ms": _ms(plain),
+        "rotations": session_stats.renewed - renewed_before,
+    }
+
+
+async def run(seconds: float, access_seconds: float, interval_ms: float) -> dict:
+    settings.ACCESS_TOKEN_MINUTES = access_seconds / 60
+    settings.ACCESS_TOKEN_RENEW_SECONDS = access_seconds / 3
+    out = {"benchmark": "sessions", "seconds": seconds, "access_seconds": access_seconds, "interval_ms": interval_ms}
+    async with running_app(repo_count=1) as (client, _):
+        out["before"] = await _browse(client, seconds, interval_ms / 1000, keep_refresh=False)
+        client.cookies.clear()
+        out["after"] = await _browse(client, seconds, interval_ms / 1000, keep_refresh=True)
+
+        # Parallel requests due for renewal with the same refresh cookie: one
+        # rotates, the rest fall in the grace window, nobody gets a 401.
+        client.cookies.clear()
+        await _login(client, "dave")
+        client.cookies.delete(SESSION_COOKIE)
+        raced_before, renewed_before = session_stats.raced, session_stats.renewed
+        statuses = [r.status_code for r in await asyncio.gather(*(client.get("/api/v1/me") for _ in range(8)))]
+        out["parallel_renewal"] = {
+            "statuses": sorted(set(statuses)),
+            "rotated": session_stats.renewed - renewed_before,
+            "grace": session_stats.raced - raced_before,
+        }
+
+        # A stolen token replayed after the grace window revokes the whole family.
+        settings.REFRESH_REUSE_GRACE_SECONDS = 0
+        client.cookies.clear()
+        await _login(client, "bob")
+        stolen = client.cookies.get(REFRESH_COOKIE)
+        r = await client.post("/api/v1/auth/refresh")
+        rotated = r.status_code == 200 and client.cookies.get(REFRESH_COOKIE) != stolen
+        current = client.cookies.get(REFRESH_COOKIE)
+        client.cookies.set(REFRESH_COOKIE, stolen)
+        replay = (await client.post("/api/v1/auth/refresh")).status_code
+        client.cookies.set(REFRESH_COOKIE, current)
+        after_replay = (await client.post("/api/v1/auth/refresh")).status_code
+
+        client.cookies.clear()
+        await _login(client, "carol")
+        token = client.cookies.get(REFRESH_COOKIE)
+        await client.post("/api/v1/auth/logout")
+        client.cookies.set(REFRESH_COOKIE, token)
+        after_logout = (await client.post("/api/v1/auth/refresh")).status_code
+        out["revocation"] = {
+            "rotated": rotated,
+            "replayed_token": replay,
+            "legitimate_token_after_replay": after_replay,
+            "after_logout": after_logout,
+        }
+        out["stats"] = session_stats.stats()
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--access-seconds", type=float, default=3.0)
+    parser.add_argument("--interval-ms", type=float, default=100.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.seconds, args.access_seconds, args.interval_ms))))
+
+
+if __name__ == "__main__":
+    main()
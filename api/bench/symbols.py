@@ -0,0 +1,150 @@
+"""
+Symbol index build and query cost.
+
+    python -m bench.symbols [--files N] [--lookups L] [--idle-indexes K]
+
+Builds an index for a synthetic repository of N Python/TypeScript files,
+rebuilds it after a small change (reusing parsed blobs), then times name
+lookups and listings against the memory-mapped file, directly and through
+the API. Finally opens K copies to show the resident cost of idle indexes.
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import time
+from datetime import datetime
+
+import bench.harness  # noqa: F401 (env, key, database)
+from bench.harness import create_user, running_app
+from app.core.db import SessionLocal
+from app.ingest.blobs import blob_store
+from app.ingest.symbol_index import IndexCache, SymbolIndex, build_index, index_path
+from app.models.repository import Repository
+
+
+def _source(i: int) -> tuple[str, bytes]:
+    if i % 3:
+        body = "".join(
+            f"class Handler{i}_{c}:\n    def handle(self, req):\n        return req\n\n    def close(self):\n        pass\n\n\n"
+            for c in range(3)
+        ) + "".join(f"def util_{i}_{f}(x):\n    return x + {f}\n\n\n" for f in range(6))
+        return f"pkg{i % 40}/mod_{i}.py", body.encode()
+    body = "".join(f"export function render{i}_{f}(p: number): string {{\n  return String(p);\n}}\n\n" for f in range(8))
+    return f"web/src/view_{i}.ts", (body + f"export interface Props{i} {{ id: number }}\n").encode()
+
+
+def _rss_kib() -> dict:
+    """Anonymous (private heap) and file-backed (page cache, reclaimable) resident KiB."""
+    out = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon:", "RssFile:")):
+                name, value, _ = line.split()
+                out[name.rstrip(":")] = int(value)
+    return out
+
+
+def _pcts(samples: list[float]) -> dict:
+    samples.sort()
+    return {
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 2),
+    }
+
+
+async def run(files: int, lookups: int, idle_indexes: int) -> dict:
+    out = {"benchmark": "symbols", "files": files}
+    async with running_app(repo_count=1) as (client, _):
+        manifest = {}
+        for i in range(files):
+            path, data = _source(i)
+            manifest[path] = blob_store.put(data)
+
+        target = index_path(1, "octo/repo-0")
+        start = time.perf_counter()
+        built = build_index(manifest, "a" * 40, target)
+        out["build"] = {**built, "seconds": round(time.perf_counter() - start, 3), "bytes": target.stat().st_size}
+
+        # Small change: 10 files edited, everything else reused from the old index.
+        for path in list(manifest)[:10]:
+            manifest[path] = blob_store.put(blob_store.path(manifest[path]).read_bytes() + b"\n# edited\n")
+        previous = SymbolIndex(target)
+        start = time.perf_counter()
+        rebuilt = build_index(manifest, "b" * 40, target, previous=previous)
+        previous.close()
+        out["rebuild"] = {**rebuilt, "seconds": round(time.perf_counter() - start, 3)}
+
+        index = SymbolIndex(target)
+        names = [f"util_{random.randrange(files)}_{random.randrange(6)}" for _ in range(lookups)]
+        samples = []
+        for name in names:
+            t = time.perf_counter()
+            index.lookup(name)
+            samples.append(time.perf_counter() - t)
+        out["lookup_exact"] = _pcts(samples)
+
+        samples = []
+        for _ in range(lookups // 10):
+            t = time.perf_counter()
+            index.lookup("handle", limit=50)
+            samples.append(time.perf_counter() - t)
+        out["lookup_common_name_50"] = _pcts(samples)
+
+        samples = []
+        for _ in range(lookups // 10):
+            t = time.perf_counter()
+            index.listing(f"pkg{random.randrange(40)}/", limit=100)
+            samples.append(time.perf_counter() - t)
+        out["listing_100"] = _pcts(samples)
+        index.close()
+
+        # Through the API, auth and all.
+        async with SessionLocal() as db:
+            db.add(Repository(
+                installation_id=1, github_id=1000, name="repo-0", full_name="octo/repo-0", updated_at=datetime.utcnow()
+            ))
+            await db.commit()
+        client.cookies.set("session", await create_user())
+        url = "/api/v1/github/app/repositories/1000/symbols/lookup"
+        await client.get(url, params={"name": "handle"})
+        samples = []
+        for name in names[: lookups // 10]:
+            t = time.perf_counter()
+            r = await client.get(url, params={"name": name})
+            samples.append(time.perf_counter() - t)
+            assert r.status_code == 200
+        out["api_lookup"] = _pcts(samples)
+
+        # Idle indexes: K open mmaps of the same size.
+        copies = []
+        for k in range(idle_indexes):
+            copy = target.with_name(f"copy-{k}.symbols")
+            shutil.copyfile(target, copy)
+            copies.append(copy)
+        cache = IndexCache(max_open=idle_indexes)
+        before = _rss_kib()
+        for copy in copies:
+            cache.get(copy).lookup("handle", limit=1)
+        after = _rss_kib()
+        out["idle"] = {
+            "indexes": idle_indexes,
+            "index_kib": round(target.stat().st_size / 1024, 1),
+            "anon_kib_per_index": round((after["RssAnon"] - before["RssAnon"]) / idle_indexes, 1),
+            "file_kib_per_index": round((after["RssFile"] - before["RssFile"]) / idle_indexes, 1),
+        }
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--idle-indexes", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.files, args.lookups, args.idle_indexes))))
+
+
+if __name__ == "__main__":
+    main()
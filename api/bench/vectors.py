@@ -0,0 +1,177 @@
+"""
+Code search index build and query cost.
+
+    python -m bench.vectors [--files N] [--queries Q] [--scale 10000,100000,1000000]
+
+Builds the search index for a synthetic repository of N source files
+(tokenising every chunk), rebuilds it after a small edit (carrying over
+unchanged files), then times top-10 queries one at a time, in batches and
+through the API. For the larger sizes the tokenising step is skipped:
+chunk rows are drawn from a Zipf vocabulary straight into CSR arrays, so
+the numbers are the postings build and query scoring alone.
+"""
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import bench.harness  # noqa: F401 (env, key, database)
+from bench.harness import create_user, running_app
+from app.core.db import SessionLocal
+from app.ingest.blobs import blob_store
+from app.ingest.vectors import DIM, VectorIndex, _term_id, build_vectors, finish_arrays, vectors_path, write_index
+from app.models.repository import Repository
+
+TOPICS = ["auth", "token", "session", "cache", "retry", "queue", "render", "parse", "index", "search", "user", "repo"]
+
+
+def _source(i: int) -> tuple[str, bytes]:
+    a, b = TOPICS[i % len(TOPICS)], TOPICS[(i * 7 + 3) % len(TOPICS)]
+    if i % 3:
+        body = "".join(
+            f"def {a}_{b}_{f}(request, {b}_id):\n"
+            f"    {a}Value = load{b.title()}(request, {b}_id)\n"
+            f"    if not {a}Value:\n        raise ValueError('missing {b}')\n"
+            f"    return store_{a}({a}Value, limit={f})\n\n\n"
+            for f in range(6)
+        )
+        return f"pkg{i % 40}/{a}_{i}.py", body.encode()
+    body = "".join(
+        f"export function {a}{b.title()}{f}(props: {b.title()}Props): string {{\n"
+        f"  const {b}List = props.{a}Items.map((x) => x.{b}Name);\n  return {b}List.join(',');\n}}\n\n"
+        for f in range(6)
+    )
+    return f"web/src/{b}/{a}_{i}.ts", body.encode()
+
+
+def _pcts(samples: list[float]) -> dict:
+    samples.sort()
+    return {
+        "mean_ms": round(sum(samples) / len(samples) * 1e3, 3),
+        "p50_ms": round(samples[len(samples) // 2] * 1e3, 3),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1] * 1e3, 3),
+    }
+
+
+def _time_queries(index: VectorIndex, queries: list[str], batch: int = 32) -> dict:
+    samples = []
+    for q in queries:
+        t = time.perf_counter()
+        index.search([q], 10)
+        samples.append(time.perf_counter() - t)
+    start = time.perf_counter()
+    for b in range(0, len(queries), batch):
+        index.search(queries[b : b + batch], 10)
+    batched = (time.perf_counter() - start) / len(queries)
+    return {**_pcts(samples), f"batched_{batch}_ms_per_query": round(batched * 1e3, 3)}
+
+
+def _synthetic(chunks: int, terms_per_chunk: int, out: Path) -> dict:
+    """CSR rows of Zipf-distributed words, indexed without tokenising anything."""
+    vocab = 50_000
+    ids = np.array([_term_id(f"word{i}") for i in range(vocab)], dtype=np.int32)
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(terms_per_chunk // 2, terms_per_chunk * 3 // 2, size=chunks)
+    words = np.minimum(rng.zipf(1.2, size=int(lengths.sum())) - 1, vocab - 1)
+    # One entry per (chunk, term) with its count, as a real build produces.
+    keys, counts = np.unique(np.repeat(np.arange(chunks, dtype=np.int64), lengths) * DIM + ids[words], return_counts=True)
+    indptr = np.zeros(chunks + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // DIM, minlength=chunks), out=indptr[1:])
+    arrays = {
+        "indptr": indptr,
+        "indices": (keys % DIM).astype(np.int32),
+        "tf": (1.0 + np.log(counts)).astype(np.float32),
+        "chunk_file": (np.arange(chunks) // 10).astype(np.int32),
+        "chunk_start": np.ones(chunks, dtype=np.int32),
+        "chunk_end": np.full(chunks, 20, dtype=np.int32),
+        "name_off": np.zeros(chunks + 1, dtype=np.int64),
+        "names": np.zeros(0, dtype=np.uint8),
+    }
+    start = time.perf_counter()
+    arrays.update(finish_arrays(arrays["indptr"], arrays["indices"], arrays["tf"]))
+    elapsed = time.perf_counter() - start
+    meta = {
+        "commit_sha": "c" * 40, "dim": 0, "chunks": chunks,
+        "files": [[f"f{i}.py", "0" * 40] for i in range((chunks + 9) // 10)],
+    }
+    write_index(out, meta, arrays)
+    return {"nnz": int(indptr[-1]), "postings_build_seconds": round(elapsed, 2)}
+
+
+async def run(files: int, queries: int, scale: list[int]) -> dict:
+    out = {"benchmark": "vectors", "files": files}
+    random.seed(0)
+    topic_queries = [f"{random.choice(TOPICS)} {random.choice(TOPICS)}" for _ in range(queries)]
+
+    async with running_app(repo_count=1) as (client, _):
+        manifest = {}
+        for i in range(files):
+            path, data = _source(i)
+            manifest[path] = blob_store.put(data)
+
+        target = vectors_path(1, "octo/repo-0")
+        start = time.perf_counter()
+        built = build_vectors(manifest, "a" * 40, target)
+        out["build"] = {**built, "seconds": round(time.perf_counter() - start, 3)}
+
+        for path in list(manifest)[:10]:
+            manifest[path] = blob_store.put(blob_store.path(manifest[path]).read_bytes() + b"\n# edited\n")
+        previous = VectorIndex(target)
+        start = time.perf_counter()
+        rebuilt = build_vectors(manifest, "b" * 40, target, previous=previous)
+        previous.close()
+        out["rebuild"] = {**rebuilt, "seconds": round(time.perf_counter() - start, 3)}
+
+        index = VectorIndex(target)
+        out["top_hit"] = index.search(["auth token"], 1)[0]
+        out["query"] = _time_queries(index, topic_queries)
+        index.close()
+
+        async with SessionLocal() as db:
+            db.add(Repository(
+                installation_id=1, github_id=1000, name="repo-0", full_name="octo/repo-0", updated_at=datetime.utcnow()
+            ))
+            await db.commit()
+        client.cookies.set("session", await create_user())
+        url = "/api/v1/github/app/repositories/1000/search"
+        await client.get(url, params={"q": "warm up"})
+        samples = []
+        for q in topic_queries[: max(queries // 5, 1)]:
+            t = time.perf_counter()
+            r = await client.get(url, params={"q": q})
+            samples.append(time.perf_counter() - t)
+            assert r.status_code == 200
+        out["api_search"] = _pcts(samples)
+
+    out["scale"] = []
+    rng = np.random.default_rng(1)
+    word_queries = [" ".join(f"word{int(w) - 1}" for w in rng.zipf(1.5, size=3)) for _ in range(queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for chunks in scale:
+            target = Path(tmp) / f"{chunks}.vectors"
+            row = {"chunks": chunks, **_synthetic(chunks, 24, target)}
+            index = VectorIndex(target)
+            row["query"] = _time_queries(index, word_queries[: max(queries // (chunks // 10_000), 20)])
+            index.close()
+            out["scale"].append(row)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--scale", default="10000,100000,1000000")
+    args = parser.parse_args()
+    scale = [int(n) for n in args.scale.split(",") if n]
+    print(json.dumps(asyncio.run(run(args.files, args.queries, scale))))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
+# `entrypoint.sh worker [--concurrency N] [--processes P]` runs background jobs
+# instead of the API. Migrations are left to the API container.
+if [[ "${1:-}" == "worker" ]]; then
+  shift
+  echo "Starting job worker..."
+  exec python -m app.jobs.worker "$@"
+fi
+
 echo "Starting API..."
 
 # Run migrations if ALEMBIC_DATABASE_URL is set, else use DATABASE_URL (converted to sync URL)
@@ -15,4 +23,6 @@ else
   alembic upgrade head || true
 fi
 
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+# The sans-I/O WebSocket implementation holds idle interview sockets in about
+# half the memory of the legacy one.
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --ws websockets-sansio
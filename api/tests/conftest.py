@@ -0,0 +1,76 @@
+"""
+Tests run the app in-process against SQLite and the fake GitHub
+(app/github/fake.py); no network, no Postgres.
+"""
+import os
+import tempfile
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+_workdir = tempfile.mkdtemp(prefix="tests-")
+_key_path = os.path.join(_workdir, "app.pem")
+with open(_key_path, "wb") as f:
+    f.write(
+        rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()
+        )
+    )
+
+os.environ.update({
+    "ENV": "dev",
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_workdir}/test.db",
+    "JWT_SECRET": "test-secret",
+    "GITHUB_APP_ID": "1",
+    "GITHUB_APP_SLUG": "test-app",
+    "GITHUB_APP_PRIVATE_KEY_PATH": _key_path,
+    "GITHUB_CLIENT_ID": "test-client",
+    "GITHUB_CLIENT_SECRET": "test-secret",
+    "GITHUB_REDIRECT_URI": "http://test/auth/github/callback",
+    "WARMUP_HTTP_CONNECTIONS": "0",
+    "RATE_LIMIT_ENABLED": "false",
+    "INGEST_DIR": f"{_workdir}/snapshots",
+    "BLOB_DIR": f"{_workdir}/blobs",
+    "PROFILING_DIR": f"{_workdir}/profiles",
+})
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.core.db import Base, engine  # noqa: E402
+from app.core.user_cache import user_cache  # noqa: E402
+from app.github import client as github_client  # noqa: E402
+from app.github.fake import create_fake_github, fake_github_transport  # noqa: E402
+from app.github.tokens import installation_tokens  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fake_options():
+    """Override in a test module (or parametrize) to pass create_fake_github() options."""
+    return {}
+
+
+@pytest.fixture
+async def fake(fake_options):
+    fake = create_fake_github(**fake_options)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    user_cache.clear()
+    installation_tokens.clear()
+    async with app.router.lifespan_context(app):
+        await github_client.use_transport(fake_github_transport(fake))
+        yield fake
+        await github_client.use_transport(None)
+
+
+@pytest.fixture
+async def client(fake):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
@@ -0,0 +1,28 @@
+import threading
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core import profiling
+from app.core.db import engine
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_statement_closes_its_profiler_span(fake):
+    profile = SimpleNamespace(open_spans=[], span_seconds=Counter(), span_counts=Counter(), _done=threading.Event())
+    token = profiling._active.set(profile)
+    try:
+        async with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM no_such_table"))
+            await conn.rollback()
+            await conn.execute(text("SELECT 1"))
+    finally:
+        profiling._active.reset(token)
+
+    assert profile.open_spans == []
+    assert profile.span_counts["db"] == 2
@@ -0,0 +1,37 @@
+import pytest
+
+from app.core.config import settings
+from app.core.profiling import PROFILE_HEADER, create_profile_token
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_stats_need_the_profile_token(fake, client):
+    assert (await client.get("/api/v1/stats")).status_code == 401
+    assert (await client.get("/api/v1/stats", headers={PROFILE_HEADER: "nope"})).status_code == 401
+
+    r = await client.get("/api/v1/stats", headers={PROFILE_HEADER: create_profile_token()})
+
+    assert r.status_code == 200
+    assert "github_scheduler" in r.json()
+
+
+async def test_stats_public_flag(fake, client, monkeypatch):
+    monkeypatch.setattr(settings, "STATS_PUBLIC", True)
+
+    assert (await client.get("/api/v1/stats")).status_code == 200
+
+
+async def test_probes_stay_open(fake, client):
+    assert (await client.get("/api/v1/healthz")).status_code == 200
+
+
+async def test_metrics_need_a_token(fake, client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-me")
+
+    assert (await client.get("/metrics")).status_code == 401
+    assert (await client.get("/metrics", headers={"Authorization": "Bearer wrong"})).status_code == 401
+    r = await client.get("/metrics", headers={"Authorization": "Bearer scrape-me"})
+    assert r.status_code == 200
+    assert "db_pool" in r.text
+    assert (await client.get("/metrics", headers={PROFILE_HEADER: create_profile_token()})).status_code == 200
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+from app.ingest.symbol_index import IndexCache
+from app.ingest.vectors import ARRAYS, vector_indexes, write_index
+
+
+class _Index:
+    def __init__(self, path):
+        stat = os.stat(path)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _paths(tmp_path, n):
+    paths = [tmp_path / f"repo-{i}" for i in range(n)]
+    for path in paths:
+        path.write_bytes(b"")
+    return paths
+
+
+def test_evicted_index_stays_open_while_leased(tmp_path):
+    a, b = _paths(tmp_path, 2)
+    cache = IndexCache(max_open=1, opener=_Index)
+
+    with cache.lease(a) as leased:
+        cache.get(b)  # evicts a mid-search
+        assert not leased.closed
+        assert cache.stats()["retired"] == 1
+
+    assert leased.closed
+    assert cache.stats()["leased"] == cache.stats()["retired"] == 0
+
+
+def test_replaced_index_closes_after_last_lease(tmp_path):
+    (a,) = _paths(tmp_path, 1)
+    cache = IndexCache(max_open=4, opener=_Index)
+
+    with cache.lease(a) as first, cache.lease(a) as second:
+        assert first is second
+        os.utime(a, ns=(0, 0))  # rebuilt on disk
+        assert cache.get(a) is not first
+    assert first.closed
+
+
+def test_unleased_eviction_closes_at_once(tmp_path):
+    a, b = _paths(tmp_path, 2)
+    cache = IndexCache(max_open=1, opener=_Index)
+
+    index = cache.get(a)
+    with cache.lease(b):
+        assert index.closed
+    with cache.lease(tmp_path / "missing") as missing:
+        assert missing is None
+
+
+def test_rebuilt_vector_index_is_reopened(tmp_path):
+    out = tmp_path / "repo.vectors"
+    arrays = {name: np.zeros(2, dtype=np.int64) for name in ARRAYS}
+    write_index(out, {"commit_sha": "a", "files": [], "chunks": 0}, arrays)
+    assert vector_indexes.get(out).commit_sha == "a"
+
+    write_index(out, {"commit_sha": "b", "files": [], "chunks": 0}, arrays)
+
+    assert out.is_symlink()
+    assert vector_indexes.get(out).commit_sha == "b"
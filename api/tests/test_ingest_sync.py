@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.ingest.snapshot import MANIFEST, IngestResult, snapshot_dir
+from app.ingest import sync
+from app.ingest.sync import Ingestor, sync_repository, wanted_files
+
+pytestmark = pytest.mark.anyio
+
+
+def _manifest(full_name: str) -> dict:
+    return json.loads((snapshot_dir(1, full_name) / MANIFEST).read_text())
+
+
+def _source(n: int) -> bytes:
+    return os.urandom(200).hex().encode() + b"\n" * n
+
+
+async def test_sniffed_binaries_are_not_refetched(fake):
+    repo = fake.state.repo_files["octo/binary"] = {
+        "src/a.py": _source(1),
+        "src/b.py": _source(2),
+        "data/blob.txt": b"looks like text\0" + os.urandom(64),
+    }
+    first = await sync_repository(1, "octo/binary")
+    assert first.mode == "full" and first.files["binary"] == 1
+    assert set(_manifest("octo/binary")["skipped"]) == {"data/blob.txt"}
+
+    repo["src/a.py"] += b"# edited\n"
+    fake.state.calls.clear()
+    second = await sync_repository(1, "octo/binary")
+
+    assert second.mode == "incremental"
+    blob_calls = sum(n for call, n in fake.state.calls.items() if "/git/blobs/" in call)
+    assert blob_calls == 1  # the edited file only
+    assert second.files["binary"] == 1
+    assert set(_manifest("octo/binary")["files"]) == {"src/a.py", "src/b.py"}
+    assert set(_manifest("octo/binary")["skipped"]) == {"data/blob.txt"}
+
+
+async def test_incremental_sync_keeps_the_byte_budget(fake, monkeypatch):
+    repo = fake.state.repo_files["octo/budget"] = {f"src/m{i}.py": _source(i) for i in range(6)}
+    budget = sum(len(repo[f"src/m{i}.py"]) for i in range(3))
+    monkeypatch.setattr(settings, "INGEST_MAX_EXTRACTED_BYTES", budget)
+    await sync_repository(1, "octo/budget")
+    kept = set(_manifest("octo/budget")["files"])
+    assert kept == {"src/m0.py", "src/m1.py", "src/m2.py"}
+
+    repo["src/m0.py"] = repo["src/m0.py"][:-1]  # a byte smaller, still within budget
+    fake.state.calls.clear()
+    result = await sync_repository(1, "octo/budget")
+
+    assert result.mode == "incremental"
+    assert set(_manifest("octo/budget")["files"]) == kept
+    assert result.files["over_budget"] == 3
+    assert sum(n for call, n in fake.state.calls.items() if "/git/blobs/" in call) == 1
+
+
+def test_tree_paths_outside_the_snapshot_are_skipped():
+    tree = {"tree": [
+        {"path": "../escape.py", "type": "blob", "mode": "100644", "sha": "a" * 40, "size": 1},
+        {"path": "/etc/passwd.py", "type": "blob", "mode": "100644", "sha": "b" * 40, "size": 1},
+        {"path": "src/ok.py", "type": "blob", "mode": "100644", "sha": "c" * 40, "size": 1},
+    ]}
+    result = IngestResult(1, "octo/unsafe")
+
+    assert wanted_files(tree, result) == {"src/ok.py": "c" * 40}
+    assert result.files["unsafe"] == 2
+
+
+def test_latest_outcomes_are_capped(monkeypatch):
+    monkeypatch.setattr(sync, "_LAST_MAX", 2)
+    ingestor = Ingestor(max_concurrency=1)
+    for name in ("octo/a", "octo/b", "octo/c"):
+        ingestor._remember((1, name), {"status": "done"})
+    ingestor._remember((1, "octo/b"), {"status": "failed", "error": "boom"})
+    ingestor._remember((1, "octo/d"), {"status": "done"})
+
+    assert list(ingestor.last) == [(1, "octo/b"), (1, "octo/d")]
+    assert ingestor.status(1, "octo/a") is None
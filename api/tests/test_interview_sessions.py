@@ -0,0 +1,48 @@
+import pytest
+
+from app.core.config import settings
+from app.interview.session import SessionManager, UserSessionLimit
+
+pytestmark = pytest.mark.anyio
+
+
+class _Socket:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(text)
+
+
+@pytest.fixture
+async def manager(monkeypatch):
+    monkeypatch.setattr(settings, "INTERVIEW_MAX_SESSIONS_PER_USER", 2)
+    manager = SessionManager()
+    yield manager
+    await manager.close()
+
+
+async def test_new_session_replaces_oldest_detached(manager):
+    first = manager.create(1, "a")
+    second = manager.create(1, "b")
+    second.attach(_Socket())
+
+    third = manager.create(1, "c")
+
+    assert set(manager.sessions) == {second.id, third.id}
+    assert manager.get(first.id, 1) is None
+    assert manager.stats()["replaced"] == 1
+
+
+async def test_user_with_every_session_attached_is_refused(manager):
+    for topic in ("a", "b"):
+        manager.create(1, topic).attach(_Socket())
+
+    with pytest.raises(UserSessionLimit):
+        manager.create(1, "c")
+
+    # Other users are unaffected, and dropping a session frees a slot.
+    manager.create(2, "a")
+    manager.drop(next(s for s in manager.sessions.values() if s.user_id == 1))
+    manager.create(1, "c")
+    assert manager.stats()["user_limited"] == 1
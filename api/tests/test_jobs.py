@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.security import create_access_token
+from app.core.sessions import SESSION_COOKIE
+from app.jobs import queue
+from app.jobs.queue import FAILED, INTERACTIVE, QUEUED, RUNNING, SUCCEEDED
+from app.models.job import Job
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+async def _set(job_id: int, **values) -> None:
+    async with SessionLocal() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(**values))
+        await db.commit()
+
+
+async def _sign_in(client, github_id: str) -> int:
+    async with SessionLocal() as db:
+        user = User(github_id=github_id, username=f"user-{github_id}")
+        db.add(user)
+        await db.commit()
+    client.cookies.set(SESSION_COOKIE, create_access_token(subject=str(user.id)))
+    return user.id
+
+
+async def test_repeated_idempotency_key_returns_the_same_job(fake):
+    first, created = await queue.enqueue("ingest", {"repo": "octo/a"}, idempotency_key="ingest:octo/a")
+    again, created_again = await queue.enqueue("ingest", {"repo": "other"}, idempotency_key="ingest:octo/a")
+
+    assert (created, created_again) == (True, False)
+    assert again.id == first.id
+    assert again.payload == {"repo": "octo/a"}
+
+
+async def test_claim_order_is_priority_then_run_at(fake):
+    now = datetime.utcnow()
+    late, _ = await queue.enqueue("k", run_at=now - timedelta(seconds=1))
+    early, _ = await queue.enqueue("k", run_at=now - timedelta(seconds=2))
+    urgent, _ = await queue.enqueue("k", priority=INTERACTIVE, run_at=now - timedelta(seconds=0.5))
+    await queue.enqueue("k", run_at=now + timedelta(hours=1))  # not due yet
+
+    claimed = [await queue.claim("w") for _ in range(4)]
+
+    assert [job.id if job else None for job in claimed] == [urgent.id, early.id, late.id, None]
+    assert all(job.status == RUNNING and job.attempts == 1 for job in claimed[:3])
+
+
+async def test_fail_requeues_with_backoff_until_max_attempts(fake):
+    job, _ = await queue.enqueue("k", max_attempts=2)
+
+    claimed = await queue.claim("w")
+    assert await queue.fail(claimed, "w", "boom")
+    requeued = await queue.get_job(job.id)
+    assert (requeued.status, requeued.attempts, requeued.error) == (QUEUED, 1, "boom")
+    assert requeued.run_at > datetime.utcnow()
+    assert await queue.claim("w") is None  # backing off
+
+    await _set(job.id, run_at=datetime.utcnow() - timedelta(seconds=1))
+    claimed = await queue.claim("w")
+    assert claimed.attempts == 2
+    assert await queue.fail(claimed, "w", "boom again")
+    assert (await queue.get_job(job.id)).status == FAILED
+
+
+async def test_stale_heartbeat_is_requeued(fake):
+    job, _ = await queue.enqueue("k")
+    await queue.claim("dead-worker")
+    await _set(job.id, heartbeat_at=datetime.utcnow() - timedelta(seconds=settings.JOBS_LEASE_SECONDS + 1))
+
+    assert await queue.requeue_expired() == 1
+
+    requeued = await queue.get_job(job.id)
+    assert (requeued.status, requeued.locked_by) == (QUEUED, None)
+
+
+async def test_worker_that_lost_its_lease_cannot_finish(fake):
+    job, _ = await queue.enqueue("k")
+    stale = await queue.claim("a")
+    await _set(job.id, heartbeat_at=datetime.utcnow() - timedelta(seconds=settings.JOBS_LEASE_SECONDS + 1))
+    await queue.requeue_expired()
+    assert (await queue.claim("b")).locked_by == "b"
+
+    assert await queue.complete(stale, "a", {"ok": True}) is False
+    assert await queue.fail(stale, "a", "late") is False
+
+    current = await queue.get_job(job.id)
+    assert (current.status, current.locked_by, current.result) == (RUNNING, "b", None)
+
+
+async def test_events_stream_progress_then_done(client, monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_POLL_SECONDS", 0.02)
+    user_id = await _sign_in(client, "1")
+    job, _ = await queue.enqueue("k", user_id=user_id)
+
+    async def work():
+        await asyncio.sleep(0.1)
+        claimed = await queue.claim("w")
+        await queue.progress(claimed, "w", {"stage": "sync"})
+        await asyncio.sleep(0.1)
+        await queue.complete(claimed, "w", {"files": 3})
+
+    worker = asyncio.ensure_future(work())
+    r = await client.get(f"/api/v1/jobs/{job.id}/events")
+    await worker
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = [line.removeprefix("event: ") for line in r.text.splitlines() if line.startswith("event: ")]
+    assert events[0] == "progress" and events[-1] == "done"
+    assert events.count("done") == 1
+    assert f'"status":"{SUCCEEDED}"' in r.text
+
+
+async def test_events_of_another_users_job_are_not_found(client):
+    owner = await _sign_in(client, "1")
+    job, _ = await queue.enqueue("k", user_id=owner)
+    await _sign_in(client, "2")
+
+    assert (await client.get(f"/api/v1/jobs/{job.id}/events")).status_code == 404
+    assert (await client.get(f"/api/v1/jobs/{job.id}")).status_code == 404
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.db import SessionLocal
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+async def _user_count() -> int:
+    async with SessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(User))
+
+
+async def test_concurrent_first_logins_create_one_user(fake, client):
+    async def login():
+        return await client.get(
+            "/auth/github/callback",
+            params={"code": "octo", "state": "s"},
+            headers={"Cookie": "oauth_state=s"},
+        )
+
+    responses = await asyncio.gather(*(login() for _ in range(10)))
+
+    assert [r.status_code for r in responses] == [302] * 10
+    assert fake.state.calls["GET /user"] == 10
+    assert await _user_count() == 1
+
+
+async def test_concurrent_first_dev_logins_create_one_user(fake, client):
+    responses = await asyncio.gather(*(
+        client.post("/api/v1/auth/dev-login", json={"github_id": "42", "username": "octo"}) for _ in range(10)
+    ))
+
+    assert [r.status_code for r in responses] == [200] * 10
+    assert await _user_count() == 1
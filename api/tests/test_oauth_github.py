@@ -0,0 +1,53 @@
+import zlib
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+async def _login(client, account: str) -> None:
+    r = await client.get("/auth/github/login")
+    state = parse_qs(urlparse(r.headers["location"]).query)["state"][0]
+    client.cookies.set("oauth_state", state)
+    r = await client.get("/auth/github/callback", params={"code": account, "state": state})
+    assert r.status_code == 302, r.text
+
+
+def _login_name(account: str) -> str:
+    return f"octocat-{zlib.crc32(account.encode())}"  # the fake's login for this OAuth code
+
+
+async def _installation_id(username: str) -> int | None:
+    async with SessionLocal() as db:
+        return await db.scalar(select(User.github_installation_id).where(User.username == username))
+
+
+@pytest.fixture
+def app_credentials(monkeypatch):
+    monkeypatch.setattr(settings, "GITHUB_APP_CLIENT_ID", "Iv1.test-app")
+    monkeypatch.setattr(settings, "GITHUB_APP_CLIENT_SECRET", "test-app-secret")
+
+
+async def test_app_login_links_own_installation(fake, client, app_credentials):
+    fake.state.user_installations["octo"] = [77]
+
+    await _login(client, "octo")
+
+    assert fake.state.calls["GET /user/installations"] == 1
+    assert await _installation_id(_login_name("octo")) == 77
+
+
+async def test_oauth_app_login_skips_installation_lookup(fake, client):
+    fake.state.user_installations["octo"] = [77]
+
+    await _login(client, "octo")
+
+    # An OAuth App token can't list installations; the install flow links them instead.
+    assert fake.state.calls["GET /user/installations"] == 0
+    assert await _installation_id(_login_name("octo")) is None
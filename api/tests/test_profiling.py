@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import profiling
+
+pytestmark = pytest.mark.anyio
+
+
+def _profile():
+    return SimpleNamespace(tasks=set(), open_spans=[], span_seconds=Counter(), span_counts=Counter(), _done=threading.Event())
+
+
+async def _active_profile():
+    return profiling._active.get()
+
+
+async def test_background_tasks_leave_the_request_profile():
+    profile = _profile()
+    loop = asyncio.get_running_loop()
+    saved = loop.get_task_factory()
+    loop.set_task_factory(profiling._task_factory)
+    token = profiling._active.set(profile)
+    try:
+        joined = asyncio.create_task(asyncio.sleep(0))
+        detached = profiling.background_task(_active_profile())
+        assert await detached is None
+        await joined
+    finally:
+        profiling._active.reset(token)
+        loop.set_task_factory(saved)
+
+    assert profile.tasks == {joined}
+
+
+async def test_finished_profiles_take_no_spans_or_tasks():
+    profile = _profile()
+    profile._done.set()
+    loop = asyncio.get_running_loop()
+    saved = loop.get_task_factory()
+    loop.set_task_factory(profiling._task_factory)
+    token = profiling._active.set(profile)
+    try:
+        with profiling.span("db"):
+            await asyncio.create_task(asyncio.sleep(0))
+    finally:
+        profiling._active.reset(token)
+        loop.set_task_factory(saved)
+
+    assert profile.tasks == set() and profile.span_counts == Counter()
@@ -0,0 +1,28 @@
+import pytest
+
+from app.core.db import SessionLocal
+from app.core.security import create_access_token
+from app.core.sessions import SESSION_COOKIE
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def fake_options():
+    return {"repo_count": 20}
+
+
+async def test_search_includes_star_and_fork_counts(client):
+    async with SessionLocal() as db:
+        user = User(github_id="7", username="octo", github_installation_id=1)
+        db.add(user)
+        await db.commit()
+    client.cookies.set(SESSION_COOKIE, create_access_token(subject=str(user.id)))
+
+    r = await client.get("/api/v1/github/app/repositories", params={"q": "repo-12"})
+
+    assert r.status_code == 200
+    (repo,) = r.json()["repositories"]
+    assert repo["full_name"] == "octo/repo-12"
+    assert (repo["stargazers_count"], repo["forks_count"]) == (12, 5)
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.github.scheduler import scheduler
+
+pytestmark = pytest.mark.anyio
+
+USER_URL = f"{settings.GITHUB_API_URL}/user"
+
+
+def _user_token(fake) -> dict:
+    fake.state.tokens["gho_test"] = "user:octo"
+    return {"Authorization": "Bearer gho_test"}
+
+
+@pytest.mark.parametrize("fake_options", [{"latency": 0.05}])
+async def test_identical_gets_share_one_upstream_call(fake):
+    headers = _user_token(fake)
+    deduplicated = scheduler.deduplicated
+
+    responses = await asyncio.gather(*(scheduler.request("GET", USER_URL, headers=headers) for _ in range(10)))
+
+    assert [r.status_code for r in responses] == [200] * 10
+    assert fake.state.calls["GET /user"] == 1
+    assert scheduler.deduplicated - deduplicated == 9
+
+
+@pytest.mark.parametrize("fake_options", [{"rate_limit": 1, "rate_window": 0.3, "retry_after": 0.5}])
+async def test_rate_limit_within_max_wait_is_retried(fake):
+    headers = _user_token(fake)
+    assert (await scheduler.request("GET", USER_URL, headers=headers)).status_code == 200
+    retries = scheduler.retries
+
+    r = await scheduler.request("GET", USER_URL, headers=headers)
+
+    assert r.status_code == 200
+    assert fake.state.rate_limited == 1
+    assert scheduler.retries - retries == 1
+
+
+@pytest.mark.parametrize("fake_options", [{"rate_limit": 1, "retry_after": 30}])
+async def test_rate_limit_past_max_wait_fails_fast(fake, monkeypatch):
+    monkeypatch.setattr(settings, "GITHUB_INTERACTIVE_MAX_WAIT_SECONDS", 1.0)
+    headers = _user_token(fake)
+    assert (await scheduler.request("GET", USER_URL, headers=headers)).status_code == 200
+
+    start = time.perf_counter()
+    r = await scheduler.request("GET", USER_URL, bucket="test-blocked", headers=headers)
+    assert r.status_code == 403  # handed back, not slept on
+    assert time.perf_counter() - start < 1.0
+
+    # The bucket is now blocked for ~30s: the next call is refused without going upstream.
+    calls = fake.state.calls["GET /user"]
+    with pytest.raises(HTTPException) as refused:
+        await scheduler.request("GET", USER_URL, bucket="test-blocked", headers=headers)
+    assert refused.value.status_code == 503
+    assert int(refused.value.headers["Retry-After"]) >= 30
+    assert fake.state.calls["GET /user"] == calls
+    assert time.perf_counter() - start < 1.0
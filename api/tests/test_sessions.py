@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from jose import jwt
+
+from app.core.config import settings
+from app.core.sessions import REFRESH_COOKIE, SESSION_COOKIE
+
+pytestmark = pytest.mark.anyio
+
+
+async def _login(client) -> None:
+    r = await client.post("/api/v1/auth/dev-login", json={"github_id": "42", "username": "octo"})
+    assert r.status_code == 200
+
+
+def _expired_access_token(user_id: str) -> str:
+    exp = datetime.now(timezone.utc) - timedelta(minutes=1)
+    return jwt.encode({"sub": user_id, "exp": exp}, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
+
+
+async def test_expired_access_token_is_renewed_in_band(client):
+    await _login(client)
+    old_refresh = client.cookies[REFRESH_COOKIE]
+    user_id = (await client.get("/api/v1/me")).json()["id"]
+    client.cookies.set(SESSION_COOKIE, _expired_access_token(str(user_id)))
+
+    r = await client.get("/api/v1/me")
+
+    assert r.status_code == 200
+    assert client.cookies[REFRESH_COOKIE] != old_refresh
+
+
+async def test_logout_all_with_expired_access_token_leaves_no_live_session(client):
+    await _login(client)
+    refresh = client.cookies[REFRESH_COOKIE]
+    user_id = (await client.get("/api/v1/me")).json()["id"]
+    client.cookies.set(SESSION_COOKIE, _expired_access_token(str(user_id)))
+
+    # get_current_user renews in-band here; those cookies must not outlive the logout.
+    r = await client.post("/api/v1/auth/logout-all")
+
+    assert r.status_code == 200
+    set_cookies = r.headers.get_list("set-cookie")
+    assert set_cookies, "logout must clear the cookies"
+    for header in set_cookies:
+        name, _, rest = header.partition("=")
+        assert name in (SESSION_COOKIE, REFRESH_COOKIE)
+        assert 'Max-Age=0' in rest or rest.startswith('""')
+
+    client.cookies.clear()
+    client.cookies.set(REFRESH_COOKIE, refresh)
+    assert (await client.post("/api/v1/auth/refresh")).status_code == 401
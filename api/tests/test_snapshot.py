@@ -0,0 +1,53 @@
+import threading
+import time
+
+from app.ingest.snapshot import MANIFEST, new_staging_dir, read_manifest, swap_into_place
+
+
+def _version(final, n: int):
+    staging = new_staging_dir(final)
+    (staging / MANIFEST).write_text(f'{{"commit_sha": "{n}"}}')
+    return staging
+
+
+def test_swap_replaces_a_legacy_directory_then_versions(tmp_path):
+    final = tmp_path / "repo"
+    final.mkdir()
+    (final / MANIFEST).write_text('{"commit_sha": "legacy"}')
+
+    swap_into_place(_version(final, 1), final)
+    first = final.resolve()
+    swap_into_place(_version(final, 2), final)
+    second = final.resolve()
+    swap_into_place(_version(final, 3), final)
+
+    assert final.is_symlink()
+    assert read_manifest(final)["commit_sha"] == "3"
+    # The version just replaced stays for readers that resolved it; older ones are gone.
+    assert read_manifest(second)["commit_sha"] == "2"
+    assert not first.exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(["repo", ".repo.prev", second.name, final.resolve().name])
+
+
+def test_readers_never_see_the_snapshot_missing(tmp_path):
+    final = tmp_path / "repo"
+    swap_into_place(_version(final, 0), final)
+    stop, misses = threading.Event(), []
+
+    def read():
+        while not stop.is_set():
+            if read_manifest(final) is None:
+                misses.append(1)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for n in range(1, 200):
+            swap_into_place(_version(final, n), final)
+            time.sleep(0.001)
+    finally:
+        stop.set()
+        reader.join()
+
+    assert misses == []
+    assert read_manifest(final)["commit_sha"] == "199"
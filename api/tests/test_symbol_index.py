@@ -0,0 +1,20 @@
+from app.ingest.blobs import BlobStore
+from app.ingest.symbol_index import MAX_NAME_BYTES, SymbolIndex, build_index
+
+
+def test_long_non_ascii_names_are_cut_on_a_character_boundary(tmp_path):
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    name = "ab" + "é" * MAX_NAME_BYTES  # the byte limit (odd) falls inside an "é"
+    sha = blobs.put(f"def {name}():\n    return 1\n".encode())
+    out = tmp_path / "repo.symbols"
+
+    build_index({"src/módulo.py": sha}, "0" * 40, out, blobs)
+    index = SymbolIndex(out)
+    try:
+        (symbol,) = index.lookup("ab", prefix=True)
+        assert symbol["path"] == "src/módulo.py"
+        assert name.startswith(symbol["name"])
+        assert len(symbol["name"].encode()) == MAX_NAME_BYTES - 1
+        assert index.listing()[0]["name"] == symbol["name"]
+    finally:
+        index.close()
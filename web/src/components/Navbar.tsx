@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 import { Link, useLocation, useNavigate } from "react-router-dom";
 import { Shield, Github, LogOut, Home, LayoutDashboard, GitBranch } from "lucide-react";
+import { fetchSession } from "../lib/session";
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL as string | undefined;
 
@@ -25,10 +26,8 @@ export default function Navbar({ variant = "fixed" }: NavbarProps) {
     }
 
     try {
-      const res = await fetch(`${API_BASE}/api/v1/me`, {
-        credentials: "include",
-      });
-      setIsAuthenticated(res.ok);
+      const session = await fetchSession();
+      setIsAuthenticated(session.authenticated);
     } catch (error) {
       setIsAuthenticated(false);
     } finally {
@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import { Navigate, useLocation } from "react-router-dom";
+import { fetchSession } from "../lib/session";
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL as string | undefined;
 
@@ -22,22 +23,9 @@ export default function ProtectedRoute({ children, requiresApp = false }: Protec
       }
 
       try {
-        // Check if user is authenticated
-        const meRes = await fetch(`${API_BASE}/api/v1/me`, {
-          credentials: "include",
-        });
-        
-        if (meRes.ok) {
-          setIsAuthenticated(true);
-
-          // If app connection is required, check that too
-          if (requiresApp) {
-            const appRes = await fetch(`${API_BASE}/api/v1/github/app/repos`, {
-              credentials: "include",
-            });
-            setIsAppConnected(appRes.ok);
-          }
-        }
+        const session = await fetchSession();
+        setIsAuthenticated(session.authenticated);
+        setIsAppConnected(session.app_connected);
       } catch (error) {
         console.error("Auth check failed:", error);
       } finally {
@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import { Navigate } from "react-router-dom";
+import { fetchSession } from "../lib/session";
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL as string | undefined;
 
@@ -24,19 +25,9 @@ export default function PublicRoute({ children }: PublicRouteProps) {
       }
 
       try {
-        const meRes = await fetch(`${API_BASE}/api/v1/me`, {
-          credentials: "include",
-        });
-        
-        if (meRes.ok) {
-          setIsAuthenticated(true);
-
-          // Check if app is connected
-          const appRes = await fetch(`${API_BASE}/api/v1/github/app/repos`, {
-            credentials: "include",
-          });
-          setIsAppConnected(appRes.ok);
-        }
+        const session = await fetchSession();
+        setIsAuthenticated(session.authenticated);
+        setIsAppConnected(session.app_connected);
       } catch (error) {
         // Not authenticated, which is fine for public routes
       } finally {
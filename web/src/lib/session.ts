@@ -0,0 +1,34 @@
+const API_BASE = import.meta.env.VITE_API_BASE_URL as string | undefined;
+
+export interface SessionInfo {
+  authenticated: boolean;
+  user: {
+    id: number;
+    github_id: string;
+    username: string;
+    avatar_url: string | null;
+  } | null;
+  app_connected: boolean;
+}
+
+const ANONYMOUS: SessionInfo = { authenticated: false, user: null, app_connected: false };
+
+// Navbar and the route guards all ask on the same page view; share one request.
+let inflight: Promise<SessionInfo> | null = null;
+
+/**
+ * One call to /api/v1/session answers "who am I" and "is the GitHub App
+ * connected". The response is ETag'd, so the browser revalidates with a 304.
+ */
+export function fetchSession(): Promise<SessionInfo> {
+  if (!API_BASE) return Promise.resolve(ANONYMOUS);
+  if (inflight) return inflight;
+
+  inflight = fetch(`${API_BASE}/api/v1/session`, { credentials: "include" })
+    .then(async (res) => (res.ok ? ((await res.json()) as SessionInfo) : ANONYMOUS))
+    .catch(() => ANONYMOUS)
+    .finally(() => {
+      inflight = null;
+    });
+  return inflight;
+}
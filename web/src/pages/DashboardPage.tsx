@@ -1,4 +1,4 @@
-import { useState, useMemo } from "react";
+import { useEffect, useRef, useState } from "react";
 import Navbar from "../components/Navbar";
 import { RefreshCw, Github, Lock, Unlock, Star, GitFork, Loader2, FolderGit2, ExternalLink, Search, X } from "lucide-react";
 
@@ -6,11 +6,15 @@ const API_BASE = import.meta.env.VITE_API_BASE_URL as string | undefined;
 
 export default function DashboardPage() {
   const [repos, setRepos] = useState<any[] | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [reposError, setReposError] = useState("");
   const [reposLoading, setReposLoading] = useState(false);
   const [searchQuery, setSearchQuery] = useState("");
+  const requestSeq = useRef(0);
 
-  async function handleShowRepositories() {
+  // Search, sorting and pagination happen server-side against our stored copy
+  // of the installation's repositories.
+  async function loadRepositories(query: string, cursor: string | null = null) {
     setReposError("");
     setReposLoading(true);
 
@@ -20,39 +24,41 @@ export default function DashboardPage() {
       return;
     }
 
+    const seq = ++requestSeq.current;
     try {
-      const res = await fetch(`${API_BASE}/api/v1/github/app/repos`, {
+      const params = new URLSearchParams({ limit: "50" });
+      if (query.trim()) params.set("q", query.trim());
+      if (cursor) params.set("cursor", cursor);
+
+      const res = await fetch(`${API_BASE}/api/v1/github/app/repositories?${params}`, {
         credentials: "include",
       });
       if (!res.ok) throw new Error(await res.text());
       const data = await res.json();
-      setRepos(data.repositories || []);
+      if (seq !== requestSeq.current) return; // a newer search superseded this one
+
+      setRepos((prev) => (cursor && prev ? [...prev, ...data.repositories] : data.repositories));
+      setNextCursor(data.next_cursor ?? null);
     } catch (error) {
       console.error("Failed to load repositories:", error);
       setReposError("Unable to load repositories.");
     } finally {
-      setReposLoading(false);
+      if (seq === requestSeq.current) setReposLoading(false);
     }
   }
 
-  // Filter repositories based on search query
-  const filteredRepos = useMemo(() => {
-    if (!repos) return null;
-    if (!searchQuery.trim()) return repos;
+  function handleShowRepositories() {
+    void loadRepositories(searchQuery);
+  }
 
-    const query = searchQuery.toLowerCase().trim();
-    return repos.filter((repo) => {
-      const fullName = (repo.full_name ?? repo.name ?? "").toLowerCase();
-      const description = (repo.description ?? "").toLowerCase();
-      const language = (repo.language ?? "").toLowerCase();
-      
-      return (
-        fullName.includes(query) ||
-        description.includes(query) ||
-        language.includes(query)
-      );
-    });
-  }, [repos, searchQuery]);
+  // Debounce server-side search while typing (only once repos have been loaded)
+  const reposLoaded = repos !== null;
+  useEffect(() => {
+    if (!reposLoaded) return;
+    const timer = setTimeout(() => void loadRepositories(searchQuery), 250);
+    return () => clearTimeout(timer);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [searchQuery, reposLoaded]);
 
   return (
     <div className="min-h-screen gradient-mesh text-white">
@@ -67,7 +73,7 @@ export default function DashboardPage() {
       <div className="sticky top-[73px] z-40 glass-effect border-b border-white/5">
         <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-3 flex items-center justify-end">
           <button
-            onClick={() => void handleShowRepositories()}
+            onClick={handleShowRepositories}
             disabled={reposLoading}
             className="px-4 py-2 rounded-xl glass-effect hover:bg-white/10 transition-all flex items-center gap-2 text-sm font-medium disabled:opacity-50"
           >
@@ -104,7 +110,7 @@ export default function DashboardPage() {
         </div>
 
         {/* Search Bar */}
-        {repos && repos.length > 0 && (
+        {repos && (repos.length > 0 || searchQuery) && (
           <div className="mb-6 sm:mb-8">
             <div className="relative max-w-2xl">
               <div className="absolute inset-y-0 left-0 pl-4 flex items-center pointer-events-none">
@@ -127,9 +133,9 @@ export default function DashboardPage() {
                 </button>
               )}
             </div>
-            {searchQuery && filteredRepos && (
+            {searchQuery && repos && (
               <p className="mt-3 text-sm text-gray-400 px-1">
-                Found {filteredRepos.length} {filteredRepos.length === 1 ? 'repository' : 'repositories'}
+                Found {repos.length}{nextCursor ? "+" : ""} {repos.length === 1 ? 'repository' : 'repositories'}
               </p>
             )}
           </div>
@@ -151,9 +157,9 @@ export default function DashboardPage() {
         )}
 
         {/* Repository List */}
-        {filteredRepos && filteredRepos.length > 0 ? (
+        {repos && repos.length > 0 ? (
           <div className="grid gap-6">
-            {filteredRepos.map((repo, index) => (
+            {repos.map((repo, index) => (
               <div
                 key={repo.id ?? repo.full_name}
                 className="group glass-card rounded-2xl p-5 sm:p-6 lg:p-8 hover:scale-[1.02] transition-all duration-300 opacity-0 animate-fade-in-up"
@@ -232,8 +238,18 @@ export default function DashboardPage() {
                 </div>
               </div>
             ))}
+
+            {nextCursor && (
+              <button
+                onClick={() => void loadRepositories(searchQuery, nextCursor)}
+                disabled={reposLoading}
+                className="mx-auto px-6 py-2.5 rounded-xl glass-effect hover:bg-white/10 transition-all text-sm font-medium text-purple-400 hover:text-purple-300 disabled:opacity-50"
+              >
+                {reposLoading ? "Loading..." : "Load more"}
+              </button>
+            )}
           </div>
-        ) : filteredRepos && filteredRepos.length === 0 && searchQuery ? (
+        ) : repos && repos.length === 0 && searchQuery ? (
           <div className="glass-card rounded-3xl p-12 sm:p-16 lg:p-20 text-center">
             <div className="w-20 h-20 mx-auto mb-6 rounded-2xl bg-gradient-to-br from-purple-500/20 to-blue-500/20 border border-purple-500/30 flex items-center justify-center">
               <Search className="w-10 h-10 text-purple-400" />